@@ -0,0 +1,103 @@
+"""
+JWT authentication with a cached user lookup.
+
+Each user has a version stamp in the cache, bumped once a change to the
+user commits (see `User.save`). Cached users are keyed by id and stamp,
+so a deactivated, edited or deleted user is reloaded on the next request
+while every other request skips the database.
+
+Only the fields requests read are cached (CACHED_FIELDS), never the
+password hash. The user is rebuilt from them with the other fields
+deferred: they are loaded on first use, and `save()` only writes the
+loaded fields.
+
+The stamp is only seen by every worker in a shared cache. With a
+per-process (locmem) cache users are not cached, otherwise the other
+workers would keep serving a deactivated user.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from djezzy_pos.cache import bump_version, is_process_local, versioned_key
+
+
+CACHED_FIELDS = [
+    'id', 'username', 'first_name', 'last_name', 'role', 'store_location',
+    'is_active', 'is_staff', 'is_superuser',
+]
+
+
+def _namespace(user_id):
+    return f'auth:user:{user_id}'
+
+
+def touch_user(user_id, using=None):
+    """Drop the cached copy of a user when the current transaction commits."""
+    transaction.on_commit(lambda: bump_version(_namespace(user_id)), using=using)
+
+
+def cached_user(user_id):
+    """Return the user with this id, from the cache when possible, or None."""
+    if is_process_local():
+        return _load_user(user_id)
+    key = versioned_key(_namespace(user_id))
+    values = cache.get(key)
+    if values is None:
+        User = get_user_model()
+        values = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*CACHED_FIELDS).first()
+        if values is None:
+            return None
+        cache.set(key, values, settings.AUTH_USER_CACHE_TIMEOUT)
+    return _build_user(values)
+
+
+def _build_user(values):
+    """A user loaded from the primary with only `values`, the rest deferred."""
+    User = get_user_model()
+    # from_db takes the values in the order of the model's fields
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(router.db_for_write(User), names, [values[name] for name in names])
+
+
+def _load_user(user_id):
+    User = get_user_model()
+    try:
+        return User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """`JWTAuthentication` that resolves the token's user through `cached_user`."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            ) from e
+
+        user = cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+        return user
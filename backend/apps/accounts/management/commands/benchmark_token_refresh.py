@@ -0,0 +1,135 @@
+"""
+Management command to benchmark /api/token/refresh/ with rotation enabled.
+
+Seeds the outstanding and blacklisted token tables inside a transaction,
+times the stock simplejwt refresh view against the project's one (fresh
+tokens and replayed, blacklisted tokens), then rolls everything back.
+"""
+
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from apps.accounts.models import User
+from apps.accounts.tokens import RotatingTokenRefreshView
+
+VIEWS = [
+    ('simplejwt', TokenRefreshView),
+    ('rotating', RotatingTokenRefreshView),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def _rotation():
+    """Turn on rotation and blacklisting as in production settings."""
+    # simplejwt modules hold this settings object, so patch it in place
+    names = ['ROTATE_REFRESH_TOKENS', 'BLACKLIST_AFTER_ROTATION']
+    previous = {name: getattr(api_settings, name) for name in names}
+    for name in names:
+        setattr(api_settings, name, True)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(api_settings, name, value)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the token refresh endpoint on seeded token tables (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tokens',
+            type=int,
+            default=200000,
+            help='Outstanding tokens to seed, half of them blacklisted (default: 200000)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=50,
+            help='Timed refreshes per view and case (default: 50)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with _rotation(), transaction.atomic():
+                user = self._seed(options['tokens'])
+                self._run(user, options['runs'])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write(self.style.WARNING('\nBenchmark data rolled back.'))
+
+    def _seed(self, count):
+        self.stdout.write(f'Seeding {count} outstanding tokens...')
+        user = User.objects.create(username='benchmark_device', role='agent')
+        now = timezone.now()
+        batch = []
+        for i in range(count):
+            batch.append(OutstandingToken(
+                user=user,
+                jti=uuid.uuid4().hex,
+                token='',
+                created_at=now - timedelta(days=i % 30),
+                expires_at=now + timedelta(days=30 - i % 30),
+            ))
+            if len(batch) == 10000:
+                self._insert(batch)
+                batch = []
+        self._insert(batch)
+        return user
+
+    def _insert(self, batch):
+        tokens = OutstandingToken.objects.bulk_create(batch)
+        if connection.features.can_return_rows_from_bulk_insert:
+            ids = [token.id for token in tokens[::2]]
+        else:
+            ids = OutstandingToken.objects.filter(
+                jti__in=[token.jti for token in tokens[::2]]
+            ).values_list('id', flat=True)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token_id=i) for i in ids])
+
+    def _run(self, user, runs):
+        factory = APIRequestFactory()
+        self.stdout.write(f'\n{"view":<10} {"case":<8} {"queries":>8} {"p50 ms":>9} {"p95 ms":>9}')
+        for name, view_class in VIEWS:
+            view = view_class.as_view()
+            token = str(RefreshToken.for_user(user))
+            replayed = []
+            for case in ('fresh', 'replay'):
+                timings = []
+                for i in range(runs):
+                    presented = token if case == 'fresh' else replayed[i % len(replayed)]
+                    request = factory.post('/api/token/refresh/', {'refresh': presented}, format='json')
+                    # Run on_commit hooks (cache updates) despite the outer transaction
+                    with TestCase.captureOnCommitCallbacks(execute=True):
+                        with CaptureQueriesContext(connection) as queries:
+                            started = time.perf_counter()
+                            response = view(request)
+                            timings.append((time.perf_counter() - started) * 1000)
+                    if case == 'fresh':
+                        replayed.append(token)
+                        token = response.data['refresh']
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                self.stdout.write(
+                    f'{name:<10} {case:<8} {len(queries.captured_queries):>8} '
+                    f'{statistics.median(timings):>9.1f} {p95:>9.1f}'
+                )
@@ -0,0 +1,37 @@
+"""
+Management command to delete expired refresh tokens.
+
+With refresh token rotation every refresh adds an outstanding and a
+blacklisted row. Expired tokens are refused on their expiry alone, so
+their rows can go. Run it from cron, daily.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.accounts.tokens import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=0,
+            help='Keep tokens that expired less than N hours ago (default: 0)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Tokens deleted per transaction (default: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_tokens(
+            timedelta(hours=options['grace_hours']), options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Done! Deleted {deleted} expired token(s).'))
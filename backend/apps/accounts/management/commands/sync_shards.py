@@ -0,0 +1,65 @@
+"""
+Management command to copy the reference tables to the regional shards.
+
+Users and offers are copied to every shard as they are saved. Run this
+once after adding a shard (after `migrate --database shard_<region>`),
+and after editing users or offers directly in the database. It also
+registers the numbers of existing contracts (see
+apps.contracts.services.numbers) and lists those used on two shards.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from apps.accounts.models import User
+from apps.contracts.services.numbers import register_numbers
+from apps.offers.models import Offer
+from djezzy_pos.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Copy users and offers from the primary database to every regional shard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows copied per transaction (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        aliases = shards()[1:]
+        if not aliases:
+            self.stdout.write(self.style.WARNING('No regional shards configured (DB_SHARDS).'))
+            return
+
+        batch_size = options['batch_size']
+        for model in (User, Offer):
+            rows = model._base_manager.using(DEFAULT_DB_ALIAS).order_by('pk')
+            copied = 0
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    self._copy(batch, aliases)
+                    copied += len(batch)
+                    batch = []
+            self._copy(batch, aliases)
+            copied += len(batch)
+            self.stdout.write(f'  {model._meta.verbose_name_plural}: {copied}')
+
+        for alias in shards():
+            registered, duplicates = register_numbers(alias, batch_size=batch_size)
+            self.stdout.write(f'  {alias}: {registered} contract numbers registered')
+            for number in duplicates:
+                # The public QR endpoint refuses these numbers
+                self.stdout.write(self.style.WARNING(f'    {number} is also used on another shard'))
+
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Shards synced: {", ".join(aliases)}'))
+
+    def _copy(self, rows, aliases):
+        for alias in aliases:
+            with transaction.atomic(using=alias):
+                for row in rows:
+                    row.save_base(using=alias, raw=True)
@@ -0,0 +1,22 @@
+"""
+Index the expiry of outstanding refresh tokens, so prune_tokens finds
+expired rows without scanning the table. The table belongs to
+rest_framework_simplejwt's token_blacklist app, hence the raw SQL.
+"""
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_managers'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX outstanding_token_expires_idx '
+            'ON token_blacklist_outstandingtoken (expires_at)',
+            'DROP INDEX outstanding_token_expires_idx',
+        ),
+    ]
@@ -1,6 +1,32 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.db import models
 
+from djezzy_pos.sharding import ReferenceQuerySet, copy_to_shards, delete_from_shards
+
+
+class UserQuerySet(ReferenceQuerySet):
+    """
+    Bulk writes that also expire the cached users (see accounts.authentication)
+    and are copied to the shards.
+    """
+
+    def _touch(self):
+        from .authentication import touch_user
+        for user_id in self.values_list('pk', flat=True):
+            touch_user(user_id, using=self.db)
+
+    def update(self, **kwargs):
+        self._touch()
+        return super().update(**kwargs)
+
+    def delete(self):
+        self._touch()
+        return super().delete()
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     """Custom User model for Djezzy POS."""
@@ -35,10 +61,31 @@ class User(AbstractUser):
         verbose_name='Derniere modification'
     )
 
+    objects = UserManager()
+
     class Meta:
         verbose_name = 'Utilisateur'
         verbose_name_plural = 'Utilisateurs'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['role'], name='user_role_idx'),
+            models.Index(fields=['store_location'], name='user_store_location_idx'),
+            models.Index(fields=['is_active'], name='user_is_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_full_name() or self.username} ({self.get_role_display()})"
+
+    def save(self, *args, **kwargs):
+        from .authentication import touch_user
+        super().save(*args, **kwargs)
+        touch_user(self.pk, using=kwargs.get('using'))
+        # Shards only need the columns of their joins, not each login time
+        if set(kwargs.get('update_fields') or ()) != {'last_login'}:
+            copy_to_shards(User, [self.pk], using=kwargs.get('using'))
+
+    def delete(self, *args, **kwargs):
+        from .authentication import touch_user
+        touch_user(self.pk, using=kwargs.get('using'))
+        delete_from_shards(User, [self.pk], using=kwargs.get('using'))
+        return super().delete(*args, **kwargs)
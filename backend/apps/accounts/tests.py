@@ -0,0 +1,88 @@
+from unittest import skipUnless
+
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from apps.accounts.authentication import _namespace, cached_user
+from apps.accounts.throttling import LoginIPThrottle
+
+from djezzy_pos.cache import versioned_key
+
+from .models import User
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+# The fakeredis backend of settings, shared like Redis
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'djezzy_pos.cache.RedisCache',
+        'LOCATION': 'redis://fakeredis:6379/1',
+        'OPTIONS': {'connection_class': fakeredis.FakeConnection} if fakeredis else {},
+    },
+}
+
+
+class CachedUserTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='agent', password='secret-password')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'djezzy_pos.cache.LocMemCache'}})
+    def test_process_local_cache_is_not_used(self):
+        # Other workers would not see the deactivation
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(cached_user(self.user.pk), self.user)
+
+    @skipUnless(fakeredis, 'needs fakeredis')
+    @override_settings(CACHES=SHARED_CACHE)
+    def test_shared_cache_expires_on_change(self):
+        self.addCleanup(caches['default'].clear)
+        cached_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(cached_user(self.user.pk).is_active)
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(cached_user(self.user.pk).is_active)
+
+    @skipUnless(fakeredis, 'needs fakeredis')
+    @override_settings(CACHES=SHARED_CACHE)
+    def test_password_hash_is_not_cached(self):
+        self.addCleanup(caches['default'].clear)
+        cached_user(self.user.pk)
+        cached = caches['default'].get(versioned_key(_namespace(self.user.pk)))
+        self.assertNotIn('password', cached)
+        self.assertNotIn(self.user.password, repr(cached))
+
+        user = cached_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.username, user.role, user.is_active), ('agent', 'agent', True))
+        # Deferred fields are loaded on use, and saving keeps the others intact
+        self.assertTrue(user.check_password('secret-password'))
+        user.first_name = 'Amina'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Amina')
+        self.assertTrue(self.user.check_password('secret-password'))
+
+
+class ThrottleIdentTests(SimpleTestCase):
+
+    def ident(self, forwarded_for):
+        request = RequestFactory().post(
+            '/api/auth/login/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for
+        )
+        return LoginIPThrottle().ident(request)
+
+    def test_forwarded_for_ignored_without_proxy(self):
+        self.assertEqual(self.ident('1.2.3.4'), '10.0.0.1')
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_spoofed_entries_skipped_behind_proxy(self):
+        # nginx appends the address it saw to what the client sent
+        self.assertEqual(self.ident('1.2.3.4, 203.0.113.7'), '203.0.113.7')
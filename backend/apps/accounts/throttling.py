@@ -0,0 +1,96 @@
+"""
+Throttles for the login, token and password endpoints.
+
+Logging in runs the password hasher, which costs hundreds of milliseconds
+of CPU. These throttles are checked before any credential is looked at:
+each check is one cache read, keyed by client IP, by submitted username
+(or authenticated user) and by the X-Device-ID header the apps may send.
+Counters live in the THROTTLE_CACHE cache, which must be shared between
+workers for the limits to hold across them. Rates are the
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] entries named by `scope`.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def _digest(value):
+    # Usernames and device ids are client input; hash them into safe cache keys
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:32]
+
+
+class _Throttle(SimpleRateThrottle):
+    cache = caches[settings.THROTTLE_CACHE]
+
+    def ident(self, request):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.ident(request)
+        if ident is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class _IPThrottle(_Throttle):
+    def ident(self, request):
+        return self.get_ident(request)
+
+
+class _UserThrottle(_Throttle):
+    def ident(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'id:{user.pk}'
+        username = getattr(request, 'data', request.POST).get('username')
+        if not isinstance(username, str) or not username.strip():
+            return None
+        return _digest(username.strip().lower())
+
+
+class _DeviceThrottle(_Throttle):
+    def ident(self, request):
+        device = request.META.get('HTTP_X_DEVICE_ID')
+        return _digest(device) if device else None
+
+
+class LoginIPThrottle(_IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginUserThrottle(_UserThrottle):
+    scope = 'login_user'
+
+
+class LoginDeviceThrottle(_DeviceThrottle):
+    scope = 'login_device'
+
+
+class RefreshIPThrottle(_IPThrottle):
+    scope = 'refresh_ip'
+
+
+class RefreshDeviceThrottle(_DeviceThrottle):
+    scope = 'refresh_device'
+
+
+class PasswordChangeThrottle(_UserThrottle):
+    scope = 'password_change'
+
+
+LOGIN_THROTTLES = [LoginIPThrottle, LoginUserThrottle, LoginDeviceThrottle]
+REFRESH_THROTTLES = [RefreshIPThrottle, RefreshDeviceThrottle]
+
+
+def throttle_wait(request, throttle_classes, view=None):
+    """
+    Check throttles outside DRF views. Returns None when the request may go
+    on, else the number of seconds to wait.
+    """
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, view):
+            return throttle.wait() or 1
+    return None
@@ -0,0 +1,135 @@
+"""
+Refresh token rotation with a bounded, cached blacklist.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh
+blacklists the presented token and records the new one. The stock
+serializer loads the user three times and uses get_or_create for each
+row; this one resolves the user from the auth cache, inserts the rows
+directly and remembers blacklisted ids in the cache until they expire, so
+replayed tokens are refused without a query. `prune_expired_tokens`
+keeps both tables to the tokens that can still be presented.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from .authentication import cached_user
+from .throttling import LOGIN_THROTTLES, REFRESH_THROTTLES
+
+
+def _blacklist_key(jti):
+    return f'auth:blacklisted:{jti}'
+
+
+def _remember_blacklisted(jti, exp):
+    ttl = int((datetime_from_epoch(exp) - timezone.now()).total_seconds())
+    if ttl > 0:
+        cache.set(_blacklist_key(jti), True, ttl)
+
+
+class CachedRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check looks in the cache first."""
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if cache.get(_blacklist_key(jti)):
+            raise TokenError(_('Token is blacklisted'))
+        super().check_blacklist()
+
+
+def _outstanding(token, user):
+    """Insert the outstanding row of a freshly issued refresh token."""
+    return OutstandingToken.objects.create(
+        user=user,
+        jti=token[api_settings.JTI_CLAIM],
+        token=str(token),
+        created_at=token.current_time,
+        expires_at=datetime_from_epoch(token['exp']),
+    )
+
+
+def _blacklist(token, user):
+    """
+    Blacklist a refresh token, inside the caller's transaction. Fails if the
+    token was blacklisted concurrently, so it can only be rotated once.
+    """
+    jti = token[api_settings.JTI_CLAIM]
+    outstanding = OutstandingToken.objects.filter(jti=jti).only('id').first()
+    if outstanding is None:
+        # Issued before the blacklist was enabled
+        outstanding = _outstanding(token, user)
+    try:
+        BlacklistedToken.objects.create(token=outstanding)
+    except IntegrityError:
+        # The caller's transaction is rolled back by this error
+        raise TokenError(_('Token is blacklisted'))
+    transaction.on_commit(lambda: _remember_blacklisted(jti, token['exp']))
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user = None
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user = cached_user(user_id)
+            if not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(
+                    self.error_messages['no_active_account'],
+                    'no_active_account',
+                )
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            with transaction.atomic():
+                if api_settings.BLACKLIST_AFTER_ROTATION:
+                    _blacklist(refresh, user)
+                refresh.set_jti()
+                refresh.set_exp()
+                refresh.set_iat()
+                _outstanding(refresh, user)
+            data['refresh'] = str(refresh)
+
+        return data
+
+
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    """Login endpoint, throttled before the password is checked."""
+    throttle_classes = LOGIN_THROTTLES
+
+
+class RotatingTokenRefreshView(TokenRefreshView):
+    """Token refresh endpoint using `RotatingTokenRefreshSerializer`."""
+    serializer_class = RotatingTokenRefreshSerializer
+    throttle_classes = REFRESH_THROTTLES
+
+
+def prune_expired_tokens(grace=timedelta(0), batch_size=5000):
+    """
+    Delete outstanding tokens (and their blacklist rows) that expired more
+    than `grace` ago, in batches. Returns the number of tokens deleted.
+    """
+    cutoff = timezone.now() - grace
+    expired = OutstandingToken.objects.filter(expires_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(expired.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
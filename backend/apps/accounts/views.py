@@ -1,9 +1,13 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from djezzy_pos.db_router import replica_view
 
+from .throttling import PasswordChangeThrottle
 from .serializers import (
     UserSerializer, UserCreateSerializer,
     UserUpdateSerializer, ChangePasswordSerializer
@@ -12,6 +16,46 @@ from .serializers import (
 User = get_user_model()
 
 
+class UserPagination(PageNumberPagination):
+    """Page through users with ?page= and ?page_size= (at most 100)."""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def _filter_users(users, params):
+    """Apply the search, active and store filters of the user list."""
+    search = params.get('search', '').strip()
+    if search:
+        users = users.filter(
+            Q(username__icontains=search) | Q(first_name__icontains=search) |
+            Q(last_name__icontains=search) | Q(email__icontains=search) |
+            Q(store_location__icontains=search)
+        )
+    is_active = params.get('is_active')
+    if is_active in ('true', 'false'):
+        users = users.filter(is_active=is_active == 'true')
+    return users
+
+
+def _users_summary(users):
+    """Users per role and per store, from a single grouped query."""
+    roles = dict.fromkeys([role for role, _ in User.ROLE_CHOICES], 0)
+    stores = {}
+    grouped = users.values('role', 'store_location').annotate(total=Count('id')).order_by()
+    for item in grouped:
+        roles[item['role']] = roles.get(item['role'], 0) + item['total']
+        store = item['store_location']
+        stores[store] = stores.get(store, 0) + item['total']
+    return {
+        'total': sum(roles.values()),
+        'roles': roles,
+        'stores': [
+            {'store_location': store, 'count': count}
+            for store, count in sorted(stores.items(), key=lambda item: (-item[1], item[0]))
+        ],
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def current_user(request):
@@ -37,6 +81,7 @@ def update_profile(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([PasswordChangeThrottle])
 def change_password(request):
     """Change the current user's password."""
     serializer = ChangePasswordSerializer(data=request.data)
@@ -54,11 +99,29 @@ def change_password(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@replica_view
 def list_users(request):
-    """List all users (admin only)."""
-    users = User.objects.all()
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    """
+    List users, paginated (admin only).
+    Filters: search (name, username, email or store), role, store, is_active.
+    The summary counts users per role and per store for the search and
+    is_active filters, so the role and store filters can show their counts.
+    """
+    users = _filter_users(User.objects.all(), request.query_params)
+    summary = _users_summary(users)
+
+    role = request.query_params.get('role')
+    if role:
+        users = users.filter(role=role)
+    store = request.query_params.get('store')
+    if store:
+        users = users.filter(store_location=store)
+
+    paginator = UserPagination()
+    page = paginator.paginate_queryset(users.order_by('-created_at', '-id'), request)
+    response = paginator.get_paginated_response(UserSerializer(page, many=True).data)
+    response.data['summary'] = summary
+    return response
 
 
 @api_view(['POST'])
@@ -0,0 +1,272 @@
+"""
+Sales analytics over the daily sales rollup, and the admin dashboard summary.
+
+Each request runs a single aggregate query. Dimensions that exist in the
+`DailySales` rollup (agent, store, offer, period) are answered from it;
+customer location dimensions (daira, baladia) fall back to `Contract`,
+restricted to an indexed `sale_date` range. Results are cached per
+parameter set under the current sales version stamp.
+
+The dashboard summary counts every tile of the admin home page with one
+aggregate query per table and keeps the result in the cache for a few
+seconds.
+
+With regional shards, the sales and number queries run on every shard at
+once (`scatter`) and their rows are merged here.
+"""
+import hashlib
+import json
+from collections import Counter
+from datetime import date, timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.contracts.models import Contract, DailySales
+from apps.contracts.services import sales_version
+from apps.offers.models import Offer
+from apps.phone_numbers.models import PhoneNumber
+from djezzy_pos.sharding import scatter
+
+GROUP_BY = ['agent', 'store', 'offer', 'daira', 'baladia', 'day', 'week', 'month']
+PERIODS = ['day', 'week', 'month']
+STATUSES = ['validated', 'signed', 'draft', 'cancelled', 'all']
+CONTRACT_ONLY = {'daira', 'baladia'}
+
+DEFAULT_DAYS = 30
+MAX_CONTRACT_DAYS = 366
+
+# Per source: output key -> model field
+ROLLUP_FIELDS = {
+    'agent': 'agent_id',
+    'agent_name': 'agent__username',
+    'store': 'store_location',
+    'offer': 'offer__code',
+    'offer_name': 'offer__name',
+    'date': 'day',
+}
+CONTRACT_FIELDS = {
+    'agent': 'created_by_id',
+    'agent_name': 'created_by__username',
+    'store': 'store_location',
+    'offer': 'offer__code',
+    'offer_name': 'offer__name',
+    'daira': 'customer_daira',
+    'baladia': 'customer_baladia',
+    'date': 'sale_date',
+}
+DIMENSION_KEYS = {
+    'agent': ['agent', 'agent_name'],
+    'offer': ['offer', 'offer_name'],
+}
+
+
+class AnalyticsError(ValueError):
+    """Raised for invalid analytics parameters."""
+
+
+def parse_params(params):
+    """Validate query parameters into a normalized dict."""
+    group_by = [name for name in params.get('group_by', '').split(',') if name]
+    unknown = [name for name in group_by if name not in GROUP_BY]
+    if unknown:
+        raise AnalyticsError(f"Parametre group_by invalide: {', '.join(unknown)}")
+    if len(set(group_by)) != len(group_by) or len(set(group_by) & set(PERIODS)) > 1:
+        raise AnalyticsError('Parametre group_by invalide: dimensions en double.')
+
+    status = params.get('status', 'validated')
+    if status not in STATUSES:
+        raise AnalyticsError('Parametre status invalide.')
+
+    try:
+        date_to = date.fromisoformat(params['date_to']) if params.get('date_to') else timezone.localdate()
+        date_from = (
+            date.fromisoformat(params['date_from']) if params.get('date_from')
+            else date_to - timedelta(days=DEFAULT_DAYS - 1)
+        )
+        agent = int(params['agent']) if params.get('agent') else None
+    except ValueError:
+        raise AnalyticsError('Parametres de filtre invalides.')
+    if date_from > date_to:
+        raise AnalyticsError('date_from doit preceder date_to.')
+
+    query = {
+        'group_by': group_by,
+        'status': status,
+        'date_from': date_from,
+        'date_to': date_to,
+        'agent': agent,
+        'store': params.get('store') or None,
+        'offer': params.get('offer') or None,
+        'daira': params.get('daira') or None,
+        'baladia': params.get('baladia') or None,
+    }
+    if uses_contracts(query) and (date_to - date_from).days >= MAX_CONTRACT_DAYS:
+        raise AnalyticsError(
+            f'Periode limitee a {MAX_CONTRACT_DAYS} jours pour les groupements daira/baladia.'
+        )
+    return query
+
+
+def uses_contracts(query):
+    """Whether the query needs contract-level columns missing from the rollup."""
+    return bool(
+        CONTRACT_ONLY & set(query['group_by'])
+        or query['daira'] or query['baladia']
+    )
+
+
+def _aggregate(query):
+    """Run the aggregate query and return its rows."""
+    if uses_contracts(query):
+        queryset, fields = Contract.objects.all(), CONTRACT_FIELDS
+        metrics = {'count': Count('id'), 'revenue': Sum('price')}
+    else:
+        queryset, fields = DailySales.objects.exclude(count=0), ROLLUP_FIELDS
+        metrics = {'count': Sum('count'), 'revenue': Sum('revenue')}
+
+    filters = {
+        f"{fields['date']}__gte": query['date_from'],
+        f"{fields['date']}__lte": query['date_to'],
+    }
+    if query['status'] != 'all':
+        filters['status'] = query['status']
+    for name in ['agent', 'store', 'offer', 'daira', 'baladia']:
+        if query[name] is not None:
+            filters[fields[name]] = query[name]
+    queryset = queryset.filter(**filters)
+
+    # Output keys are prefixed so they cannot clash with model field names
+    columns = {}
+    for name in query['group_by']:
+        if name == 'day':
+            columns['g_period'] = F(fields['date'])
+        elif name == 'week':
+            columns['g_period'] = TruncWeek(fields['date'])
+        elif name == 'month':
+            columns['g_period'] = TruncMonth(fields['date'])
+        else:
+            for key in DIMENSION_KEYS.get(name, [name]):
+                columns[f'g_{key}'] = F(fields[key])
+
+    metrics = {f'm_{name}': metric for name, metric in metrics.items()}
+    if not columns:
+        return [queryset.aggregate(**metrics)]
+    ordering = ['g_period', '-m_count'] if 'g_period' in columns else ['-m_count']
+    return queryset.values(**columns).annotate(**metrics).order_by(*ordering)
+
+
+def _gather(query):
+    """Rows of `_aggregate` on every shard, merged and ordered as one query's."""
+    parts = scatter(lambda: list(_aggregate(query)))
+    if len(parts) == 1:
+        return parts[0]
+    merged = {}
+    for row in chain.from_iterable(parts):
+        key = tuple((name, value) for name, value in row.items() if name.startswith('g_'))
+        total = merged.setdefault(key, {**dict(key), 'm_count': 0, 'm_revenue': 0})
+        total['m_count'] += row['m_count'] or 0
+        total['m_revenue'] += row['m_revenue'] or 0
+    rows = sorted(merged.values(), key=lambda row: -row['m_count'])
+    if rows and 'g_period' in rows[0]:
+        rows.sort(key=lambda row: row['g_period'])
+    return rows
+
+
+def _format_row(row, period):
+    item = {}
+    for key, value in row.items():
+        name = key[2:]
+        if key == 'g_period':
+            value = value.strftime('%Y-%m') if period == 'month' else value.isoformat()
+            name = period
+        elif key == 'm_count':
+            value = value or 0
+        elif key == 'm_revenue':
+            value = float(value or 0)
+        item[name] = value
+    return item
+
+
+def run_analytics(query):
+    """Run an analytics query, served from the cache when possible."""
+    encoded = json.dumps(query, sort_keys=True, default=str).encode('utf-8')
+    key = f'analytics:{sales_version()}:{hashlib.sha256(encoded).hexdigest()}'
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    period = next((name for name in query['group_by'] if name in PERIODS), None)
+    results = [_format_row(row, period) for row in _gather(query)]
+    result = {
+        'group_by': query['group_by'],
+        'status': query['status'],
+        'date_from': query['date_from'].isoformat(),
+        'date_to': query['date_to'].isoformat(),
+        'source': 'contracts' if uses_contracts(query) else 'rollup',
+        'totals': {
+            'count': sum(item['count'] for item in results),
+            'revenue': float(sum(item['revenue'] for item in results)),
+        },
+        'results': results,
+    }
+    cache.set(key, result, settings.ANALYTICS_CACHE_TIMEOUT)
+    return result
+
+
+SUMMARY_CACHE_KEY = 'dashboard:summary'
+
+
+def _shard_counts():
+    """Numbers and contracts per status on the current shard."""
+    phones = {
+        item['status']: item['count']
+        for item in PhoneNumber.objects.values('status').annotate(count=Count('id')).order_by()
+    }
+    contracts = {
+        item['status']: item['total']
+        for item in DailySales.objects.values('status').annotate(total=Sum('count')).order_by()
+    }
+    return phones, contracts
+
+
+def dashboard_summary():
+    """Counts shown on the admin dashboard tiles, cached for a short time."""
+    summary = cache.get(SUMMARY_CACHE_KEY)
+    if summary is not None:
+        return summary
+
+    users = User.objects.aggregate(
+        total=Count('id'),
+        agents=Count('id', filter=Q(role='agent')),
+        managers=Count('id', filter=Q(role='manager')),
+    )
+    offers = Offer.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+    )
+    phones, contracts = Counter(), Counter()
+    for shard_phones, shard_contracts in scatter(_shard_counts):
+        phones.update(shard_phones)
+        contracts.update(shard_contracts)
+
+    summary = {
+        'users': users,
+        'offers': offers,
+        'phones': {
+            'total': sum(phones.values()),
+            'available': phones.get('available', 0),
+            'distributed': phones.get('assigned', 0),
+        },
+        'contracts': {
+            'total': sum(contracts.values()),
+            'validated': contracts.get('validated', 0),
+        },
+    }
+    cache.set(SUMMARY_CACHE_KEY, summary, settings.DASHBOARD_SUMMARY_CACHE_TIMEOUT)
+    return summary
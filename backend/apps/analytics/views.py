@@ -0,0 +1,31 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from djezzy_pos.db_router import replica_view
+from .services import AnalyticsError, dashboard_summary, parse_params, run_analytics
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@replica_view
+def sales_analytics(request):
+    """
+    Sales counts and revenue across the network (admin only).
+    group_by: comma-separated agent, store, offer, daira, baladia, day, week, month
+    Filters: date_from, date_to (YYYY-MM-DD, default last 30 days), status
+    (default validated, or all), agent (user id), store, offer (code), daira, baladia
+    """
+    try:
+        query = parse_params(request.query_params)
+    except AnalyticsError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(run_analytics(query))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@replica_view
+def summary(request):
+    """Counts for the admin dashboard tiles (users, offers, numbers, contracts)."""
+    return Response(dashboard_summary())
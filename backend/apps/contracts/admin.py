@@ -1,7 +1,9 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from .models import Contract
+from .models import Contract, DailySales
+from .services import stream_contract_pdfs_zip
 import base64
 
 
@@ -11,21 +13,21 @@ class ContractAdmin(admin.ModelAdmin):
         'contract_number', 'customer_full_name', 'offer_display',
         'phone_number_display', 'status_badge', 'email_sent_display', 'created_at'
     ]
-    list_filter = ['status', 'email_sent', 'offer', 'created_at']
+    list_filter = ['status', 'email_sent', 'offer', 'store_location', 'sale_date']
     search_fields = [
         'contract_number', 'customer_first_name', 'customer_last_name',
         'customer_nin', 'customer_id_number', 'customer_email'
     ]
     readonly_fields = [
-        'contract_number', 'signature_preview', 'photo_preview',
-        'created_at', 'updated_at', 'signed_at', 'email_sent_at'
+        'contract_number', 'price', 'currency', 'store_location', 'signature_preview', 'photo_preview',
+        'created_at', 'sale_date', 'updated_at', 'signed_at', 'email_sent_at'
     ]
-    date_hierarchy = 'created_at'
+    date_hierarchy = 'sale_date'
     ordering = ['-created_at']
 
     fieldsets = [
         ('Contrat', {
-            'fields': ['contract_number', 'status', 'offer', 'phone_number']
+            'fields': ['contract_number', 'status', 'offer', ('price', 'currency'), 'phone_number']
         }),
         ('Client - Identite', {
             'fields': [
@@ -49,7 +51,7 @@ class ContractAdmin(admin.ModelAdmin):
             'classes': ['collapse']
         }),
         ('Metadata', {
-            'fields': ['created_by', 'created_at', 'updated_at', 'signed_at'],
+            'fields': [('created_by', 'store_location'), ('created_at', 'sale_date'), 'updated_at', 'signed_at'],
             'classes': ['collapse']
         }),
     ]
@@ -112,16 +114,16 @@ class ContractAdmin(admin.ModelAdmin):
             )
         return "Pas de photo"
 
-    actions = ['validate_contracts', 'cancel_contracts', 'send_emails']
+    actions = ['validate_contracts', 'cancel_contracts', 'send_emails', 'export_pdfs']
 
     @admin.action(description='Valider les contrats selectionnes')
     def validate_contracts(self, request, queryset):
-        updated = queryset.filter(status='signed').update(status='validated')
+        updated = queryset.filter(status='signed').set_status('validated')
         self.message_user(request, f'{updated} contrat(s) valide(s).')
 
     @admin.action(description='Annuler les contrats selectionnes')
     def cancel_contracts(self, request, queryset):
-        updated = queryset.exclude(status='cancelled').update(status='cancelled')
+        updated = queryset.set_status('cancelled')
         self.message_user(request, f'{updated} contrat(s) annule(s).')
 
     @admin.action(description='Envoyer les emails')
@@ -134,3 +136,32 @@ class ContractAdmin(admin.ModelAdmin):
                 contract.mark_email_sent()
                 count += 1
         self.message_user(request, f'{count} email(s) envoye(s).')
+
+    @admin.action(description='Telecharger les PDF (ZIP)')
+    def export_pdfs(self, request, queryset):
+        response = StreamingHttpResponse(
+            stream_contract_pdfs_zip(queryset),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="contrats.zip"'
+        return response
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    """Read-only view of the daily sales rollup, with date drill-down."""
+
+    list_display = ['day', 'agent', 'store_location', 'offer', 'status', 'count', 'revenue']
+    list_filter = ['status', 'offer', 'store_location']
+    list_select_related = ['agent', 'offer']
+    date_hierarchy = 'day'
+    ordering = ['-day']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import pre_delete
 
 
 class ContractsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.contracts'
     verbose_name = 'Contrats'
+
+    def ready(self):
+        from .services.sales_rollup import agent_deleted
+        pre_delete.connect(
+            agent_deleted, sender=settings.AUTH_USER_MODEL, dispatch_uid='contracts.agent_deleted'
+        )
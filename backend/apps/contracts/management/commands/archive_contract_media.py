@@ -0,0 +1,137 @@
+"""
+Management command to move the media of old contracts to the archive.
+
+PDFs and photos of contracts sold more than --months months ago are moved
+from MEDIA_ROOT to the cold storage (ARCHIVE_STORAGE), gzipped when that
+saves space, by a pool of threads. Reads fall back to the archive, so the
+API serves archived files unchanged. Progress is saved to a checkpoint file
+so an interrupted run can be resumed with --resume, which also retries the
+contracts that failed. Meant to run from cron.
+"""
+
+import calendar
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.contracts.management.resumable import ResumableJobs
+from apps.contracts.models import Contract
+from apps.contracts.services.archive import archive_contract
+from apps.contracts.services.blobs import is_blob
+from djezzy_pos.sharding import shards
+
+
+def _months_before(day, months):
+    index = day.year * 12 + day.month - 1 - months
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+class Command(BaseCommand):
+    help = 'Move the media of old contracts to the archive storage (parallel, resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=settings.ARCHIVE_AFTER_MONTHS,
+            help=f'Archive contracts sold more than this many months ago '
+                 f'(default: {settings.ARCHIVE_AFTER_MONTHS})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of contracts archived at the same time (default: 4)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=str(Path(settings.BASE_DIR) / 'archive_contract_media.checkpoint.json'),
+            help='Checkpoint file used to resume an interrupted run'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Resume from the checkpoint, retrying failed contracts, instead of starting over'
+        )
+
+    def handle(self, *args, **options):
+        before = _months_before(timezone.localdate(), options['months'])
+        checkpoint_path = Path(options['checkpoint'])
+        state = {'before': before.isoformat(), 'last_ids': {}, 'files': 0,
+                 'size': 0, 'stored': 0, 'failed': []}
+
+        if options['resume'] and checkpoint_path.exists():
+            # Keep the cut-off of the interrupted run, even on a later day
+            state = json.loads(checkpoint_path.read_text())
+            before = date.fromisoformat(state['before'])
+            self.stdout.write(f'Resuming the run for contracts sold before {before}')
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Archiving the media of contracts sold before {before} '
+                          f'to {settings.ARCHIVE_STORAGE} storage with {workers} workers...')
+        started = time.monotonic()
+        processed = failed = 0
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='archive') as executor:
+            for alias in shards():
+                jobs = self._archive_shard(executor, workers, alias, before, state, checkpoint_path)
+                processed += jobs.processed
+                failed += jobs.failed
+
+        elapsed = time.monotonic() - started
+        saved = state['size'] - state['stored']
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nDone! Contracts: {processed - failed}, "
+                f"files archived: {state['files']} ({state['size'] / 1e6:.1f} MB, "
+                f'{saved / 1e6:.1f} MB saved by compression) in {elapsed:.1f}s'
+            )
+        )
+        if state['failed']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Failed: {len(state['failed'])} (saved in {checkpoint_path}, retried by --resume)"
+                )
+            )
+        else:
+            checkpoint_path.unlink(missing_ok=True)
+
+    def _archive_shard(self, executor, workers, alias, before, state, checkpoint_path):
+        """Archive the contracts of one shard; returns its jobs, for their counts."""
+        def archived(contract_id, number, result):
+            files, size, stored = result
+            state['files'] += files
+            state['size'] += size
+            state['stored'] += stored
+
+        def failed(contract_id, number, exc):
+            self.stderr.write(f'  Contract {number}: {exc}')
+
+        def report(processed):
+            self.stdout.write(f'  {alias}: {processed} contracts')
+
+        jobs = ResumableJobs(checkpoint_path, state, alias, archived, failed, report)
+        rows = Contract.objects.using(alias).filter(
+            Q(pk__gt=jobs.last_id) | Q(pk__in=jobs.failed_ids), sale_date__lt=before
+        ).order_by('pk').values_list('pk', 'contract_number', *Contract.FILE_FIELDS)
+
+        try:
+            for contract_id, number, *files in rows.iterator(chunk_size=2000):
+                # Bounded: the queryset is streamed, not submitted all at once
+                while len(jobs) >= workers * 2:
+                    jobs.step(block=True)
+                blobs = [name for name in files if is_blob(name)]
+                jobs.add(contract_id, executor.submit(archive_contract, number, blobs), number)
+            jobs.drain()
+        finally:
+            jobs.close()
+        return jobs
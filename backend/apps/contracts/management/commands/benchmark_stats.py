@@ -0,0 +1,158 @@
+"""
+Management command to benchmark the contract statistics endpoints.
+
+Seeds one agent with a large contract history inside a transaction, times
+the stats endpoints, then rolls everything back.
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import User
+from apps.contracts.models import Contract
+from apps.contracts.services import rebuild_daily_sales
+from apps.contracts.views import ContractViewSet
+from apps.offers.models import Offer
+from apps.phone_numbers.models import PhoneNumber
+
+ENDPOINTS = [
+    ('my-stats', 'my_stats'),
+    ('stats', 'stats'),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def _explicit_created_at():
+    """Let bulk_create keep the seeded created_at values."""
+    field = Contract._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Benchmark contract statistics endpoints on a seeded history (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contracts',
+            type=int,
+            default=100000,
+            help='Number of contracts to seed for the benchmark agent (default: 100000)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Spread the contracts over this many days (default: 365)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=20,
+            help='Timed calls per endpoint (default: 20)'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Also print the query plans of the sale_date day and month filters'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                agent = self._seed(options['contracts'], options['days'])
+                self._run(agent, options['runs'])
+                if options['explain']:
+                    self._explain(agent)
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write(self.style.WARNING('\nBenchmark data rolled back.'))
+
+    def _seed(self, count, days):
+        self.stdout.write(f'Seeding {count} contracts over {days} days...')
+        agent = User.objects.create(username='benchmark_agent', role='agent')
+        offers = [
+            Offer.objects.create(name=f'BENCH {price}', code=f'BENCH{price}', price=price)
+            for price in (100, 500, 1000, 1500, 2500)
+        ]
+        phone = PhoneNumber.objects.create(number='0799999999', status='assigned')
+
+        now = timezone.now()
+        random.seed(42)
+        with _explicit_created_at():
+            batch = []
+            for i in range(count):
+                offer = random.choice(offers)
+                created_at = now - timedelta(seconds=random.randint(0, days * 86400))
+                batch.append(Contract(
+                    contract_number=f'BENCH-{i:08d}',
+                    customer_first_name='Bench',
+                    customer_last_name='Mark',
+                    customer_nin=str(i),
+                    offer=offer,
+                    price=offer.price,
+                    phone_number=phone,
+                    created_by=agent,
+                    created_at=created_at,
+                    sale_date=timezone.localdate(created_at),
+                ))
+                if len(batch) == 5000:
+                    Contract.objects.bulk_create(batch)
+                    batch = []
+            Contract.objects.bulk_create(batch)
+        # bulk_create bypasses Contract.save, so roll the seeded days up here
+        rebuild_daily_sales((now - timedelta(days=days)).date(), timezone.localdate())
+        return agent
+
+    def _run(self, agent, runs):
+        factory = APIRequestFactory()
+        self.stdout.write(f'\n{"endpoint":<12} {"queries":>8} {"p50 ms":>9} {"p95 ms":>9}')
+        for url_path, action in ENDPOINTS:
+            view = ContractViewSet.as_view({'get': action})
+            timings = []
+            for _ in range(runs):
+                request = factory.get(f'/api/contracts/{url_path}/')
+                force_authenticate(request, user=agent)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    view(request)
+                    timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{url_path:<12} {len(queries.captured_queries):>8} '
+                f'{statistics.median(timings):>9.1f} {p95:>9.1f}'
+            )
+
+    def _explain(self, agent):
+        """Print query plans and check that the sale_date indexes are used."""
+        today = timezone.localdate()
+        month_start = today.replace(day=1)
+        queries = [
+            ('today', Contract.objects.filter(sale_date=today), 'contract_sale_date_idx'),
+            ('agent month', Contract.objects.filter(created_by=agent, sale_date__gte=month_start),
+             'contract_agent_sale_date_idx'),
+            ('month revenue', Contract.objects.filter(status='validated', sale_date__gte=month_start),
+             'contract_revenue_idx'),
+        ]
+        for label, queryset, index in queries:
+            plan = queryset.order_by().values('price').explain()
+            style = self.style.SUCCESS if index in plan else self.style.ERROR
+            self.stdout.write(style(f'\n{label}: {"uses" if index in plan else "does not use"} {index}'))
+            self.stdout.write(plan)
@@ -0,0 +1,52 @@
+"""
+Management command to delete the content-addressed media no contract uses.
+
+Blobs (see apps.contracts.services.blobs) are counted as contracts point
+to them and are deleted here once no contract of any shard does, and they
+have not been stored or referenced for --grace-hours. Run it daily from
+cron. --recount first recomputes the counts from the contracts, after
+editing contract files directly in the database.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.contracts.services.blobs import collect_garbage, recount_references
+from djezzy_pos.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Delete the content-addressed contract media that no contract references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Keep blobs stored or referenced within this many hours (default: 24)'
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute the reference counts from the contracts first'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many blobs would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            for alias in shards():
+                counted = recount_references(alias)
+                self.stdout.write(f'  {alias}: {counted} referenced blobs')
+
+        deleted = collect_garbage(
+            grace=timedelta(hours=options['grace_hours']), dry_run=options['dry_run']
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'\nDone! Unreferenced blobs to delete: {deleted}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'\nDone! Unreferenced blobs deleted: {deleted}'))
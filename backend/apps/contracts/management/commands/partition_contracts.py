@@ -0,0 +1,73 @@
+"""
+Management command to partition the contract table by month (PostgreSQL).
+
+Run once with --convert to rewrite an existing table (contract writes wait
+until it finishes; plan a quiet hour). Then run it daily from cron to create
+the partitions of the coming months. --explain shows which partitions the
+recent-data queries read.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.contracts.models import Contract
+from apps.contracts.services.partitions import (
+    PartitioningError, convert_to_partitioned, ensure_partitions, partitions,
+    partitions_scanned
+)
+from djezzy_pos.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Partition contracts by month of sale_date and create upcoming partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rewrite the existing contract table as a partitioned table'
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Months after the current one to create partitions for (default: 3)'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Show the partitions read by the recent-data queries'
+        )
+
+    def handle(self, *args, **options):
+        for alias in shards():
+            try:
+                if options['convert']:
+                    self.stdout.write(f'[{alias}] Converting contracts...')
+                    copied = convert_to_partitioned(options['months_ahead'], using=alias)
+                    self.stdout.write(f'[{alias}] Contracts copied: {copied}')
+                created = ensure_partitions(options['months_ahead'], using=alias)
+            except PartitioningError as e:
+                raise CommandError(str(e))
+            for name in created:
+                self.stdout.write(f'[{alias}] Created {name}')
+            if options['explain']:
+                self._explain(alias)
+
+        self.stdout.write(self.style.SUCCESS('\nDone! Partitions are up to date.'))
+
+    def _explain(self, alias):
+        today = timezone.localdate()
+        contracts = Contract.objects.using(alias)
+        queries = [
+            ('today', contracts.filter(sale_date=today)),
+            ('last 7 days', contracts.filter(sale_date__gte=today - timedelta(days=6))),
+            ('this month', contracts.filter(sale_date__gte=today.replace(day=1))),
+            ('agent month', contracts.filter(created_by_id=0, sale_date__gte=today.replace(day=1))),
+        ]
+        total = len(partitions(alias))
+        for name, queryset in queries:
+            scanned = partitions_scanned(queryset)
+            self.stdout.write(f'  {name:<12} {len(scanned):>3}/{total} partitions: {", ".join(scanned)}')
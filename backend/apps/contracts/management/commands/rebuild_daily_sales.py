@@ -0,0 +1,40 @@
+"""
+Management command to backfill or rebuild the daily sales rollup.
+
+Run once after deploying the rollup, and whenever rows have drifted
+(for example after editing contracts directly in the database). Every
+regional shard is rebuilt.
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from apps.contracts.services import rebuild_daily_sales
+from djezzy_pos.sharding import shards, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailySales rollup from contracts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=date.fromisoformat,
+            help='Only rebuild days on or after this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=date.fromisoformat,
+            help='Only rebuild days on or before this date (YYYY-MM-DD)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding daily sales rollup...')
+        written = 0
+        for alias in shards():
+            with use_shard(alias):
+                written += rebuild_daily_sales(options['date_from'], options['date_to'])
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Rows written: {written}'))
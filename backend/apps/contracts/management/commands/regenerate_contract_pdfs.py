@@ -0,0 +1,185 @@
+"""
+Management command to regenerate contract PDFs in parallel.
+
+Used after terms or branding changes. Contracts are streamed in primary key
+order, rendered in a process pool and stored as content-addressed files.
+Progress is saved to a checkpoint file so an interrupted run can be
+resumed with --resume, which also retries the contracts that failed.
+With regional shards, run it once per --region.
+"""
+
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+
+from apps.contracts.management.resumable import ResumableJobs
+from apps.contracts.models import Contract
+from apps.contracts.services import PDFRenderService
+from apps.contracts.services.blobs import replace_reference
+
+
+class Command(BaseCommand):
+    help = 'Regenerate contract PDFs with parallel workers (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=date.fromisoformat,
+            help='Only contracts created on or after this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=date.fromisoformat,
+            help='Only contracts created on or before this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--offer',
+            type=str,
+            help='Only contracts for this offer code'
+        )
+        parser.add_argument(
+            '--agent',
+            type=str,
+            help='Only contracts created by this username'
+        )
+        parser.add_argument(
+            '--region',
+            choices=sorted(settings.SHARD_REGIONS),
+            help='Regional shard holding the contracts (default: the primary database)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of render processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=str(Path(settings.BASE_DIR) / 'regenerate_contract_pdfs.checkpoint.json'),
+            help='Checkpoint file used to resume an interrupted run'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Resume from the checkpoint, retrying failed contracts, instead of starting over'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=settings.PDF_RENDER_TIMEOUT,
+            help='Per-contract render timeout in seconds'
+        )
+
+    def handle(self, *args, **options):
+        selection = {
+            'from': options['date_from'].isoformat() if options['date_from'] else None,
+            'to': options['date_to'].isoformat() if options['date_to'] else None,
+            'offer': options['offer'],
+            'agent': options['agent'],
+            'region': options['region'],
+        }
+        self.shard = settings.SHARD_REGIONS.get(options['region'], DEFAULT_DB_ALIAS)
+        checkpoint_path = Path(options['checkpoint'])
+        state = {'selection': selection, 'last_ids': {}, 'done': 0, 'failed': []}
+
+        if options['resume'] and checkpoint_path.exists():
+            saved = json.loads(checkpoint_path.read_text())
+            if saved.get('selection') != selection:
+                raise CommandError(
+                    'The checkpoint was written for a different selection: '
+                    f"{saved.get('selection')}"
+                )
+            state = saved
+
+        jobs = ResumableJobs(
+            checkpoint_path, state, self.shard, self._rendered, self._failed, self._progress
+        )
+        if jobs.last_id:
+            self.stdout.write(f'Resuming after contract id {jobs.last_id}, '
+                              f'retrying {len(jobs.failed_ids)} failed contracts')
+        self._state = state
+
+        contracts = self._select(options).filter(Q(pk__gt=jobs.last_id) | Q(pk__in=jobs.failed_ids))
+        total = contracts.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('No contracts to regenerate.'))
+            return
+
+        workers = max(1, options['workers'])
+        service = PDFRenderService(
+            workers=workers, max_pending=workers * 2, timeout=options['timeout']
+        )
+        self.stdout.write(f'Regenerating {total} contract PDFs with {workers} workers...')
+
+        self._total = total
+        self._started = started = time.monotonic()
+
+        try:
+            rows = contracts.order_by('pk').values_list('pk', 'pdf_file').iterator(chunk_size=2000)
+            for contract_id, current_name in rows:
+                future = service.submit(
+                    contract_id, action='replace', timeout=options['timeout'], block=True,
+                    using=self.shard
+                )
+                jobs.add(contract_id, future, current_name)
+            jobs.drain()
+        finally:
+            service.shutdown(wait=True)
+            jobs.close()
+
+        processed = jobs.processed
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nDone! Regenerated: {processed - jobs.failed} '
+                f'in {elapsed:.1f}s ({rate:.1f} contracts/sec)'
+            )
+        )
+        if state['failed']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Failed: {len(state['failed'])} (ids saved in {checkpoint_path}, retried by --resume)"
+                )
+            )
+        else:
+            checkpoint_path.unlink(missing_ok=True)
+
+    def _select(self, options):
+        """Build the contract queryset from the command options."""
+        contracts = Contract.objects.using(self.shard)
+        if options['date_from']:
+            contracts = contracts.filter(sale_date__gte=options['date_from'])
+        if options['date_to']:
+            contracts = contracts.filter(sale_date__lte=options['date_to'])
+        if options['offer']:
+            contracts = contracts.filter(offer__code=options['offer'])
+        if options['agent']:
+            contracts = contracts.filter(created_by__username=options['agent'])
+        return contracts
+
+    def _rendered(self, contract_id, current_name, name):
+        self._state['done'] += 1
+        if name != current_name:
+            with transaction.atomic(using=self.shard):
+                Contract.objects.using(self.shard).filter(pk=contract_id).update(pdf_file=name)
+                replace_reference(current_name, name, self.shard)
+
+    def _failed(self, contract_id, current_name, exc):
+        self.stderr.write(f'  Contract {contract_id}: {exc}')
+
+    def _progress(self, processed):
+        elapsed = time.monotonic() - self._started
+        self.stdout.write(
+            f'  {processed}/{self._total} ({processed / elapsed:.1f} contracts/sec)'
+        )
@@ -0,0 +1,124 @@
+"""
+Resumable runs of the contract batch commands.
+
+Contracts of a shard are streamed in primary key order and each one is
+handed to a pool (threads or render processes) as a future. Jobs finish
+out of order, so the checkpoint only records a low watermark per shard:
+the highest id below every job still in flight. Resuming from it may redo
+a few contracts, never skips one, so jobs must be safe to run twice.
+Failed contracts are listed in the checkpoint until a resumed run retries
+them successfully.
+"""
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class ResumableJobs:
+    """
+    Jobs of one shard, checkpointed to `path` every `interval` seconds.
+
+    `state` is the JSON saved in the checkpoint; the watermark is kept in
+    state['last_ids'][alias] and the failed contracts in state['failed'], as
+    [alias, id] pairs. `on_done(contract_id, context, result)` and
+    `on_error(contract_id, context, exc)` are called as jobs are collected,
+    `report(processed)` every few seconds.
+    """
+
+    def __init__(self, path, state, alias, on_done, on_error, report=None, interval=5):
+        self.path = path
+        self.state = state
+        self.alias = alias
+        self.on_done = on_done
+        self.on_error = on_error
+        self.report = report
+        self.interval = interval
+        self.processed = 0
+        self.failed = 0
+        self._pending = {}
+        self._finished = set()
+        self._saved_at = self._reported_at = time.monotonic()
+        state.setdefault('last_ids', {})
+        state.setdefault('failed', [])
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def last_id(self):
+        return self.state['last_ids'].get(self.alias, 0)
+
+    @property
+    def failed_ids(self):
+        """Contracts of the shard that failed in an earlier run, to retry."""
+        return [contract_id for alias, contract_id in self.state['failed'] if alias == self.alias]
+
+    def add(self, contract_id, future, context=None):
+        """Track the job of a contract, then collect the jobs already done."""
+        self._pending[contract_id] = (future, context)
+        self.step()
+
+    def step(self, block=False):
+        """Collect finished jobs, waiting for one if `block`, and checkpoint."""
+        futures = {future: contract_id for contract_id, (future, _) in self._pending.items()}
+        if block:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        else:
+            done = [future for future in futures if future.done()]
+
+        for future in done:
+            contract_id = futures[future]
+            context = self._pending.pop(contract_id)[1]
+            self._finished.add(contract_id)
+            self.processed += 1
+            entry = [self.alias, contract_id]
+            try:
+                result = future.result()
+            except Exception as exc:
+                self.failed += 1
+                if entry not in self.state['failed']:
+                    self.state['failed'].append(entry)
+                self.on_error(contract_id, context, exc)
+            else:
+                if entry in self.state['failed']:
+                    self.state['failed'].remove(entry)
+                self.on_done(contract_id, context, result)
+        self.checkpoint()
+        self._progress()
+
+    def drain(self):
+        """Wait for every pending job."""
+        while self._pending:
+            self.step(block=True)
+
+    def close(self):
+        """Cancel the jobs not started and save the checkpoint."""
+        for future, _ in self._pending.values():
+            future.cancel()
+        self.checkpoint(force=True)
+
+    def checkpoint(self, force=False):
+        """Advance the watermark and persist it atomically every few seconds."""
+        # Only ids below every in-flight job are known to be complete
+        low = min(self._pending) if self._pending else None
+        done_below = [i for i in self._finished if low is None or i < low]
+        if done_below:
+            self.state['last_ids'][self.alias] = max(self.last_id, max(done_below))
+            self._finished.difference_update(done_below)
+
+        now = time.monotonic()
+        if not force and now - self._saved_at < self.interval:
+            return
+        self._saved_at = now
+
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(json.dumps(self.state))
+        os.replace(tmp_path, self.path)
+
+    def _progress(self):
+        now = time.monotonic()
+        if self.report is None or now - self._reported_at < self.interval:
+            return
+        self._reported_at = now
+        self.report(self.processed)
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('offers', '0002_remove_is_featured'),
+        ('contracts', '0004_contract_customer_birth_place_ar_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('store_location', models.CharField(blank=True, max_length=100, verbose_name='Point de vente')),
+                ('status', models.CharField(max_length=20, verbose_name='Statut')),
+                ('count', models.IntegerField(default=0, verbose_name='Contrats')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Chiffre d'affaires")),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to=settings.AUTH_USER_MODEL, verbose_name='Agent')),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='offers.offer', verbose_name='Offre')),
+            ],
+            options={
+                'verbose_name': 'Ventes du jour',
+                'verbose_name_plural': 'Ventes par jour',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['agent', 'day'], name='daily_sales_agent_day')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysales',
+            constraint=models.UniqueConstraint(fields=('day', 'agent', 'store_location', 'offer', 'status'), name='unique_daily_sales_row'),
+        ),
+    ]
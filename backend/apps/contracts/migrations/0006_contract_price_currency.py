@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0005_dailysales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True, verbose_name='Prix de vente'),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='currency',
+            field=models.CharField(default='DZD', max_length=3, verbose_name='Devise'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+"""
+Copy the current offer price and currency onto existing contracts.
+
+Runs in primary key chunks, each in its own transaction, so a large
+contracts table is never locked for the whole backfill.
+"""
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery
+
+CHUNK_SIZE = 5000
+
+
+def backfill_price(apps, schema_editor):
+    Contract = apps.get_model('contracts', 'Contract')
+    Offer = apps.get_model('offers', 'Offer')
+    db = schema_editor.connection.alias
+
+    contracts = Contract.objects.using(db).filter(price__isnull=True)
+    offer = Offer.objects.using(db).filter(pk=OuterRef('offer_id'))
+    last_id = 0
+    while True:
+        ids = list(
+            contracts.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        with transaction.atomic(using=db):
+            contracts.filter(pk__in=ids).update(
+                price=Subquery(offer.values('price')[:1]),
+                currency=Subquery(offer.values('currency')[:1]),
+            )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('contracts', '0006_contract_price_currency'),
+        ('offers', '0002_remove_is_featured'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_price, migrations.RunPython.noop),
+    ]
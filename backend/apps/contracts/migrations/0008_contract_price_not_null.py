@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0007_backfill_contract_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contract',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Prix de vente'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['status', 'created_at', 'price'], name='contract_revenue_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0008_contract_price_not_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='sale_date',
+            field=models.DateField(editable=False, null=True, verbose_name='Date de vente'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+"""
+Fill sale_date with the local date of created_at on existing contracts.
+
+The date is computed in Python with the project time zone, which every
+database backend agrees on, and written back with bulk_update in primary
+key chunks, one transaction per chunk.
+"""
+from django.db import migrations, transaction
+from django.utils import timezone
+
+CHUNK_SIZE = 5000
+
+
+def backfill_sale_date(apps, schema_editor):
+    Contract = apps.get_model('contracts', 'Contract')
+    db = schema_editor.connection.alias
+
+    contracts = Contract.objects.using(db).filter(sale_date__isnull=True).only('created_at')
+    last_id = 0
+    while True:
+        chunk = list(contracts.filter(pk__gt=last_id).order_by('pk')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        for contract in chunk:
+            contract.sale_date = timezone.localdate(contract.created_at)
+        with transaction.atomic(using=db):
+            Contract.objects.using(db).bulk_update(chunk, ['sale_date'], batch_size=1000)
+        last_id = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('contracts', '0009_contract_sale_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sale_date, migrations.RunPython.noop),
+    ]
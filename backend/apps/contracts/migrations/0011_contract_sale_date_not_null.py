@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0010_backfill_contract_sale_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contract',
+            name='sale_date',
+            field=models.DateField(editable=False, verbose_name='Date de vente'),
+        ),
+        migrations.RemoveIndex(
+            model_name='contract',
+            name='contract_revenue_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['sale_date'], name='contract_sale_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['created_by', 'sale_date'], name='contract_agent_sale_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['status', 'sale_date', 'price'], name='contract_revenue_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0011_contract_sale_date_not_null'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='Empreinte SHA-256')),
+                ('name', models.CharField(max_length=100, verbose_name='Fichier')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='References')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de creation')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Derniere utilisation')),
+            ],
+            options={
+                'verbose_name': 'Fichier media',
+                'verbose_name_plural': 'Fichiers media',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0012_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='store_location',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Point de vente'),
+        ),
+    ]
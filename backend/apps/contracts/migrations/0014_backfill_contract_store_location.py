@@ -0,0 +1,44 @@
+"""
+Copy the agent's current store onto existing contracts.
+
+That is the store their daily sales rows were counted under so far, so the
+rollup stays consistent. Runs in primary key chunks, one transaction per chunk.
+"""
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Subquery
+
+CHUNK_SIZE = 5000
+
+
+def backfill_store_location(apps, schema_editor):
+    Contract = apps.get_model('contracts', 'Contract')
+    User = apps.get_model('accounts', 'User')
+    db = schema_editor.connection.alias
+
+    contracts = Contract.objects.using(db).filter(created_by__isnull=False)
+    agent = User.objects.using(db).filter(pk=OuterRef('created_by_id'))
+    last_id = 0
+    while True:
+        ids = list(
+            contracts.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        with transaction.atomic(using=db):
+            contracts.filter(pk__in=ids).update(
+                store_location=Subquery(agent.values('store_location')[:1]),
+            )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('contracts', '0013_contract_store_location'),
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_store_location, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0014_backfill_contract_store_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractNumber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=50, unique=True, verbose_name='Numero de contrat')),
+                ('shard', models.CharField(max_length=100, verbose_name='Base de donnees')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de creation')),
+            ],
+            options={
+                'verbose_name': 'Numero de contrat',
+                'verbose_name_plural': 'Numeros de contrat',
+            },
+        ),
+    ]
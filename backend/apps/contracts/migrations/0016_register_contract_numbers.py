@@ -0,0 +1,45 @@
+"""
+Register the numbers of the existing contracts of the primary database.
+
+ContractNumber now keeps numbers unique in every deployment, not only with
+shards. Regional shards are registered by the sync_shards command. Runs in
+primary key chunks, one transaction per chunk.
+"""
+from django.db import DEFAULT_DB_ALIAS, migrations, transaction
+
+CHUNK_SIZE = 5000
+
+
+def register_numbers(apps, schema_editor):
+    Contract = apps.get_model('contracts', 'Contract')
+    ContractNumber = apps.get_model('contracts', 'ContractNumber')
+    db = schema_editor.connection.alias
+    if db != DEFAULT_DB_ALIAS:
+        return
+
+    last_id = 0
+    while True:
+        rows = list(
+            Contract.objects.using(db).filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'contract_number')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        with transaction.atomic(using=db):
+            ContractNumber.objects.using(db).bulk_create(
+                [ContractNumber(number=number, shard=db) for _, number in rows],
+                ignore_conflicts=True,
+            )
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('contracts', '0015_contractnumber'),
+    ]
+
+    operations = [
+        migrations.RunPython(register_numbers, migrations.RunPython.noop),
+    ]
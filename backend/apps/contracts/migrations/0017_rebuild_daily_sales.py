@@ -0,0 +1,54 @@
+"""
+Rebuild the daily sales rollup from the contracts.
+
+The rollup only counted contracts saved since it was added, and deleted
+agents left several agent NULL rows per key. Both are fixed by regrouping
+every contract, like the rebuild_daily_sales command, before the next
+migration adds the constraint on agent NULL rows. The grouping runs in the
+database; rows are written in batches, in the transaction of the migration.
+"""
+from django.db import migrations
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 1000
+
+
+def rebuild_daily_sales(apps, schema_editor):
+    Contract = apps.get_model('contracts', 'Contract')
+    DailySales = apps.get_model('contracts', 'DailySales')
+    db = schema_editor.connection.alias
+
+    grouped = Contract.objects.using(db).values(
+        'sale_date', 'created_by', 'store_location', 'offer', 'status'
+    ).annotate(
+        total=Count('id'),
+        amount=Sum('price'),
+    ).order_by()
+
+    DailySales.objects.using(db).all().delete()
+    batch = []
+    for item in grouped.iterator():
+        batch.append(DailySales(
+            day=item['sale_date'],
+            agent_id=item['created_by'],
+            store_location=item['store_location'],
+            offer_id=item['offer'],
+            status=item['status'],
+            count=item['total'],
+            revenue=item['amount'] or 0,
+        ))
+        if len(batch) == BATCH_SIZE:
+            DailySales.objects.using(db).bulk_create(batch)
+            batch = []
+    DailySales.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0016_register_contract_numbers'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0017_rebuild_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='dailysales',
+            constraint=models.UniqueConstraint(condition=models.Q(('agent__isnull', True)), fields=('day', 'store_location', 'offer', 'status'), name='unique_daily_sales_row_no_agent'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
 from apps.offers.models import Offer
 from apps.phone_numbers.models import PhoneNumber
@@ -14,6 +14,33 @@ def contract_photo_path(instance, filename):
     return f'contracts/{instance.contract_number}/photo_{filename}'
 
 
+class ContractQuerySet(models.QuerySet):
+    """Bulk operations that keep the daily sales rollup in step."""
+
+    def set_status(self, status):
+        """Change the status of every contract in the queryset."""
+        from djezzy_pos.sharding import use_shard
+        from .services.sales_rollup import move_contracts, touch_sales
+        with use_shard(self.db), transaction.atomic(using=self.db):
+            contracts = self.exclude(status=status)
+            move_contracts(contracts, status)
+            touch_sales(self.db)
+            return contracts.update(status=status)
+
+    def delete(self):
+        from djezzy_pos.sharding import use_shard
+        from .services.blobs import add_references
+        from .services.numbers import release_numbers
+        from .services.sales_rollup import remove_contracts, touch_sales
+        with use_shard(self.db), transaction.atomic(using=self.db):
+            remove_contracts(self)
+            touch_sales(self.db)
+            names = [name for row in self.values_list(*Contract.FILE_FIELDS) for name in row]
+            add_references(names, self.db, count=-1)
+            release_numbers(self.values_list('contract_number', flat=True), self.db)
+            return super().delete()
+
+
 class Contract(models.Model):
     """Contract model for Djezzy subscriptions."""
 
@@ -111,6 +138,25 @@ class Contract(models.Model):
         verbose_name='Numero attribue'
     )
 
+    # Price at sale time, so later offer price edits do not rewrite history
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Prix de vente'
+    )
+    currency = models.CharField(
+        max_length=3,
+        default='DZD',
+        verbose_name='Devise'
+    )
+    # Agent's store at sale time, so a later store change does not move history
+    store_location = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name='Point de vente'
+    )
+
     # Files
     pdf_file = models.FileField(
         upload_to=contract_pdf_path,
@@ -174,6 +220,13 @@ class Contract(models.Model):
         auto_now_add=True,
         verbose_name='Date de creation'
     )
+    # Local (Africa/Algiers) calendar day of the sale, stored so that day and
+    # month filters are plain indexed comparisons instead of per-row timezone
+    # conversions of created_at.
+    sale_date = models.DateField(
+        editable=False,
+        verbose_name='Date de vente'
+    )
     updated_at = models.DateTimeField(
         auto_now=True,
         verbose_name='Derniere modification'
@@ -184,10 +237,23 @@ class Contract(models.Model):
         verbose_name='Date de signature'
     )
 
+    objects = ContractQuerySet.as_manager()
+
+    # Fields that decide which daily sales row a contract is counted in
+    ROLLUP_FIELDS = ('status', 'offer_id', 'created_by_id', 'store_location')
+    # Fields whose content-addressed files are reference counted
+    FILE_FIELDS = ('pdf_file', 'customer_photo')
+
     class Meta:
         verbose_name = 'Contrat'
         verbose_name_plural = 'Contrats'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['sale_date'], name='contract_sale_date_idx'),
+            models.Index(fields=['created_by', 'sale_date'], name='contract_agent_sale_date_idx'),
+            # Covers revenue aggregates by status and period without reading the table
+            models.Index(fields=['status', 'sale_date', 'price'], name='contract_revenue_idx'),
+        ]
 
     def __str__(self):
         return f"{self.contract_number} - {self.customer_full_name}"
@@ -197,10 +263,113 @@ class Contract(models.Model):
         """Return customer full name."""
         return f"{self.customer_first_name} {self.customer_last_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_state = instance._get_rollup_state()
+        instance._file_state = instance._get_file_state()
+        return instance
+
+    def _get_rollup_state(self):
+        return tuple(self.__dict__.get(field) for field in self.ROLLUP_FIELDS)
+
+    def _get_file_state(self):
+        state = []
+        for field in self.FILE_FIELDS:
+            if field not in self.__dict__:
+                state.append(None)  # Deferred, so not saved either
+                continue
+            value = self.__dict__[field]
+            state.append(getattr(value, 'name', value) or '')
+        return tuple(state)
+
+    def _count_file_references(self, using, update_fields=None):
+        """Move the blob references from the files loaded to the files saved."""
+        from .services.blobs import replace_reference
+        previous = getattr(self, '_file_state', None) or ('',) * len(self.FILE_FIELDS)
+        for field, old, new in zip(self.FILE_FIELDS, previous, self._get_file_state()):
+            if old is None or new is None:
+                continue
+            if update_fields is not None and field not in update_fields:
+                continue
+            replace_reference(old, new, using)
+
+    def _offer_changed(self):
+        state = getattr(self, '_rollup_state', None)
+        return state is not None and state[1] != self.offer_id
+
+    def _agent_changed(self):
+        state = getattr(self, '_rollup_state', None)
+        return state is not None and state[2] != self.created_by_id
+
     def save(self, *args, **kwargs):
-        if not self.contract_number:
+        from contextlib import nullcontext
+        from djezzy_pos.sharding import use_shard
+        from .services.numbers import registered_number
+        from .services.sales_rollup import record_contract, touch_sales
+        generated = not self.contract_number
+        if generated:
             self.contract_number = self.generate_contract_number()
-        super().save(*args, **kwargs)
+        if self.sale_date is None:
+            self.sale_date = timezone.localdate(self.created_at) if self.created_at else timezone.localdate()
+        if self.price is None or self._offer_changed():
+            self.price = self.offer.price
+            self.currency = self.offer.currency
+        if (self._state.adding and not self.store_location) or self._agent_changed():
+            self.store_location = self.created_by.store_location if self.created_by else ''
+
+        # The agent's shard for a new contract, else where it was loaded from
+        using = kwargs.get('using') or router.db_for_write(Contract, instance=self)
+        # A new number must be free on every shard, not only this one
+        registration = registered_number(self, using, generated) if self._state.adding else nullcontext()
+        with registration, use_shard(using), transaction.atomic(using=using):
+            if self._state.adding:
+                super().save(*args, **kwargs)
+                record_contract(self)
+                self._publish_created()
+            elif getattr(self, '_rollup_state', None) != self._get_rollup_state():
+                # Move the contract out of the row it was counted in
+                previous = Contract.objects.filter(pk=self.pk).first()
+                if previous is not None:
+                    record_contract(previous, sign=-1)
+                super().save(*args, **kwargs)
+                record_contract(self)
+            else:
+                super().save(*args, **kwargs)
+            self._count_file_references(using, kwargs.get('update_fields'))
+            touch_sales(using)
+        self._rollup_state = self._get_rollup_state()
+        self._file_state = self._get_file_state()
+
+    def _publish_created(self):
+        from apps.events.services import publish
+        agent = self.created_by
+        publish(
+            'contract_created',
+            id=self.pk,
+            contract_number=self.contract_number,
+            agent_id=self.created_by_id,
+            agent_name=(agent.get_full_name() or agent.username) if agent else None,
+            store=self.store_location,
+            offer=self.offer.code,
+            offer_name=self.offer.name,
+            price=str(self.price),
+            sale_date=self.sale_date.isoformat(),
+        )
+
+    def delete(self, *args, **kwargs):
+        from djezzy_pos.sharding import use_shard
+        from .services.blobs import add_references
+        from .services.numbers import release_numbers
+        from .services.sales_rollup import record_contract, touch_sales
+        using = kwargs.get('using') or router.db_for_write(Contract, instance=self)
+        with use_shard(using), transaction.atomic(using=using):
+            record_contract(self, sign=-1)
+            touch_sales(using)
+            names = getattr(self, '_file_state', None) or self._get_file_state()
+            add_references([name for name in names if name], using, count=-1)
+            release_numbers([self.contract_number], using)
+            return super().delete(*args, **kwargs)
 
     @staticmethod
     def generate_contract_number():
@@ -222,3 +391,135 @@ class Contract(models.Model):
         self.email_sent = True
         self.email_sent_at = timezone.now()
         self.save()
+
+
+class DailySales(models.Model):
+    """
+    Daily sales rollup, one row per day, agent, store, offer and status.
+    Maintained in the same transaction as contract changes.
+    """
+
+    day = models.DateField(
+        verbose_name='Jour'
+    )
+    agent = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='daily_sales',
+        verbose_name='Agent'
+    )
+    store_location = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Point de vente'
+    )
+    offer = models.ForeignKey(
+        Offer,
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='Offre'
+    )
+    status = models.CharField(
+        max_length=20,
+        verbose_name='Statut'
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name='Contrats'
+    )
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Chiffre d\'affaires'
+    )
+
+    class Meta:
+        verbose_name = 'Ventes du jour'
+        verbose_name_plural = 'Ventes par jour'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'agent', 'store_location', 'offer', 'status'],
+                name='unique_daily_sales_row'
+            ),
+            # NULLs are distinct in the constraint above: rows of deleted agents
+            models.UniqueConstraint(
+                fields=['day', 'store_location', 'offer', 'status'],
+                condition=models.Q(agent__isnull=True),
+                name='unique_daily_sales_row_no_agent'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['agent', 'day'], name='daily_sales_agent_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.offer_id} - {self.status}: {self.count}"
+
+
+class ContractNumber(models.Model):
+    """
+    Registry of the contract numbers of every shard, on the primary only
+    (see services.numbers), with the shard holding each contract.
+    """
+
+    number = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Numero de contrat'
+    )
+    shard = models.CharField(
+        max_length=100,
+        verbose_name='Base de donnees'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Date de creation'
+    )
+
+    class Meta:
+        verbose_name = 'Numero de contrat'
+        verbose_name_plural = 'Numeros de contrat'
+
+    def __str__(self):
+        return f"{self.number} ({self.shard})"
+
+
+class MediaBlob(models.Model):
+    """
+    A content-addressed media file (see services.blobs), with the number
+    of contract fields of this shard referencing it.
+    """
+
+    sha256 = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Empreinte SHA-256'
+    )
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Fichier'
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='References'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Date de creation'
+    )
+    # Last stored or referenced; the garbage collector spares recent blobs
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Derniere utilisation'
+    )
+
+    class Meta:
+        verbose_name = 'Fichier media'
+        verbose_name_plural = 'Fichiers media'
+
+    def __str__(self):
+        return f"{self.name} ({self.references})"
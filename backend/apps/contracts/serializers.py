@@ -1,7 +1,9 @@
 import base64
+from django.db import router, transaction
 from rest_framework import serializers
-from django.core.files.base import ContentFile
 from .models import Contract
+from .services.blobs import store_blob
+from .services.numbers import ContractNumberTaken, number_taken
 from apps.offers.serializers import OfferSerializer
 from apps.phone_numbers.serializers import PhoneNumberSerializer
 
@@ -28,16 +30,17 @@ class ContractSerializer(serializers.ModelSerializer):
             'customer_id_expiry', 'customer_daira', 'customer_baladia',
             # Relations
             'offer', 'offer_detail', 'phone_number', 'phone_number_detail',
+            'price', 'currency', 'store_location',
             # Files
             'pdf_file', 'customer_photo', 'signature_base64',
             # Contact
             'customer_phone', 'customer_email', 'customer_address',
             'email_sent', 'email_sent_at',
             # Metadata
-            'created_by', 'agent_name', 'created_at', 'updated_at', 'signed_at'
+            'created_by', 'agent_name', 'created_at', 'sale_date', 'updated_at', 'signed_at'
         ]
         read_only_fields = [
-            'contract_number', 'created_at', 'updated_at',
+            'contract_number', 'price', 'currency', 'store_location', 'created_at', 'sale_date', 'updated_at',
             'signed_at', 'email_sent_at'
         ]
 
@@ -77,19 +80,24 @@ class ContractCreateSerializer(serializers.ModelSerializer):
             'signature_base64', 'customer_photo_base64', 'pdf_base64'
         ]
 
+    number_taken_message = 'Un contrat avec ce numero existe deja.'
+
+    def validate_contract_number(self, value):
+        # The unique check of the model only sees the agent's shard
+        if value and number_taken(value):
+            raise serializers.ValidationError(self.number_taken_message)
+        return value
+
     def create(self, validated_data):
-        # Handle base64 photo - convert to file
+        # Handle base64 photo - stored once per content (retries reuse it)
         photo_base64 = validated_data.pop('customer_photo_base64', None)
         if photo_base64:
             try:
                 image_data = base64.b64decode(photo_base64)
-                nin = validated_data.get('customer_nin', 'unknown')
-                validated_data['customer_photo'] = ContentFile(
-                    image_data,
-                    name=f"photo_{nin}.jpg"
-                )
             except Exception:
-                pass  # Ignore invalid base64
+                image_data = None  # Ignore invalid base64
+            if image_data:
+                validated_data['customer_photo'] = store_blob(image_data, '.jpg')
 
         # Handle base64 PDF - convert to file
         pdf_base64 = validated_data.pop('pdf_base64', None)
@@ -99,26 +107,30 @@ class ContractCreateSerializer(serializers.ModelSerializer):
         if request and request.user.is_authenticated:
             validated_data['created_by'] = request.user
 
-        # Assign phone number to customer
+        # Assign phone number to customer, with the contract on its shard
         phone_number = validated_data.get('phone_number')
-        if phone_number and phone_number.status == 'available':
-            name = f"{validated_data.get('customer_first_name')} {validated_data.get('customer_last_name')}"
-            nin = validated_data.get('customer_nin', '')
-            phone_number.assign_to(name, nin)
-
-        # Create contract first to get contract_number
-        contract = super().create(validated_data)
-
-        # Save PDF file after contract is created (need contract_number for filename)
+        using = router.db_for_write(Contract, instance=Contract(created_by=validated_data.get('created_by')))
+        try:
+            with transaction.atomic(using=using):
+                if phone_number and phone_number.status == 'available':
+                    name = f"{validated_data.get('customer_first_name')} {validated_data.get('customer_last_name')}"
+                    nin = validated_data.get('customer_nin', '')
+                    phone_number.assign_to(name, nin)
+
+                # Create contract first to get contract_number
+                contract = super().create(validated_data)
+        except ContractNumberTaken:
+            # Registered on another shard since the number was validated
+            raise serializers.ValidationError({'contract_number': [self.number_taken_message]})
+
+        # Save PDF file after contract is created, on the contract's shard
         if pdf_base64:
             try:
                 pdf_data = base64.b64decode(pdf_base64)
-                contract.pdf_file.save(
-                    f"contrat_{contract.contract_number}.pdf",
-                    ContentFile(pdf_data),
-                    save=True
-                )
             except Exception:
-                pass  # Ignore invalid base64
+                pdf_data = None  # Ignore invalid base64
+            if pdf_data:
+                contract.pdf_file = store_blob(pdf_data, '.pdf', using=contract._state.db)
+                contract.save(update_fields=['pdf_file'])
 
         return contract
@@ -1,3 +1,24 @@
+from .numbers import ContractNumberTaken, number_shard, number_taken
+from .pdf_cache import get_or_enqueue_pdf
+from .pdf_export import stream_contract_pdfs_zip
 from .pdf_generator import ContractPDFGenerator
+from .pdf_renderer import (
+    PDFRenderService, RenderPoolBroken, RenderQueueFull, RenderTimeout, get_render_service
+)
+from .sales_rollup import rebuild_daily_sales, sales_version
 
-__all__ = ['ContractPDFGenerator']
+__all__ = [
+    'ContractNumberTaken',
+    'ContractPDFGenerator',
+    'PDFRenderService',
+    'RenderPoolBroken',
+    'RenderQueueFull',
+    'RenderTimeout',
+    'get_or_enqueue_pdf',
+    'get_render_service',
+    'number_shard',
+    'number_taken',
+    'rebuild_daily_sales',
+    'sales_version',
+    'stream_contract_pdfs_zip',
+]
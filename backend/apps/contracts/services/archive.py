@@ -0,0 +1,86 @@
+"""
+Archival of the media of old contracts to the cold tier.
+
+`archive_contract` moves every file under contracts/<number>/ from the hot
+storage to the archive (see djezzy_pos.storage). A file is gzipped when
+that saves at least MIN_SAVING of its size; JPEG photos and compressed
+PDFs are stored as they are. The archived copy is written and checked
+before the hot one is deleted, so an interrupted run loses nothing and
+archiving a contract again is harmless.
+"""
+import gzip
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from djezzy_pos.storage import GZIP_SUFFIX
+
+MIN_SAVING = 0.1
+
+
+class ArchiveError(Exception):
+    """Raised when the archived copy of a file does not match the original."""
+
+
+def contract_media(storage, contract_number):
+    """Names of the files of a contract on `storage`, lock and temporary files excluded."""
+    names = []
+    directories = [f'contracts/{contract_number}']
+    while directories:
+        directory = directories.pop()
+        try:
+            subdirectories, files = storage.listdir(directory)
+        except FileNotFoundError:
+            continue
+        names.extend(f'{directory}/{name}' for name in files if not name.startswith('.'))
+        directories.extend(f'{directory}/{name}' for name in subdirectories)
+    return sorted(names)
+
+
+def archive_file(name, storage=None):
+    """
+    Move `name` from the hot tier to the archive. Returns its size and
+    the size stored in the archive.
+    """
+    storage = storage or default_storage
+    hot, archive = storage.hot, storage.archive
+    with hot.open(name, 'rb') as source:
+        data = source.read()
+
+    packed = gzip.compress(data, mtime=0)
+    if len(packed) <= len(data) * (1 - MIN_SAVING):
+        target, payload = name + GZIP_SUFFIX, packed
+    else:
+        target, payload = name, data
+    # A copy left by an interrupted run would make the storage pick another name
+    for candidate in (name, name + GZIP_SUFFIX):
+        if archive.exists(candidate):
+            archive.delete(candidate)
+    stored = archive.save(target, ContentFile(payload))
+    if stored != target or archive.size(stored) != len(payload):
+        raise ArchiveError(f'Archived copy of {name} is incomplete ({stored})')
+
+    hot.delete(name)
+    return len(data), len(payload)
+
+
+def archive_contract(contract_number, blobs=(), storage=None):
+    """
+    Move the media of a contract to the archive, with the content-addressed
+    `blobs` its fields point to (still read from the archive if a recent
+    contract shares them). Returns the number of files, their size and the
+    size stored in the archive.
+    """
+    storage = storage or default_storage
+    files = size = stored = 0
+    names = contract_media(storage.hot, contract_number)
+    names += [name for name in blobs if storage.hot.exists(name)]
+    for name in names:
+        try:
+            original, archived = archive_file(name, storage)
+        except FileNotFoundError:
+            continue  # A blob shared with a contract archived at the same time
+        files += 1
+        size += original
+        stored += archived
+    return files, size, stored
@@ -0,0 +1,197 @@
+"""
+Content-addressed, deduplicated storage of contract media.
+
+Uploaded PDFs and photos are stored once per content, as
+blobs/<first two hex digits>/<sha256><extension>. A byte-identical upload
+(a retry of the mobile app, a re-submission) gets the name of the stored
+file and nothing is written. MediaBlob rows count the contract fields
+referencing each blob. Contract.save and delete keep them in the same
+transaction as the contract, on the contract's shard.
+
+`collect_garbage` (the gc_media_blobs command) deletes the blobs that no
+contract references any more. Blobs stored or referenced within the grace
+period are spared, so a contract being created with an existing blob keeps
+it.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from djezzy_pos.sharding import scatter, shards
+from djezzy_pos.storage import GZIP_SUFFIX
+
+from .files import write_atomic
+
+BLOB_PREFIX = 'blobs/'
+
+
+def blob_name(digest, extension):
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest}{extension}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def _digest(name):
+    return name.rsplit('/', 1)[-1].split('.', 1)[0]
+
+
+def store_blob(data, extension, using=None):
+    """
+    Store bytes under their SHA-256 and return the storage name. The write
+    is skipped when the content is already stored. `using` is the shard of
+    the contract that will reference it.
+    """
+    from apps.contracts.models import MediaBlob
+
+    digest = hashlib.sha256(data).hexdigest()
+    name = blob_name(digest, extension)
+    using = using or router.db_for_write(MediaBlob)
+    # Mark the blob as in use before it is referenced, for the collector
+    updated = MediaBlob.objects.using(using).filter(sha256=digest).update(updated_at=timezone.now())
+    if not updated:
+        MediaBlob.objects.using(using).get_or_create(sha256=digest, defaults={'name': name})
+    if not default_storage.exists(name):
+        write_atomic(default_storage, name, data)
+    return name
+
+
+def add_references(names, using, count=1):
+    """Count `count` more (or fewer) references to the blobs among `names`."""
+    from apps.contracts.models import MediaBlob
+
+    blobs = MediaBlob.objects.using(using)
+    for name in filter(is_blob, names):
+        digest = _digest(name)
+        if count > 0:
+            blobs.get_or_create(sha256=digest, defaults={'name': name})
+            blobs.filter(sha256=digest).update(
+                references=F('references') + count, updated_at=timezone.now()
+            )
+        else:
+            blobs.filter(sha256=digest, references__gte=-count).update(
+                references=F('references') + count, updated_at=timezone.now()
+            )
+
+
+def replace_reference(old_name, new_name, using):
+    """A contract field went from `old_name` to `new_name`."""
+    if old_name != new_name:
+        add_references([old_name], using, count=-1)
+        add_references([new_name], using)
+
+
+def recount_references(using):
+    """Recompute the reference counts of a shard from its contracts."""
+    from apps.contracts.models import Contract, MediaBlob
+
+    counts = {}
+    names = {}
+    rows = Contract.objects.using(using).values_list(*Contract.FILE_FIELDS).order_by()
+    for row in rows.iterator(chunk_size=2000):
+        for name in filter(is_blob, row):
+            digest = _digest(name)
+            counts[digest] = counts.get(digest, 0) + 1
+            names[digest] = name
+
+    blobs = MediaBlob.objects.using(using)
+    with transaction.atomic(using=using):
+        blobs.exclude(sha256__in=counts).update(references=0)
+        for digest, references in counts.items():
+            blob, _ = blobs.get_or_create(sha256=digest, defaults={'name': names[digest]})
+            if blob.references != references:
+                blobs.filter(pk=blob.pk).update(references=references)
+    return len(counts)
+
+
+def _listdir(storage, path):
+    try:
+        return storage.listdir(path)
+    except FileNotFoundError:
+        return [], []
+
+
+def _blob_files(storage, directory):
+    """Names of the blob files of a directory of a storage tier, gzip suffix removed."""
+    _, files = _listdir(storage, f'{BLOB_PREFIX}{directory}')
+    for filename in files:
+        if filename.startswith('.'):
+            continue  # Temporary files of write_atomic
+        if filename.endswith(GZIP_SUFFIX):
+            filename = filename[:-len(GZIP_SUFFIX)]
+        yield f'{BLOB_PREFIX}{directory}/{filename}'
+
+
+def _usage(digests, chunk_size=500):
+    """(references, last use) of blobs, summed over the shards."""
+    from apps.contracts.models import MediaBlob
+
+    def rows():
+        found = []
+        for start in range(0, len(digests), chunk_size):
+            found.extend(MediaBlob.objects.filter(
+                sha256__in=digests[start:start + chunk_size]
+            ).values_list('sha256', 'references', 'updated_at'))
+        return found
+    usage = {}
+    for shard_rows in scatter(rows):
+        for digest, references, updated_at in shard_rows:
+            total, last = usage.get(digest, (0, updated_at))
+            usage[digest] = (total + references, max(last, updated_at))
+    return usage
+
+
+def _modified_time(storage, name):
+    for tier, stored in ((storage.hot, name), (storage.archive, name + GZIP_SUFFIX),
+                         (storage.archive, name)):
+        if tier.exists(stored):
+            return tier.get_modified_time(stored)
+    return None
+
+
+def collect_garbage(grace=timedelta(days=1), dry_run=False):
+    """
+    Delete the blobs no contract references, if unused for `grace`.
+    Returns the number of blobs deleted (or that would be).
+    """
+    from apps.contracts.models import MediaBlob
+
+    storage = default_storage
+    cutoff = timezone.now() - grace
+    directories = set()
+    for tier in (storage.hot, storage.archive):
+        directories.update(_listdir(tier, BLOB_PREFIX.rstrip('/'))[0])
+
+    deleted = 0
+    # One directory at a time: 1/256th of the blobs
+    for directory in sorted(directories):
+        names = set(_blob_files(storage.hot, directory)) | set(_blob_files(storage.archive, directory))
+        batch = {_digest(name): name for name in names}
+        usage = _usage(list(batch))
+        for digest, name in sorted(batch.items()):
+            if not _unused(storage, name, usage.get(digest), cutoff):
+                continue
+            # Look again: a contract may have just picked the blob up
+            if not dry_run and not _unused(storage, name, _usage([digest]).get(digest), cutoff):
+                continue
+            deleted += 1
+            if not dry_run:
+                storage.delete(name)
+    if not dry_run:
+        for alias in shards():
+            MediaBlob.objects.using(alias).filter(references=0, updated_at__lt=cutoff).delete()
+    return deleted
+
+
+def _unused(storage, name, usage, cutoff):
+    references, last_use = usage or (0, None)
+    if references:
+        return False
+    # Blobs without a row yet: use the time the file was written
+    last_use = last_use or _modified_time(storage, name)
+    return last_use is not None and last_use < cutoff
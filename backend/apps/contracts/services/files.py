@@ -0,0 +1,98 @@
+"""
+File helpers for contract media, on the local filesystem or in a bucket.
+"""
+import fcntl
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def is_local(storage):
+    """Whether `storage` keeps its files on the local filesystem."""
+    try:
+        storage.path('')
+    except NotImplementedError:
+        return False
+    return True
+
+
+def write_atomic(storage, name, data):
+    """Write bytes to `name` in storage so readers never see a partial file."""
+    if not is_local(storage):
+        # An upload replaces the object in one step. Write to the hot tier
+        # of a TieredStorage, which keeps the name (file_overwrite).
+        return getattr(storage, 'hot', storage).save(name, ContentFile(data))
+
+    path = Path(storage.path(name))
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.chmod(tmp_path, storage.file_permissions_mode or 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return name
+
+
+@contextmanager
+def file_lock(storage, name, blocking=True):
+    """
+    Hold an exclusive lock on `name` in storage, across threads and processes.
+    For a bucket the lock is a cache key, shared by every node only with a
+    shared cache (redis). Yields whether the lock is held: without
+    `blocking`, False at once when someone else holds it.
+    """
+    if is_local(storage):
+        lock = _flock(storage.path(name), blocking)
+    else:
+        lock = _cache_lock(f'media:lock:{name}', blocking)
+    with lock as locked:
+        yield locked
+
+
+@contextmanager
+def _flock(path, blocking=True):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _cache_lock(key, blocking=True):
+    # Expires on its own if the holder dies mid-render
+    token = uuid.uuid4().hex
+    while not cache.add(key, token, settings.PDF_RENDER_TIMEOUT + 5):
+        if not blocking:
+            yield False
+            return
+        time.sleep(LOCK_POLL_INTERVAL)
+    try:
+        yield True
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
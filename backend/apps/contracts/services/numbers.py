@@ -0,0 +1,122 @@
+"""
+Contract numbers unique across the shards and partitions.
+
+Numbers come from the mobile app (printed in its PDF and QR code) or from
+Contract.generate_contract_number. The unique constraint of a shard cannot
+see the other shards, and a partitioned contract table (see
+services.partitions) only has numbers unique per sale day. So a new
+contract's number is first registered in ContractNumber, on the primary,
+where its unique constraint holds for the whole network, in every
+deployment. The registration is undone if the contract cannot be saved,
+and released once a contract's deletion is committed on its shard: the
+contract goes first, so a failed delete never leaves it unregistered.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+
+MAX_ATTEMPTS = 10
+
+
+class ContractNumberTaken(Exception):
+    """Raised when a contract number is already used on some shard."""
+
+
+def number_taken(number):
+    """Whether a contract number is registered, on any shard."""
+    from apps.contracts.models import ContractNumber
+
+    return ContractNumber.objects.using(DEFAULT_DB_ALIAS).filter(number=number).exists()
+
+
+def number_shard(number):
+    """Alias of the shard holding a contract number, if registered."""
+    from apps.contracts.models import ContractNumber
+
+    return ContractNumber.objects.using(DEFAULT_DB_ALIAS).filter(
+        number=number
+    ).values_list('shard', flat=True).first()
+
+
+def _register(number, using):
+    from apps.contracts.models import ContractNumber
+
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            return ContractNumber.objects.using(DEFAULT_DB_ALIAS).create(number=number, shard=using)
+    except IntegrityError:
+        return None
+
+
+@contextmanager
+def registered_number(contract, using, generated=False):
+    """
+    Register the number of a new contract saved on `using` for the block.
+    A `generated` number is drawn again while taken, else ContractNumberTaken
+    is raised.
+    """
+    for _ in range(MAX_ATTEMPTS):
+        entry = _register(contract.contract_number, using)
+        if entry is not None or not generated:
+            break
+        contract.contract_number = contract.generate_contract_number()
+    if entry is None:
+        raise ContractNumberTaken(f'Numero de contrat deja utilise: {contract.contract_number}')
+    try:
+        yield
+    except BaseException:
+        entry.delete(using=DEFAULT_DB_ALIAS)
+        raise
+
+
+def release_numbers(numbers, using):
+    """
+    Release the numbers of contracts deleted from `using`, once the deletion
+    is committed there.
+    """
+    from apps.contracts.models import ContractNumber
+
+    numbers = [number for number in numbers if number]
+    if not numbers:
+        return
+    transaction.on_commit(
+        lambda: ContractNumber.objects.using(DEFAULT_DB_ALIAS).filter(
+            number__in=numbers, shard=using
+        ).delete(),
+        using=using,
+    )
+
+
+def register_numbers(using, batch_size=1000):
+    """
+    Register the numbers of the existing contracts of a shard. Returns the
+    numbers registered and those already registered for another shard.
+    """
+    from apps.contracts.models import Contract
+
+    registered = 0
+    duplicates = []
+    numbers = Contract.objects.using(using).order_by('pk').values_list('contract_number', flat=True)
+    batch = []
+    for number in numbers.iterator(chunk_size=batch_size):
+        batch.append(number)
+        if len(batch) < batch_size:
+            continue
+        registered += _register_batch(batch, using, duplicates)
+        batch = []
+    registered += _register_batch(batch, using, duplicates)
+    return registered, duplicates
+
+
+def _register_batch(numbers, using, duplicates):
+    from apps.contracts.models import ContractNumber
+
+    known = dict(ContractNumber.objects.using(DEFAULT_DB_ALIAS).filter(
+        number__in=numbers
+    ).values_list('number', 'shard'))
+    duplicates.extend(number for number in numbers if known.get(number, using) != using)
+    ContractNumber.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        [ContractNumber(number=number, shard=using) for number in numbers if number not in known],
+        ignore_conflicts=True,
+    )
+    return len([number for number in numbers if number not in known])
@@ -0,0 +1,225 @@
+"""
+Monthly range partitioning of the contract table (PostgreSQL only).
+
+The table is partitioned by month of `sale_date`. That is the local sale day
+that every day, month and period filter already uses (created_at is a UTC
+timestamp no query filters on). Queries on recent days then only read the
+partitions of their range, and old months are left alone by vacuum.
+
+PostgreSQL requires the partition key in every unique constraint. So the
+primary key becomes (id, sale_date) and contract numbers are unique per
+sale day in the table; the ContractNumber registry (see services.numbers)
+keeps them unique across all contracts.
+
+`convert_to_partitioned` rewrites an existing table in one transaction.
+`ensure_partitions` adds the coming months; run it from cron. Rows outside
+every monthly partition land in a default partition. They are moved into
+their month when its partition is created.
+"""
+from datetime import date
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.contracts.models import Contract
+
+TABLE = Contract._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_pdefault'
+
+
+class PartitioningError(Exception):
+    """Raised when the database cannot be (or is not yet) partitioned."""
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def _check_vendor(connection):
+    if connection.vendor != 'postgresql':
+        raise PartitioningError(
+            f'Partitioning needs PostgreSQL, not {connection.vendor} ({connection.alias}).'
+        )
+
+
+def is_partitioned(using='default'):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions(using='default'):
+    """Names of the partitions of the contract table, oldest first."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname',
+            [TABLE]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _create_partition(cursor, quote, month):
+    """
+    Add the partition of `month`. Its rows are moved out of the default
+    partition first, since PostgreSQL refuses to attach a range the
+    default partition still holds.
+    """
+    name, start, end = partition_name(month), month, _add_months(month, 1)
+    cursor.execute(
+        f'CREATE TABLE {quote(name)} (LIKE {quote(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} '
+        f'WHERE sale_date >= %s AND sale_date < %s RETURNING *) '
+        f'INSERT INTO {quote(name)} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(
+        f'ALTER TABLE {quote(TABLE)} ATTACH PARTITION {quote(name)} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [start, end]
+    )
+
+
+def ensure_partitions(months_ahead=3, using='default'):
+    """
+    Create the monthly partitions from the current month through
+    `months_ahead` months later. Returns the names created.
+    """
+    connection = connections[using]
+    _check_vendor(connection)
+    if not is_partitioned(using):
+        raise PartitioningError(
+            f'{TABLE} is not partitioned on {using}; convert it with --convert first.'
+        )
+    existing = set(partitions(using))
+    current = timezone.localdate().replace(day=1)
+    months = [_add_months(current, offset) for offset in range(months_ahead + 1)]
+    created = []
+    quote = connection.ops.quote_name
+    for month in months:
+        if partition_name(month) in existing:
+            continue
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            _create_partition(cursor, quote, month)
+        created.append(partition_name(month))
+    return created
+
+
+def _constraints_and_indexes(schema_editor):
+    """Recreate the constraints and indexes of the model on the partitioned table."""
+    quote = schema_editor.quote_name
+    table = quote(TABLE)
+    pk = Contract._meta.pk.column
+    schema_editor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {quote(TABLE + "_pkey")} PRIMARY KEY ({quote(pk)}, sale_date)'
+    )
+    for field in Contract._meta.concrete_fields:
+        column = quote(field.column)
+        if field.unique and not field.primary_key:
+            name = quote(f'{TABLE}_{field.column}_sale_date_uniq')
+            schema_editor.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({column}, sale_date)'
+            )
+        if field.remote_field:
+            target = field.target_field
+            schema_editor.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {quote(f"{TABLE}_{field.column}_fk")} '
+                f'FOREIGN KEY ({column}) REFERENCES {quote(target.model._meta.db_table)} '
+                f'({quote(target.column)}) DEFERRABLE INITIALLY DEFERRED'
+            )
+        if field.db_index and not field.unique:
+            schema_editor.execute(
+                f'CREATE INDEX {quote(f"{TABLE}_{field.column}_idx")} ON {table} ({column})'
+            )
+    for index in Contract._meta.indexes:
+        schema_editor.add_index(Contract, index)
+
+
+def convert_to_partitioned(months_ahead=3, using='default'):
+    """
+    Rewrite the contract table as a partitioned one, in a single transaction.
+    Writes to contracts wait until it commits; reads go on. Returns the
+    number of rows copied.
+    """
+    connection = connections[using]
+    _check_vendor(connection)
+    if is_partitioned(using):
+        raise PartitioningError(f'{TABLE} is already partitioned on {using}.')
+
+    quote = connection.ops.quote_name
+    old, new = f'{TABLE}_unpartitioned', f'{TABLE}_partitioned'
+    pk = quote(Contract._meta.pk.column)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {quote(TABLE)} IN EXCLUSIVE MODE')
+        cursor.execute(f'SELECT MIN(sale_date), MAX({pk}), COUNT(*) FROM {quote(TABLE)}')
+        first_day, last_id, count = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} RENAME TO {quote(old)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(new)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (sale_date)'
+        )
+        # A serial default would keep the old table's sequence alive
+        cursor.execute(f'ALTER TABLE {quote(new)} ALTER COLUMN {pk} DROP DEFAULT')
+        cursor.execute(f'ALTER TABLE {quote(new)} RENAME TO {quote(TABLE)}')
+        cursor.execute(f'CREATE TABLE {quote(DEFAULT_PARTITION)} PARTITION OF {quote(TABLE)} DEFAULT')
+
+        current = timezone.localdate().replace(day=1)
+        month = min(first_day.replace(day=1), current) if first_day else current
+        while month <= _add_months(current, months_ahead):
+            _create_partition(cursor, quote, month)
+            month = _add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {quote(TABLE)} SELECT * FROM {quote(old)}')
+        cursor.execute(f'SELECT COUNT(*) FROM {quote(TABLE)}')
+        if cursor.fetchone()[0] != count:
+            raise PartitioningError('Row count mismatch after copying contracts.')
+        # Also drops the identity sequence of the old id column
+        cursor.execute(f'DROP TABLE {quote(old)}')
+
+        sequence = quote(f'{TABLE}_id_seq')
+        cursor.execute(
+            f'CREATE SEQUENCE {sequence} START WITH %s OWNED BY {quote(TABLE)}.{pk}',
+            [(last_id or 0) + 1]
+        )
+        cursor.execute(
+            f'ALTER TABLE {quote(TABLE)} ALTER COLUMN {pk} SET DEFAULT nextval(%s)',
+            [f'{TABLE}_id_seq']
+        )
+        with connection.schema_editor(atomic=False) as schema_editor:
+            _constraints_and_indexes(schema_editor)
+    return count
+
+
+def partitions_scanned(queryset):
+    """Partitions of the contract table that the plan of `queryset` reads."""
+    import json
+
+    plan = queryset.explain(format='json')
+    found = set()
+
+    def visit(node):
+        if isinstance(node, dict):
+            relation = node.get('Relation Name', '')
+            if relation.startswith(f'{TABLE}_p'):
+                found.add(relation)
+            for value in node.values():
+                visit(value)
+        elif isinstance(node, list):
+            for value in node:
+                visit(value)
+
+    visit(json.loads(plan))
+    return sorted(found)
@@ -0,0 +1,111 @@
+"""
+On-demand server PDF fallback for contracts without an uploaded PDF.
+
+Generated PDFs are stored under a hash of every field the generator reads,
+so later requests are plain file reads and any edit to the contract, its
+offer or its number produces a new file.
+
+Request workers never wait for a render, nor for a lock: `get_or_enqueue_pdf`
+queues the render in the pool and the client retries. Concurrent requests
+render once: a process queues a contract once, and in the render workers
+the first job to take the contract's lock renders while the others return.
+"""
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+
+from .files import file_lock, write_atomic
+from .pdf_generator import ContractPDFGenerator
+from .pdf_renderer import get_render_service
+
+CONTRACT_FIELDS = [
+    'contract_number', 'created_at', 'price',
+    'customer_first_name', 'customer_last_name',
+    'customer_first_name_ar', 'customer_last_name_ar',
+    'customer_birth_date', 'customer_birth_place', 'customer_birth_place_ar',
+    'customer_sex', 'customer_blood_type', 'customer_nin', 'customer_id_number',
+    'customer_id_expiry', 'customer_daira', 'customer_baladia',
+    'customer_phone', 'customer_email', 'customer_address',
+    'customer_photo', 'signature_base64',
+]
+OFFER_FIELDS = [
+    'name', 'data_allowance_mb', 'validity_days',
+    'voice_minutes', 'sms_count', 'features',
+]
+
+
+def content_hash(contract):
+    """Return a hash of everything that ends up in the contract's PDF."""
+    offer = contract.offer
+    content = {
+        'template': ContractPDFGenerator.TEMPLATE_VERSION,
+        'site_url': getattr(settings, 'SITE_URL', ''),
+        'contract': {field: getattr(contract, field) for field in CONTRACT_FIELDS},
+        'offer': {field: getattr(offer, field) for field in OFFER_FIELDS},
+        'phone_number': contract.phone_number.number,
+    }
+    encoded = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def generated_pdf_name(contract):
+    """Storage name of the server-generated PDF for the contract's current content."""
+    return f'contracts/{contract.contract_number}/generated/{content_hash(contract)}.pdf'
+
+
+_queued = {}
+_queued_lock = threading.Lock()
+
+
+def get_or_enqueue_pdf(contract):
+    """Return the storage name of a server-generated PDF, or None once its render is queued.
+
+    May raise RenderQueueFull when the render pool is saturated.
+    """
+    storage = contract.pdf_file.storage
+    name = generated_pdf_name(contract)
+    if storage.exists(name):
+        return name
+
+    # Requests arriving while the render runs do not queue it again
+    with _queued_lock:
+        future = _queued.get(name)
+        if future is not None and not future.done():
+            return None
+        future = get_render_service().submit(contract.pk, action='cache', using=contract._state.db)
+        _queued[name] = future
+    # Outside the lock: runs at once if the job is already over
+    future.add_done_callback(lambda done: _forget(name, done))
+    return None
+
+
+def _forget(name, future):
+    with _queued_lock:
+        if _queued.get(name) is future:
+            del _queued[name]
+
+
+def render_generated_pdf(contract, generator):
+    """
+    Render and store the contract's server-generated PDF, from a render
+    worker; returns its name. Skipped while another worker renders it.
+    """
+    storage = contract.pdf_file.storage
+    name = generated_pdf_name(contract)
+    lock = f'contracts/{contract.contract_number}/generated/.lock'
+    with file_lock(storage, lock, blocking=False) as locked:
+        if locked and not storage.exists(name):
+            write_atomic(storage, name, generator.generate())
+            _remove_stale(storage, name)
+    return name
+
+
+def _remove_stale(storage, name):
+    """Delete PDFs generated for earlier versions of the contract."""
+    directory, current = name.rsplit('/', 1)
+    _, files = storage.listdir(directory)
+    for filename in files:
+        if filename.endswith('.pdf') and filename != current:
+            storage.delete(f'{directory}/{filename}')
@@ -0,0 +1,78 @@
+"""
+Streaming ZIP export of contract PDFs.
+
+The archive is produced on the fly: entries are stored without
+recompression (PDFs are already compressed) and each file is copied in
+small chunks, so memory stays flat however many contracts are exported.
+Only the per-entry central directory records are kept until the end.
+"""
+import zipfile
+
+from django.utils import timezone
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStream:
+    """Write-only, unseekable sink that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_contract_pdfs_zip(*querysets):
+    """
+    Yield a ZIP archive of the PDFs of the contracts of `querysets` (one
+    per shard, read one after the other), chunk by chunk.
+    """
+    return (chunk for chunk in _generate_zip(querysets) if chunk)
+
+
+def _rows(querysets):
+    for contracts in querysets:
+        contracts = contracts.exclude(pdf_file='').exclude(pdf_file__isnull=True)
+        rows = contracts.only('contract_number', 'pdf_file', 'created_at').order_by('pk')
+        yield from rows.iterator(chunk_size=500)
+
+
+def _generate_zip(querysets):
+    sink = _ZipStream()
+
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for contract in _rows(querysets):
+            created_at = timezone.localtime(contract.created_at)
+            info = zipfile.ZipInfo(
+                f'contrat_{contract.contract_number}.pdf',
+                date_time=created_at.timetuple()[:6]
+            )
+            info.compress_type = zipfile.ZIP_STORED
+            try:
+                source = contract.pdf_file.open('rb')
+            except OSError:
+                continue  # File missing on disk, skip it
+            with source, archive.open(info, mode='w') as entry:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    entry.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
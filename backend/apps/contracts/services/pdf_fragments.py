@@ -0,0 +1,112 @@
+"""
+Precompiled static fragments for contract PDFs.
+
+The header brand, section titles, terms block and confirmation box are the
+same on every contract. They are built and laid out once per process, then
+drawn through a Form XObject in each document. The logo image is encoded
+once per process and its XObject is re-registered in every new document.
+"""
+import copy
+import threading
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfdoc
+from reportlab.platypus.flowables import Flowable
+
+# ReportLab flowables keep drawing state on the instance, so shared
+# fragments are compiled and drawn under a single process-wide lock.
+_lock = threading.RLock()
+_compiled = {}
+_images = {}
+
+
+class StaticFragment(Flowable):
+    """Flowable whose layout is computed once per process and width."""
+
+    def __init__(self, key, factory):
+        super().__init__()
+        self.key = key
+        self._factory = factory
+        self._flowable = self._compiled(None)[0]
+        self.hAlign = getattr(self._flowable, 'hAlign', 'LEFT')
+        self.vAlign = getattr(self._flowable, 'vAlign', 'BOTTOM')
+
+    def _compiled(self, availWidth, availHeight=None):
+        """Return the (flowable, size, form name) compiled for a width."""
+        compiled_key = (self.key, availWidth)
+        with _lock:
+            if compiled_key not in _compiled:
+                flowable = self._factory()
+                size = None
+                if availWidth is not None:
+                    size = flowable.wrap(availWidth, availHeight)
+                name = f"StaticFragment{len(_compiled)}"
+                _compiled[compiled_key] = (flowable, size, name)
+            return _compiled[compiled_key]
+
+    def wrap(self, availWidth, availHeight):
+        self._flowable, size, self._form_name = self._compiled(availWidth, availHeight)
+        self.width, self.height = size
+        return size
+
+    def getSpaceBefore(self):
+        return self._flowable.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self._flowable.getSpaceAfter()
+
+    def draw(self):
+        canv = self.canv
+        name = self._form_name
+        if not canv.hasForm(name):
+            with _lock:
+                # Glyphs may overhang the wrapped box (leading < fontSize),
+                # so the form bounding box leaves a generous bleed.
+                canv.beginForm(
+                    name, -self.width, -self.height, 2 * self.width, 2 * self.height
+                )
+                self._flowable.drawOn(canv, 0, 0)
+                canv.endForm()
+        canv.doForm(name)
+
+
+class CachedImage(Flowable):
+    """Image flowable whose encoded XObject is shared across documents."""
+
+    def __init__(self, path, width, height):
+        super().__init__()
+        self.path = str(path)
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def _template(self):
+        """Encode the image once per process."""
+        with _lock:
+            if self.path not in _images:
+                name = f"CachedImage{len(_images)}"
+                _images[self.path] = pdfdoc.PDFImageXObject(
+                    name, ImageReader(self.path), mask='auto'
+                )
+            return _images[self.path]
+
+    def draw(self):
+        canv = self.canv
+        template = self._template()
+        doc = canv._doc
+        if doc.getXObjectName(template.name) not in doc.idToObject:
+            # Register a copy so each document owns its object reference,
+            # mirroring what Canvas.drawImage does for a new image.
+            image = copy.copy(template)
+            smask = getattr(template, '_smask', None)
+            if smask is not None:
+                del image._smask
+                smask_name = doc.getXObjectName(smask.name)
+                image.smask = doc.Reference(copy.copy(smask), smask_name)
+            doc.addForm(template.name, image)
+        canv.saveState()
+        canv.scale(self.width, self.height)
+        canv.doForm(template.name)
+        canv.restoreState()
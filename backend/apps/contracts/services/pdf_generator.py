@@ -7,7 +7,6 @@ import base64
 from pathlib import Path
 
 from django.conf import settings
-from django.core.files.base import ContentFile
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.colors import HexColor, white, black
@@ -23,6 +22,9 @@ from reportlab.pdfbase.ttfonts import TTFont
 
 from PIL import Image as PILImage
 
+from .blobs import store_blob
+from .pdf_fragments import CachedImage, StaticFragment
+
 try:
     import qrcode
     QR_SUPPORT = True
@@ -40,6 +42,9 @@ except ImportError:
 class ContractPDFGenerator:
     """Generate PDF contracts matching mobile app design using Platypus."""
 
+    # Bump when the layout, terms or branding change so cached PDFs are rebuilt
+    TEMPLATE_VERSION = 1
+
     # Djezzy brand colors
     DJEZZY_RED = HexColor('#ED1C24')
     DJEZZY_DARK = HexColor('#C41820')
@@ -59,6 +64,10 @@ class ContractPDFGenerator:
     def _register_fonts(self):
         """Register Arabic font for RTL text."""
         self.arabic_font = 'Helvetica'
+        if 'Amiri' in pdfmetrics.getRegisteredFontNames():
+            # TTF parsing is costly, register the font once per process
+            self.arabic_font = 'Amiri'
+            return
         try:
             font_paths = [
                 Path(settings.BASE_DIR) / 'static' / 'fonts' / 'Amiri-Regular.ttf',
@@ -175,7 +184,9 @@ class ContractPDFGenerator:
         """Load customer photo from contract."""
         try:
             if self.contract.customer_photo and self.contract.customer_photo.name:
-                return self.contract.customer_photo.path
+                # Read through the storage: the photo may have been archived
+                with self.contract.customer_photo.open('rb') as photo:
+                    return io.BytesIO(photo.read())
             return None
         except Exception:
             return None
@@ -283,15 +294,17 @@ class ContractPDFGenerator:
         contract_number = self.contract.contract_number
         formatted_date = self.contract.created_at.strftime('%d/%m/%Y') if self.contract.created_at else '-'
 
-        # Header content
+        # Header content (static, precompiled once per process)
         if logo_path:
-            logo = RLImage(logo_path, width=100, height=35)
+            logo = StaticFragment(('header-logo', logo_path), lambda: CachedImage(logo_path, 100, 35))
         else:
-            logo = Paragraph('<b>DJEZZY</b>', ParagraphStyle(
+            logo = StaticFragment('header-logo-text', lambda: Paragraph('<b>DJEZZY</b>', ParagraphStyle(
                 'LogoText', fontName='Helvetica-Bold', fontSize=24, textColor=white
-            ))
+            )))
 
-        title = Paragraph("CONTRAT D'ABONNEMENT", self.styles['HeaderTitle'])
+        title = StaticFragment('header-title', lambda: Paragraph(
+            "CONTRAT D'ABONNEMENT", self.styles['HeaderTitle']
+        ))
 
         info_style = ParagraphStyle('HeaderInfo', fontName='Helvetica', fontSize=10, textColor=white, alignment=TA_RIGHT)
         contract_info = Paragraph(f"N: {contract_number}<br/>Date: {formatted_date}", info_style)
@@ -316,7 +329,11 @@ class ContractPDFGenerator:
         return header_table
 
     def _build_section_title(self, title):
-        """Build section title with red background."""
+        """Build section title with red background (precompiled once per title)."""
+        return StaticFragment(('section-title', title), lambda: self._section_title_table(title))
+
+    def _section_title_table(self, title):
+        """Lay out a section title table."""
         title_para = Paragraph(title, self.styles['SectionTitle'])
 
         title_table = Table([[title_para]], colWidths=[180])
@@ -457,7 +474,7 @@ class ContractPDFGenerator:
 
         # Offer header
         offer_name = Paragraph(offer.name, self.styles['OfferTitle'])
-        offer_price = Paragraph(f"{offer.price} DA", ParagraphStyle(
+        offer_price = Paragraph(f"{self.contract.price} DA", ParagraphStyle(
             'OfferPrice', fontName='Helvetica-Bold', fontSize=16, textColor=self.DJEZZY_RED, alignment=TA_RIGHT
         ))
 
@@ -539,7 +556,11 @@ class ContractPDFGenerator:
         return [label_para, value_para]
 
     def _build_terms_section(self):
-        """Build terms and conditions section."""
+        """Build terms and conditions section (precompiled once)."""
+        return StaticFragment('terms', self._terms_table)
+
+    def _terms_table(self):
+        """Lay out the terms and conditions table."""
         terms_text = (
             "En signant ce contrat, le client accepte les conditions generales d'utilisation "
             "des services Djezzy. Le client certifie que les informations fournies sont "
@@ -599,20 +620,8 @@ class ContractPDFGenerator:
             Spacer(1, 8),
         ]
 
-        # Confirmation box
-        confirm_para = Paragraph("Je confirme que c'est ma carte d'identite nationale",
-            ParagraphStyle('ConfirmText', fontName='Helvetica', fontSize=8, textColor=self.GREEN_TEXT))
-        confirm_table = Table([[confirm_para]], colWidths=[180])
-        confirm_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), self.LIGHT_GREEN),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('ROUNDEDCORNERS', [4, 4, 4, 4]),
-        ]))
-
-        info_elements.append(confirm_table)
+        # Confirmation box (static, precompiled once)
+        info_elements.append(StaticFragment('confirmation', self._confirmation_table))
 
         # QR Code section
         qr_code = self._generate_qr_code()
@@ -659,13 +668,35 @@ class ContractPDFGenerator:
 
         return wrapper_table
 
+    def _confirmation_table(self):
+        """Lay out the identity confirmation box."""
+        confirm_para = Paragraph("Je confirme que c'est ma carte d'identite nationale",
+            ParagraphStyle('ConfirmText', fontName='Helvetica', fontSize=8, textColor=self.GREEN_TEXT))
+        confirm_table = Table([[confirm_para]], colWidths=[180])
+        confirm_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), self.LIGHT_GREEN),
+            ('LEFTPADDING', (0, 0), (-1, -1), 8),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('ROUNDEDCORNERS', [4, 4, 4, 4]),
+        ]))
+        return confirm_table
+
     def save_to_contract(self):
         """Generate PDF and save to contract's pdf_file field."""
         pdf_bytes = self.generate()
-        filename = f"contrat_{self.contract.contract_number}.pdf"
-        self.contract.pdf_file.save(
-            filename,
-            ContentFile(pdf_bytes),
-            save=True
-        )
+        self.contract.pdf_file = store_blob(pdf_bytes, '.pdf', using=self.contract._state.db)
+        self.contract.save()
         return self.contract.pdf_file
+
+    def replace_file(self):
+        """Generate PDF and store it in the blob store, without saving the contract.
+
+        Blobs are content-addressed, so readers of the current file are
+        not disturbed and an unchanged PDF is not written again. Returns the
+        blob name; the caller points `pdf_file` at it if it changed (see
+        blobs.replace_reference).
+        """
+        pdf_bytes = self.generate()
+        return store_blob(pdf_bytes, '.pdf', using=self.contract._state.db)
@@ -0,0 +1,242 @@
+"""
+Process-pool rendering service for contract PDFs.
+
+ReportLab rendering is CPU-bound and holds the GIL, so running it inside a
+sync gunicorn worker blocks that worker for the whole render. This service
+runs `ContractPDFGenerator` in a bounded pool of worker processes with
+per-job timeouts and backpressure.
+
+Every web worker has its own pool, so the renders of a host are limited
+by slots shared through lock files: the web service (`get_render_service`)
+renders at most PDF_RENDER_WORKERS contracts at once per host, however
+many web workers run.
+"""
+import asyncio
+import atexit
+import fcntl
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+SLOT_POLL_INTERVAL = 0.05
+
+
+class RenderQueueFull(Exception):
+    """Raised when too many render jobs are already pending."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a render job exceeds its time budget."""
+
+
+class RenderPoolBroken(Exception):
+    """Raised when a worker died during a render (e.g. out of memory); the pool is rebuilt."""
+
+
+def _init_worker(settings_module, niceness, databases=None):
+    """Set up Django inside a freshly spawned worker process."""
+    # Renders yield the CPU to request workers when cores are contended
+    if niceness:
+        os.nice(niceness)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    # Same databases as the parent, which may have switched to test databases
+    for alias, name in (databases or {}).items():
+        settings.DATABASES[alias]['NAME'] = name
+    import django
+    django.setup()
+
+
+class _JobTimeout(BaseException):
+    """Raised by the worker timer; not an Exception so generator fallbacks cannot swallow it."""
+
+
+def _on_alarm(signum, frame):
+    raise _JobTimeout()
+
+
+@contextmanager
+def _host_slot(directory, count):
+    """Hold one of the `count` render slots of the host, waiting for a free one."""
+    os.makedirs(directory, exist_ok=True)
+    while True:
+        for index in range(count):
+            with open(os.path.join(directory, f'slot-{index}.lock'), 'a') as slot:
+                try:
+                    fcntl.flock(slot.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(slot.fileno(), fcntl.LOCK_UN)
+                return
+        time.sleep(SLOT_POLL_INTERVAL)
+
+
+def _render_job(contract_id, timeout, action, using=None, slots=None):
+    """Render a contract in a worker process.
+
+    `action` is 'generate' (return the PDF bytes), 'save' (save through
+    the FileField), 'replace' (atomically overwrite the stored file) or
+    'cache' (store it as the server-generated PDF, see pdf_cache); the
+    last three return the storage name. `using` is the database (shard)
+    holding the contract, `slots` the (directory, count) of the host's
+    render slots to wait for, if any.
+    """
+    from apps.contracts.models import Contract
+    from .pdf_generator import ContractPDFGenerator
+
+    slot = _host_slot(*slots) if slots else nullcontext()
+    with slot:
+        # Jobs run on the worker's main thread, so a real-time timer can
+        # interrupt a render that is stuck instead of only abandoning it.
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            contract = Contract.objects.db_manager(using).select_related(
+                'offer', 'phone_number'
+            ).get(pk=contract_id)
+            generator = ContractPDFGenerator(contract)
+            if action == 'save':
+                return generator.save_to_contract().name
+            if action == 'replace':
+                return generator.replace_file()
+            if action == 'cache':
+                from .pdf_cache import render_generated_pdf
+                return render_generated_pdf(contract, generator)
+            return generator.generate()
+        except _JobTimeout:
+            raise RenderTimeout('Temps de generation du PDF depasse') from None
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+class PDFRenderService:
+    """Bounded process pool around ContractPDFGenerator."""
+
+    def __init__(self, workers=None, max_pending=None, timeout=None, host_slots=None):
+        self.workers = workers or settings.PDF_RENDER_WORKERS
+        self.max_pending = max_pending or settings.PDF_RENDER_MAX_PENDING
+        self.timeout = timeout or settings.PDF_RENDER_TIMEOUT
+        # Renders at once on the host, shared with the other services
+        self.host_slots = host_slots
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the parent's DB connections
+                # or gunicorn's threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(
+                        os.environ.get('DJANGO_SETTINGS_MODULE', 'djezzy_pos.settings'),
+                        settings.PDF_RENDER_NICENESS,
+                        {alias: str(db['NAME']) for alias, db in settings.DATABASES.items()},
+                    ),
+                )
+            return self._executor
+
+    def _reset(self, executor):
+        """Drop a broken pool, so that the next job starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_done(self, executor, future):
+        self._slots.release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._reset(executor)
+
+    def submit(self, contract_id, action='generate', timeout=None, block=False, using=None):
+        """Enqueue a render job and return its Future.
+
+        Raises RenderQueueFull instead of queueing without bound, unless
+        `block` is set, in which case it waits for a free slot.
+        """
+        if not self._slots.acquire(blocking=block):
+            raise RenderQueueFull('File de generation PDF pleine')
+        slots = (settings.PDF_RENDER_SLOTS_DIR, self.host_slots) if self.host_slots else None
+        args = (_render_job, contract_id, timeout or self.timeout, action, using, slots)
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(*args)
+            except BrokenProcessPool:
+                # A worker died since the last job: start over with a new pool
+                self._reset(executor)
+                executor = self._get_executor()
+                future = executor.submit(*args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(executor, f))
+        return future
+
+    def render(self, contract_id, timeout=None, using=None):
+        """Render a contract and block until the PDF bytes are ready."""
+        timeout = timeout or self.timeout
+        future = self.submit(contract_id, timeout=timeout, using=using)
+        try:
+            # Leave the worker-side timer a moment to fire first.
+            return future.result(timeout=timeout + 1)
+        except FutureTimeoutError:
+            future.cancel()
+            raise RenderTimeout('Temps de generation du PDF depasse')
+        except BrokenProcessPool as exc:
+            raise RenderPoolBroken('Generation du PDF interrompue') from exc
+
+    async def arender(self, contract_id, timeout=None, using=None):
+        """Render a contract from async code without blocking the event loop."""
+        timeout = timeout or self.timeout
+        future = self.submit(contract_id, timeout=timeout, using=using)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout + 1)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise RenderTimeout('Temps de generation du PDF depasse')
+        except BrokenProcessPool as exc:
+            raise RenderPoolBroken('Generation du PDF interrompue') from exc
+
+    def enqueue_save(self, contract_id, using=None):
+        """Render and save a contract's PDF in the background."""
+        return self.submit(contract_id, action='save', using=using)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_render_service():
+    """
+    Return the process-wide render service, creating it on first use. Its
+    pool is small, its jobs wait for one of the host's PDF_RENDER_WORKERS slots.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PDFRenderService(
+                workers=settings.PDF_RENDER_PROCESS_WORKERS, host_slots=settings.PDF_RENDER_WORKERS
+            )
+            atexit.register(_service.shutdown, wait=False)
+        return _service
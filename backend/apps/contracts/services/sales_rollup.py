@@ -0,0 +1,163 @@
+"""
+Daily sales rollup.
+
+`DailySales` keeps one row per (day, agent, store, offer, status) with the
+number of contracts and their revenue. Rows are adjusted in the same
+transaction as the contract change, so statistics read a handful of rows
+per day instead of scanning and joining the whole contract history.
+
+Contracts of a deleted agent are kept under agent NULL: the agent's rows
+are merged into those before the agent is deleted (see `agent_deleted`),
+so there is still one row per key.
+
+Every contract write also bumps a sales version stamp in the cache once
+it commits, so cached aggregates keyed by the version expire at once.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F, Sum
+
+from djezzy_pos.cache import bump_version, namespace_version
+
+SALES_NAMESPACE = 'sales'
+
+
+def sales_version():
+    """Return the current sales version stamp."""
+    return namespace_version(SALES_NAMESPACE)
+
+
+def touch_sales(using=None):
+    """Invalidate cached sales aggregates when the current transaction commits."""
+    transaction.on_commit(lambda: bump_version(SALES_NAMESPACE), using=using)
+
+
+def _row_key(contract, status=None):
+    return {
+        'day': contract.sale_date,
+        'agent_id': contract.created_by_id,
+        'store_location': contract.store_location,
+        'offer_id': contract.offer_id,
+        'status': status or contract.status,
+    }
+
+
+def _apply(key, count, revenue):
+    """Add `count` and `revenue` to the row for `key`, creating it if needed."""
+    from apps.contracts.models import DailySales
+
+    rows = DailySales.objects.filter(**key)
+    changes = {'count': F('count') + count, 'revenue': F('revenue') + revenue}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic(using=router.db_for_write(DailySales)):
+            DailySales.objects.create(count=count, revenue=revenue, **key)
+    except IntegrityError:
+        # Another transaction created the row first
+        rows.update(**changes)
+
+
+def record_contract(contract, status=None, sign=1):
+    """Count `contract` (or uncount it with sign=-1) in its daily sales row."""
+    _apply(_row_key(contract, status), sign, sign * contract.price)
+
+
+def _grouped(contracts):
+    """Aggregate a contract queryset by rollup row, in Python."""
+    groups = defaultdict(lambda: [0, Decimal('0')])
+    rows = contracts.only(
+        'sale_date', 'status', 'offer', 'price', 'created_by', 'store_location'
+    ).order_by()
+    for contract in rows.iterator(chunk_size=2000):
+        key = tuple(_row_key(contract).items())
+        groups[key][0] += 1
+        groups[key][1] += contract.price
+    return groups
+
+
+def move_contracts(contracts, status):
+    """Move the contracts of a queryset to the rows of a new status."""
+    for key, (count, revenue) in _grouped(contracts).items():
+        key = dict(key)
+        _apply(key, -count, -revenue)
+        _apply({**key, 'status': status}, count, revenue)
+
+
+def remove_contracts(contracts):
+    """Uncount the contracts of a queryset before they are deleted."""
+    for key, (count, revenue) in _grouped(contracts).items():
+        _apply(dict(key), -count, -revenue)
+
+
+def merge_agent_rows(agent_id):
+    """Move the rows of an agent to the rows without agent."""
+    from apps.contracts.models import DailySales
+
+    rows = DailySales.objects.filter(agent_id=agent_id)
+    for row in rows.values('day', 'store_location', 'offer_id', 'status', 'count', 'revenue'):
+        count, revenue = row.pop('count'), row.pop('revenue')
+        _apply({**row, 'agent_id': None}, count, revenue)
+    rows.delete()
+
+
+def agent_deleted(sender, instance, using, **kwargs):
+    """
+    pre_delete of users, on the primary and every shard: runs in the
+    transaction of the deletion, before SET_NULL would orphan the rows.
+    """
+    from djezzy_pos.sharding import use_shard
+
+    with use_shard(using):
+        merge_agent_rows(instance.pk)
+        touch_sales(using)
+
+
+def rebuild_daily_sales(date_from=None, date_to=None, batch_size=1000):
+    """
+    Recompute the rollup from the contracts, for all days or a date range.
+    Returns the number of rows written.
+    """
+    from apps.contracts.models import Contract, DailySales
+
+    contracts = Contract.objects.all()
+    rows = DailySales.objects.all()
+    if date_from:
+        contracts = contracts.filter(sale_date__gte=date_from)
+        rows = rows.filter(day__gte=date_from)
+    if date_to:
+        contracts = contracts.filter(sale_date__lte=date_to)
+        rows = rows.filter(day__lte=date_to)
+
+    grouped = contracts.values(
+        'sale_date', 'created_by', 'store_location', 'offer', 'status'
+    ).annotate(
+        total=Count('id'),
+        amount=Sum('price'),
+    ).order_by()
+
+    using = router.db_for_write(DailySales)
+    with transaction.atomic(using=using):
+        rows.delete()
+        touch_sales(using)
+        batch = []
+        written = 0
+        for item in grouped.iterator():
+            batch.append(DailySales(
+                day=item['sale_date'],
+                agent_id=item['created_by'],
+                store_location=item['store_location'],
+                offer_id=item['offer'],
+                status=item['status'],
+                count=item['total'],
+                revenue=item['amount'] or 0,
+            ))
+            if len(batch) == batch_size:
+                DailySales.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        DailySales.objects.bulk_create(batch)
+        written += len(batch)
+    return written
@@ -0,0 +1,61 @@
+"""Test data shared by the contract tests."""
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.test import override_settings
+
+from apps.accounts.models import User
+from apps.contracts.models import Contract
+from apps.offers.models import Offer
+from apps.phone_numbers.models import PhoneNumber
+from djezzy_pos.sharding import shard_for_store, use_shard
+
+# A shard declared for the tests (see settings), or the first of DB_SHARDS
+TEST_SHARD = next(alias for alias in settings.DATABASES if alias.startswith('shard_'))
+# Stores of Oran on TEST_SHARD, the others on the primary
+sharded = override_settings(
+    SHARD_REGIONS={'centre': DEFAULT_DB_ALIAS, 'ouest': TEST_SHARD},
+    SHARD_STORES={'Oran': 'ouest'},
+)
+
+
+def make_offer(code='LEGEND', price='2000.00', **fields):
+    return Offer.objects.create(
+        name=fields.pop('name', f'Offre {code}'), code=code, price=Decimal(price),
+        data_allowance_mb=20480, voice_minutes=600, sms_count=100,
+        features=['Appels illimites vers Djezzy', 'Reseaux sociaux inclus'], **fields
+    )
+
+
+def make_agent(username='agent', store_location='Alger Centre', **fields):
+    return User.objects.create_user(
+        username=username, password='secret-password', first_name='Karim',
+        last_name='Benali', role='agent', store_location=store_location, **fields
+    )
+
+
+def make_contract(offer, agent=None, number=None, **fields):
+    """A contract on a fresh phone number of `offer`, with fixed customer data."""
+    # Both go to the shard of the agent, as in a request of the agent
+    with use_shard(shard_for_store(agent.store_location if agent else '')):
+        number = number or f'0770{PhoneNumber.objects.count():06d}'
+        phone = PhoneNumber.objects.create(number=number, offer=offer, status='assigned')
+        values = {
+            'customer_first_name': 'Amina',
+            'customer_last_name': 'Haddad',
+            'customer_birth_date': date(1990, 5, 17),
+            'customer_birth_place': 'Alger',
+            'customer_sex': 'F',
+            'customer_nin': '109900123456789012',
+            'customer_id_number': '123456789',
+            'customer_id_expiry': date(2030, 1, 31),
+            'customer_daira': 'Sidi Mhamed',
+            'customer_baladia': 'Alger Centre',
+            'customer_phone': '0550123456',
+            'customer_email': 'amina.haddad@example.com',
+            'customer_address': '12 rue Didouche Mourad, Alger',
+        }
+        values.update(fields)
+        return Contract.objects.create(offer=offer, phone_number=phone, created_by=agent, **values)
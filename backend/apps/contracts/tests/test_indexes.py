@@ -0,0 +1,76 @@
+"""
+Query plans of the contract queries filtered on sale_date.
+
+EXPLAIN must show the sale_date indexes for the period filters of the
+stats, analytics and rollup rebuild queries.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from apps.analytics.services import _aggregate, parse_params
+from apps.contracts.models import Contract
+
+from .fixtures import make_agent, make_contract, make_offer
+
+
+class SaleDateIndexTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.agent = make_agent()
+        offer = make_offer()
+        for number in range(3):
+            make_contract(offer, agent=self.agent, number=f'077000000{number}')
+        self.today = timezone.localdate()
+        self.month_start = self.today.replace(day=1)
+        if connection.vendor == 'postgresql':
+            # A few rows are read faster sequentially; ask for the index plan
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            self.addCleanup(lambda: connection.cursor().execute('RESET enable_seqscan'))
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, f'{index} not used:\n{plan}')
+
+    def test_day_filter_uses_sale_date_index(self):
+        self.assertUsesIndex(
+            Contract.objects.filter(sale_date=self.today).order_by().values('price'),
+            'contract_sale_date_idx',
+        )
+        # The rollup rebuild reads a sale_date range of every status
+        self.assertUsesIndex(
+            Contract.objects.filter(sale_date__gte=self.today - timedelta(days=6)).order_by(),
+            'contract_sale_date_idx',
+        )
+
+    def test_agent_period_uses_agent_sale_date_index(self):
+        self.assertUsesIndex(
+            Contract.objects.filter(created_by=self.agent, sale_date__gte=self.month_start)
+            .order_by().values('status').annotate(count=Count('id')),
+            'contract_agent_sale_date_idx',
+        )
+
+    def test_revenue_by_status_and_period_uses_revenue_index(self):
+        self.assertUsesIndex(
+            Contract.objects.filter(status='validated', sale_date__gte=self.month_start)
+            .order_by().values('status').annotate(count=Count('id'), revenue=Sum('price')),
+            'contract_revenue_idx',
+        )
+
+    def test_contract_analytics_use_the_sale_date_indexes(self):
+        # Daira and baladia are not in the rollup: analytics read the contracts
+        self.assertUsesIndex(
+            _aggregate(parse_params({'group_by': 'daira', 'status': 'all'})),
+            'contract_sale_date_idx',
+        )
+        self.assertUsesIndex(
+            _aggregate(parse_params({'group_by': 'daira'})), 'contract_revenue_idx'
+        )
+        agent_query = parse_params({'group_by': 'daira', 'status': 'all', 'agent': str(self.agent.pk)})
+        self.assertUsesIndex(_aggregate(agent_query), 'contract_agent_sale_date_idx')
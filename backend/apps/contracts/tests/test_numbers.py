@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from apps.contracts.models import Contract, ContractNumber
+from apps.contracts.serializers import ContractCreateSerializer
+from apps.contracts.services import ContractNumberTaken
+from apps.contracts.services.blobs import store_blob
+
+from .fixtures import TEST_SHARD, make_agent, make_contract, make_offer, sharded
+
+
+class ContractNumberRegistryTests(TransactionTestCase):
+    """Numbers are registered without shards too (partitioned tables need it)."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.offer = make_offer()
+        self.agent = make_agent()
+
+    def test_number_is_registered(self):
+        contract = make_contract(self.offer, agent=self.agent)
+        self.assertEqual(
+            list(ContractNumber.objects.values_list('number', 'shard')),
+            [(contract.contract_number, DEFAULT_DB_ALIAS)],
+        )
+
+    def test_registered_number_is_refused(self):
+        ContractNumber.objects.create(number='DJ-20260101-6666', shard=DEFAULT_DB_ALIAS)
+        with self.assertRaises(ContractNumberTaken):
+            make_contract(self.offer, agent=self.agent, contract_number='DJ-20260101-6666')
+        self.assertFalse(Contract.objects.exists())
+
+    def test_registration_is_undone_when_the_save_fails(self):
+        with mock.patch.object(Contract, 'save_base', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                make_contract(self.offer, agent=self.agent, contract_number='DJ-20260101-7777')
+        self.assertFalse(ContractNumber.objects.exists())
+
+    def test_number_is_released_after_the_contract_is_deleted(self):
+        contract = make_contract(self.offer, agent=self.agent, contract_number='DJ-20260101-8888')
+        with mock.patch('django.db.models.deletion.Collector.delete', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                contract.delete()
+        self.assertTrue(ContractNumber.objects.filter(number='DJ-20260101-8888').exists())
+
+        contract.delete()
+        self.assertFalse(ContractNumber.objects.exists())
+        make_contract(self.offer, agent=self.agent, number='0770000002', contract_number='DJ-20260101-8888')
+
+
+@sharded
+class ContractNumberTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.offer = make_offer()
+        self.shard = TEST_SHARD
+        self.central = make_agent('central', store_location='Alger Centre')
+        self.regional = make_agent('regional', store_location='Oran')
+
+    def test_generated_number_is_drawn_again_when_taken_on_another_shard(self):
+        numbers = iter(['DJ-20260101-1111', 'DJ-20260101-1111', 'DJ-20260101-2222'])
+        with mock.patch.object(Contract, 'generate_contract_number', side_effect=lambda: next(numbers)):
+            first = make_contract(self.offer, agent=self.central, number='0770000001')
+            second = make_contract(self.offer, agent=self.regional, number='0770000002')
+        self.assertEqual(first._state.db, DEFAULT_DB_ALIAS)
+        self.assertEqual(second._state.db, self.shard)
+        self.assertEqual(second.contract_number, 'DJ-20260101-2222')
+        self.assertEqual(
+            dict(ContractNumber.objects.values_list('number', 'shard')),
+            {'DJ-20260101-1111': DEFAULT_DB_ALIAS, 'DJ-20260101-2222': self.shard},
+        )
+
+    def test_number_from_the_app_taken_on_another_shard_is_refused(self):
+        make_contract(self.offer, agent=self.central, number='0770000001', contract_number='DJ-20260101-3333')
+        serializer = ContractCreateSerializer(data={'contract_number': 'DJ-20260101-3333'})
+        serializer.is_valid()
+        self.assertIn('contract_number', serializer.errors)
+
+    def test_public_pdf_refuses_a_number_used_on_two_shards(self):
+        for agent, number in [(self.central, '0770000001'), (self.regional, '0770000002')]:
+            make_contract(self.offer, agent=agent, number=number, contract_number='DJ-20260101-4444')
+            # Contracts from before the registry
+            ContractNumber.objects.all().delete()
+        response = self.client.get(reverse('public-contract-pdf', args=['DJ-20260101-4444']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_public_pdf_is_read_from_the_registered_shard(self):
+        name = store_blob(b'%PDF-1.4 contrat', '.pdf', using=self.shard)
+        self.addCleanup(default_storage.delete, name)
+        make_contract(self.offer, agent=self.regional, number='0770000002',
+                      contract_number='DJ-20260101-5555', pdf_file=name)
+        response = self.client.get(reverse('public-contract-pdf', args=['DJ-20260101-5555']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 contrat')
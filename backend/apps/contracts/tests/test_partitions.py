@@ -0,0 +1,66 @@
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from apps.contracts.models import Contract
+from apps.contracts.services import ContractNumberTaken
+from apps.contracts.services.partitions import (
+    DEFAULT_PARTITION, _add_months, convert_to_partitioned, ensure_partitions, is_partitioned,
+    partition_name, partitions, partitions_scanned
+)
+
+from .fixtures import make_agent, make_contract, make_offer
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL (DB_NAME)')
+class PartitionTests(TransactionTestCase):
+    """The table stays partitioned for the following tests of the run."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.month = self.today.replace(day=1)
+        self.offer = make_offer()
+        self.agent = make_agent()
+        make_contract(self.offer, agent=self.agent, number='0770000001')
+        old = make_contract(self.offer, agent=self.agent, number='0770000002')
+        Contract.objects.filter(pk=old.pk).update(sale_date=_add_months(self.month, -2))
+        if not is_partitioned():
+            self.assertEqual(convert_to_partitioned(months_ahead=1), 2)
+
+    def test_queries_read_only_their_partitions(self):
+        contracts = Contract.objects.filter(created_by=self.agent)
+        self.assertEqual(
+            partitions_scanned(contracts.filter(sale_date=self.today)), [partition_name(self.month)]
+        )
+        week = [self.today - timedelta(days=days) for days in range(7)]
+        self.assertEqual(
+            partitions_scanned(contracts.filter(sale_date__range=(week[-1], self.today))),
+            sorted({partition_name(day.replace(day=1)) for day in week}),
+        )
+        # Open-ended: the coming months and the default partition, never the past
+        scanned = partitions_scanned(contracts.filter(sale_date__gte=self.month))
+        self.assertNotIn(partition_name(_add_months(self.month, -1)), scanned)
+        self.assertNotIn(partition_name(_add_months(self.month, -2)), scanned)
+        self.assertIn(partition_name(self.month), scanned)
+        self.assertEqual(contracts.filter(sale_date__gte=self.month).count(), 1)
+
+    def test_ensure_partitions_adds_the_coming_months(self):
+        existing = set(partitions())
+        expected = [
+            partition_name(_add_months(self.month, offset)) for offset in range(4)
+            if partition_name(_add_months(self.month, offset)) not in existing
+        ]
+        self.assertEqual(ensure_partitions(months_ahead=3), expected)
+        self.assertIn(DEFAULT_PARTITION, partitions())
+        self.assertEqual(ensure_partitions(months_ahead=3), [])
+
+    def test_numbers_stay_unique_across_sale_days(self):
+        # The table only has (contract_number, sale_date) unique after conversion
+        number = Contract.objects.get(phone_number__number='0770000002').contract_number
+        with self.assertRaises(ContractNumberTaken):
+            make_contract(self.offer, agent=self.agent, number='0770000003', contract_number=number)
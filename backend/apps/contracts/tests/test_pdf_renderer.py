@@ -0,0 +1,120 @@
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TransactionTestCase
+
+from apps.accounts.models import User
+from apps.contracts.services import PDFRenderService, RenderPoolBroken, RenderQueueFull, get_render_service
+from apps.contracts.services.files import file_lock
+from apps.contracts.services.pdf_cache import generated_pdf_name, render_generated_pdf
+from apps.contracts.services.pdf_renderer import _host_slot
+
+from .fixtures import make_agent, make_contract, make_offer
+
+
+class RenderServiceTests(TransactionTestCase):
+    """Renders in real worker processes, which read the committed test data."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.contract = make_contract(make_offer(), agent=make_agent())
+
+    def test_render_through_the_process_pool(self):
+        pdf = get_render_service().render(self.contract.pk)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertGreater(len(pdf), 1000)
+
+    def test_save_through_the_process_pool(self):
+        service = PDFRenderService(workers=1)
+        try:
+            name = service.enqueue_save(self.contract.pk).result(timeout=60)
+        finally:
+            service.shutdown()
+        self.addCleanup(default_storage.delete, name)
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.pdf_file.name, name)
+        self.assertTrue(name.startswith('blobs/'))
+
+    def test_pool_is_rebuilt_after_a_worker_dies(self):
+        service = PDFRenderService(workers=1)
+        self.addCleanup(service.shutdown)
+        service.render(self.contract.pk)
+        # As when the kernel kills a worker for memory
+        for pid in list(service._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        try:
+            service.render(self.contract.pk)
+        except RenderPoolBroken:
+            pass  # The job was queued before the pool noticed
+        self.assertTrue(service.render(self.contract.pk).startswith(b'%PDF'))
+
+
+class HostSlotTests(SimpleTestCase):
+
+    def test_renders_beyond_the_host_slots_wait(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        entered = threading.Event()
+
+        def second():
+            with _host_slot(directory, 1):
+                entered.set()
+
+        with _host_slot(directory, 1):
+            thread = threading.Thread(target=second)
+            thread.start()
+            self.assertFalse(entered.wait(0.2))
+        thread.join(5)
+        self.assertTrue(entered.is_set())
+
+
+class PDFViewTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def setUp(self):
+        agent = make_agent()
+        self.contract = make_contract(make_offer(), agent=agent)
+        self.client.force_login(User.objects.get(pk=agent.pk))
+
+    def test_missing_pdf_is_rendered_in_the_background(self):
+        name = generated_pdf_name(self.contract)
+        self.addCleanup(default_storage.delete, name)
+        response = self.client.get(f'/api/contracts/{self.contract.pk}/pdf/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Retry-After'], '2')
+
+        for _ in range(300):
+            if default_storage.exists(name):
+                break
+            time.sleep(0.1)
+        response = self.client.get(f'/api/contracts/{self.contract.pk}/pdf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_full_queue_is_temporarily_unavailable(self):
+        service = mock.Mock(**{'submit.side_effect': RenderQueueFull()})
+        with mock.patch('apps.contracts.services.pdf_cache.get_render_service', return_value=service):
+            response = self.client.get(f'/api/contracts/{self.contract.pk}/pdf/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_render_is_left_to_the_worker_holding_the_lock(self):
+        name = generated_pdf_name(self.contract)
+        generator = mock.Mock(**{'generate.return_value': b'%PDF-1.4'})
+        lock = f'contracts/{self.contract.contract_number}/generated/.lock'
+        with file_lock(default_storage, lock):
+            self.assertEqual(render_generated_pdf(self.contract, generator), name)
+        generator.generate.assert_not_called()
+        self.assertFalse(default_storage.exists(name))
+
+        self.addCleanup(default_storage.delete, name)
+        render_generated_pdf(self.contract, generator)
+        self.assertTrue(default_storage.exists(name))
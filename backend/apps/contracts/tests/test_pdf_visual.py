@@ -0,0 +1,82 @@
+"""
+Visual regression test of the contract PDF.
+
+The PDF of a fixture contract is rasterized and compared page by page with
+the PNGs under reference/. After an intended layout change (with a
+TEMPLATE_VERSION bump), regenerate them with:
+
+    UPDATE_PDF_REFERENCE=1 python manage.py test apps.contracts.tests.test_pdf_visual
+"""
+import os
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from unittest import skipUnless
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image, ImageChops
+
+from apps.contracts.services import ContractPDFGenerator
+
+from .fixtures import make_agent, make_contract, make_offer
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+REFERENCE_DIR = Path(__file__).resolve().parent / 'reference'
+DPI = 72
+# A pixel has changed when a channel moved by more than THRESHOLD (0-255);
+# MAX_CHANGED pixels are tolerated for anti-aliasing differences
+THRESHOLD = 64
+MAX_CHANGED = 5
+
+
+def rasterize(pdf):
+    """One RGB image per page of a PDF."""
+    with pymupdf.open(stream=pdf, filetype='pdf') as document:
+        return [
+            Image.open(BytesIO(page.get_pixmap(dpi=DPI).tobytes('png'))).convert('RGB')
+            for page in document
+        ]
+
+
+def changed_pixels(image, reference):
+    difference = ImageChops.difference(image, reference).convert('L')
+    return sum(difference.point(lambda value: 255 if value > THRESHOLD else 0).histogram()[255:])
+
+
+@skipUnless(pymupdf, 'needs pymupdf')
+@override_settings(SITE_URL='https://pos.djezzy.dz')
+class ContractPDFVisualTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def render(self):
+        contract = make_contract(
+            make_offer(), agent=make_agent(), number='0770000001',
+            contract_number='DJ-20250115-1234'
+        )
+        # Printed in the header and signature block
+        contract.created_at = timezone.make_aware(datetime(2025, 1, 15, 10, 30))
+        return ContractPDFGenerator(contract).generate()
+
+    def test_pages_match_reference(self):
+        pages = rasterize(self.render())
+        if os.getenv('UPDATE_PDF_REFERENCE'):
+            for path in REFERENCE_DIR.glob('contract-*.png'):
+                path.unlink()
+            for index, page in enumerate(pages, 1):
+                page.save(REFERENCE_DIR / f'contract-{index}.png', optimize=True)
+
+        references = sorted(REFERENCE_DIR.glob('contract-*.png'))
+        self.assertEqual(len(pages), len(references), 'page count changed')
+        for page, path in zip(pages, references):
+            reference = Image.open(path).convert('RGB')
+            self.assertEqual(page.size, reference.size, f'{path.name}: page size changed')
+            changed = changed_pixels(page, reference)
+            self.assertLessEqual(
+                changed, MAX_CHANGED, f'{path.name}: {changed} pixels differ from the reference'
+            )
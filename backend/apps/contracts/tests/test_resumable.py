@@ -0,0 +1,71 @@
+import json
+import tempfile
+from concurrent.futures import Future
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from apps.contracts.management.resumable import ResumableJobs
+
+
+def _future(result=None, exc=None):
+    future = Future()
+    if exc is not None:
+        future.set_exception(exc)
+    elif result is not None:
+        future.set_result(result)
+    return future
+
+
+class ResumableJobsTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'run.checkpoint.json'
+        self.done = []
+        self.failed = []
+
+    def jobs(self, state):
+        return ResumableJobs(
+            self.path, state, 'default',
+            lambda contract_id, context, result: self.done.append((contract_id, context, result)),
+            lambda contract_id, context, exc: self.failed.append(contract_id),
+        )
+
+    def test_watermark_stays_below_jobs_in_flight(self):
+        state = {'last_ids': {'default': 1}}
+        jobs = self.jobs(state)
+        slow = _future()
+        jobs.add(2, slow, 'two')
+        jobs.add(3, _future('ok'), 'three')
+        jobs.add(4, _future(exc=ValueError('broken')), 'four')
+        self.assertEqual(jobs.last_id, 1)
+
+        slow.set_result('late')
+        jobs.drain()
+        self.assertEqual(jobs.last_id, 4)
+        self.assertEqual(self.done, [(3, 'three', 'ok'), (2, 'two', 'late')])
+        self.assertEqual(self.failed, [4])
+        self.assertEqual(jobs.processed, 3)
+        self.assertEqual(state['failed'], [['default', 4]])
+
+    def test_failed_contracts_are_kept_until_a_retry_succeeds(self):
+        state = {'last_ids': {'default': 9}, 'failed': [['default', 4], ['shard_ouest', 4], ['default', 7]]}
+        jobs = self.jobs(state)
+        self.assertEqual(jobs.failed_ids, [4, 7])
+        jobs.add(4, _future('ok'))
+        jobs.add(7, _future(exc=ValueError('still broken')))
+        jobs.drain()
+        self.assertEqual(state['failed'], [['shard_ouest', 4], ['default', 7]])
+        self.assertEqual((jobs.processed, jobs.failed), (2, 1))
+        self.assertEqual(jobs.last_id, 9)
+
+    def test_close_cancels_and_saves(self):
+        jobs = self.jobs({})
+        jobs.add(5, _future('ok'))
+        pending = _future()
+        jobs.add(6, pending)
+        jobs.close()
+        self.assertTrue(pending.cancelled())
+        self.assertEqual(json.loads(self.path.read_text()), {'last_ids': {'default': 5}, 'failed': []})
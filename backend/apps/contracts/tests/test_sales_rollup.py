@@ -0,0 +1,81 @@
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.db import connection
+from django.test import TransactionTestCase
+
+from apps.accounts.models import User
+from apps.contracts.models import Contract, DailySales
+from apps.contracts.services import rebuild_daily_sales
+
+from .fixtures import make_agent, make_contract, make_offer
+
+
+def _rows():
+    return sorted(DailySales.objects.filter(count__gt=0).values_list('store_location', 'status', 'count'))
+
+
+class StoreChangeTests(TransactionTestCase):
+    """Contracts stay counted under the store they were sold in."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.offer = make_offer()
+        self.agent = make_agent(store_location='Alger Centre')
+        self.contract = make_contract(self.offer, agent=self.agent)
+        self.agent.store_location = 'Blida'
+        self.agent.save()
+
+    def test_store_is_snapshot_at_sale(self):
+        self.assertEqual(self.contract.store_location, 'Alger Centre')
+        make_contract(self.offer, agent=self.agent)
+        self.assertEqual(_rows(), [('Alger Centre', 'validated', 1), ('Blida', 'validated', 1)])
+
+    def test_status_change_after_store_change(self):
+        contract = Contract.objects.get(pk=self.contract.pk)
+        contract.status = 'signed'
+        contract.save()
+        self.assertEqual(_rows(), [('Alger Centre', 'signed', 1)])
+        self.assertFalse(DailySales.objects.filter(count__lt=0).exists())
+
+    def test_delete_after_store_change(self):
+        Contract.objects.get(pk=self.contract.pk).delete()
+        self.assertEqual(_rows(), [])
+        self.assertFalse(DailySales.objects.filter(count__lt=0).exists())
+
+    def test_rebuild_keeps_history_in_its_store(self):
+        make_contract(self.offer, agent=self.agent)
+        expected = _rows()
+        rebuild_daily_sales()
+        self.assertEqual(_rows(), expected)
+
+
+class DeletedAgentTests(TransactionTestCase):
+    """Contracts of deleted agents share one row per key."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.offer = make_offer()
+        for username in ['first', 'second']:
+            make_contract(self.offer, agent=make_agent(username, store_location='Alger Centre'))
+
+    def test_rows_of_deleted_agents_are_merged(self):
+        for agent in User.objects.filter(username__in=['first', 'second']):
+            agent.delete()
+        self.assertEqual(
+            list(DailySales.objects.values_list('agent', 'store_location', 'count')),
+            [(None, 'Alger Centre', 2)],
+        )
+
+        Contract.objects.filter(created_by__isnull=True).first().delete()
+        self.assertEqual(list(DailySales.objects.values_list('agent', 'count')), [(None, 1)])
+
+    def test_migration_rebuilds_the_rollup(self):
+        expected = _rows()
+        DailySales.objects.all().delete()
+        migration = import_module('apps.contracts.migrations.0017_rebuild_daily_sales')
+        migration.rebuild_daily_sales(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(_rows(), expected)
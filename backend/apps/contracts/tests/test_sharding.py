@@ -0,0 +1,128 @@
+"""
+Regional sharding on the primary and the test shard (see fixtures.sharded):
+where agents' contracts are written and read, and scatter aggregates.
+"""
+import io
+import zipfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.contracts.models import Contract, ContractNumber
+from apps.contracts.services.blobs import store_blob
+from apps.offers.models import Offer
+from apps.phone_numbers.models import PhoneNumber
+from djezzy_pos.sharding import scatter, shards, use_shard
+
+from .fixtures import TEST_SHARD, make_agent, make_contract, make_offer, sharded
+
+
+def contract_payload(offer, phone, number):
+    return {
+        'contract_number': number,
+        'customer_first_name': 'Amina', 'customer_last_name': 'Haddad',
+        'customer_birth_date': '1990-05-17', 'customer_birth_place': 'Oran',
+        'customer_sex': 'F', 'customer_nin': '109900123456789012',
+        'customer_id_number': '123456789', 'customer_id_expiry': '2030-01-31',
+        'customer_daira': 'Oran', 'customer_baladia': 'Oran',
+        'offer': offer.pk, 'phone_number': phone.pk,
+        'customer_phone': '0550123456',
+    }
+
+
+@sharded
+class ShardRoutingTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.offer = make_offer()
+        self.central = make_agent('central', store_location='Alger Centre')
+        self.regional = make_agent('regional', store_location='Oran')
+        self.admin = User.objects.create_user(
+            username='admin', password='secret-password', is_staff=True, role='admin'
+        )
+        self.client = APIClient()
+
+    def test_reference_rows_are_copied_to_the_shard(self):
+        self.assertEqual(shards(), [DEFAULT_DB_ALIAS, TEST_SHARD])
+        self.assertTrue(Offer.objects.using(TEST_SHARD).filter(pk=self.offer.pk).exists())
+        self.assertTrue(User.objects.using(TEST_SHARD).filter(pk=self.regional.pk).exists())
+
+    def test_agent_contract_is_written_to_the_agent_shard(self):
+        with use_shard(TEST_SHARD):
+            phone = PhoneNumber.objects.create(number='0770000009', offer=self.offer, status='available')
+        self.client.force_authenticate(self.regional)
+        response = self.client.post(
+            '/api/contracts/', contract_payload(self.offer, phone, 'DJ-20260101-0001'), format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+        contract = Contract.objects.using(TEST_SHARD).get()
+        self.assertEqual(contract.created_by_id, self.regional.pk)
+        self.assertFalse(Contract.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertEqual(PhoneNumber.objects.using(TEST_SHARD).get().status, 'assigned')
+
+    def test_number_registered_during_the_save_is_a_field_error(self):
+        with use_shard(TEST_SHARD):
+            phone = PhoneNumber.objects.create(number='0770000009', offer=self.offer, status='available')
+        # Another shard registers the number between validation and save
+        ContractNumber.objects.create(number='DJ-20260101-0002', shard=DEFAULT_DB_ALIAS)
+        self.client.force_authenticate(self.regional)
+        with mock.patch('apps.contracts.serializers.number_taken', return_value=False):
+            response = self.client.post(
+                '/api/contracts/', contract_payload(self.offer, phone, 'DJ-20260101-0002'), format='json'
+            )
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn('contract_number', response.json())
+        self.assertFalse(Contract.objects.using(TEST_SHARD).exists())
+        self.assertEqual(PhoneNumber.objects.using(TEST_SHARD).get().status, 'available')
+
+    def test_reads_go_to_the_shard_of_the_user_or_region(self):
+        central = make_contract(self.offer, agent=self.central, number='0770000001')
+        regional = make_contract(self.offer, agent=self.regional, number='0770000002')
+        self.assertEqual((central._state.db, regional._state.db), (DEFAULT_DB_ALIAS, TEST_SHARD))
+
+        def listed(user, query=''):
+            self.client.force_authenticate(user)
+            response = self.client.get(f'/api/contracts/{query}')
+            self.assertEqual(response.status_code, 200)
+            return [item['contract_number'] for item in response.json()['results']]
+
+        self.assertEqual(listed(self.regional), [regional.contract_number])
+        self.assertEqual(listed(self.central), [central.contract_number])
+        self.assertEqual(listed(self.admin), [central.contract_number])
+        self.assertEqual(listed(self.admin, '?region=ouest'), [regional.contract_number])
+
+    def test_scatter_aggregates_every_shard(self):
+        make_contract(self.offer, agent=self.central, number='0770000001')
+        for number in ['0770000002', '0770000003']:
+            make_contract(self.offer, agent=self.regional, number=number)
+
+        self.assertEqual(scatter(lambda: Contract.objects.count()), [1, 2])
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/contracts/stats/')
+        self.assertEqual(response.json()['total'], 3)
+        self.assertEqual(response.json()['by_offer'], {self.offer.name: 3})
+
+    def test_pdf_export_reads_every_shard(self):
+        for agent, number in [(self.central, '0770000001'), (self.regional, '0770000002')]:
+            using = DEFAULT_DB_ALIAS if agent is self.central else TEST_SHARD
+            name = store_blob(f'%PDF-1.4 {number}'.encode(), '.pdf', using=using)
+            self.addCleanup(default_storage.delete, name)
+            make_contract(self.offer, agent=agent, number=number, contract_number=f'DJ-20260101-{number[-4:]}',
+                          pdf_file=name)
+
+        def exported(query=''):
+            self.client.force_authenticate(self.admin)
+            response = self.client.get(f'/api/contracts/export-pdfs/{query}')
+            self.assertEqual(response.status_code, 200)
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+            return sorted(archive.namelist())
+
+        self.assertEqual(exported(), ['contrat_DJ-20260101-0001.pdf', 'contrat_DJ-20260101-0002.pdf'])
+        self.assertEqual(exported('?region=ouest'), ['contrat_DJ-20260101-0002.pdf'])
@@ -0,0 +1,108 @@
+"""
+The stats payloads read from the daily sales rollup, compared with the
+implementations that counted the contracts directly, on the same data.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.contracts.models import Contract
+from apps.contracts.services import rebuild_daily_sales
+
+from .fixtures import make_agent, make_contract, make_offer
+
+
+def previous_my_stats(user):
+    """my_stats before it was read from the rollup."""
+    user_contracts = Contract.objects.filter(created_by=user)
+    # Was timezone.now().date(); the local day is the intended change
+    today = timezone.localdate()
+    this_month = today.replace(day=1)
+
+    total = user_contracts.count()
+    today_count = user_contracts.filter(created_at__date=today).count()
+    this_month_count = user_contracts.filter(created_at__date__gte=this_month).count()
+    by_status = user_contracts.values('status').annotate(count=Count('id'))
+
+    validated_contracts = user_contracts.filter(status='validated')
+    revenue = validated_contracts.aggregate(total=Sum('offer__price'))['total'] or 0
+
+    by_offer = user_contracts.filter(status='validated').values(
+        'offer__name', 'offer__code'
+    ).annotate(count=Count('id')).order_by('-count')[:5]
+
+    daily_sales = []
+    for i in range(6, -1, -1):
+        day = today - timedelta(days=i)
+        count = user_contracts.filter(status='validated', created_at__date=day).count()
+        daily_sales.append({'date': day.strftime('%d/%m'), 'count': count})
+
+    return {
+        'total': total,
+        'today': today_count,
+        'this_month': this_month_count,
+        'by_status': {item['status']: item['count'] for item in by_status},
+        'revenue': float(revenue),
+        'by_offer': [
+            {'name': item['offer__name'], 'code': item['offer__code'], 'count': item['count']}
+            for item in by_offer
+        ],
+        'daily_sales': daily_sales,
+    }
+
+
+def previous_stats():
+    """stats before it was read from the rollup."""
+    by_status = Contract.objects.values('status').annotate(count=Count('id'))
+    by_offer = Contract.objects.values('offer__name').annotate(count=Count('id'))
+    return {
+        'total': Contract.objects.count(),
+        'by_status': {item['status']: item['count'] for item in by_status},
+        'by_offer': {item['offer__name']: item['count'] for item in by_offer},
+    }
+
+
+class StatsPayloadTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def setUp(self):
+        offers = [
+            make_offer('LEGEND', '2000.00'),
+            make_offer('HADRA', '1000.00'),
+            make_offer('SAHLA', '500.00'),
+        ]
+        self.agent = make_agent()
+        other = make_agent('other-agent', store_location='Blida')
+        today = timezone.localdate()
+        # (offer, status, days ago, agent): distinct counts per offer keep the top offers ordered
+        sales = [
+            (0, 'validated', 0, self.agent), (0, 'validated', 0, self.agent),
+            (0, 'validated', 1, self.agent), (0, 'validated', 6, self.agent),
+            (1, 'validated', 3, self.agent), (1, 'validated', 45, self.agent),
+            (2, 'validated', 7, self.agent),
+            (0, 'signed', 0, self.agent), (1, 'signed', 20, self.agent),
+            (2, 'validated', 0, other), (1, 'signed', 2, other),
+        ]
+        for offer, status, days_ago, agent in sales:
+            contract = make_contract(offers[offer], agent=agent, status=status)
+            day = today - timedelta(days=days_ago)
+            Contract.objects.filter(pk=contract.pk).update(
+                created_at=timezone.make_aware(datetime.combine(day, time(12))), sale_date=day
+            )
+        rebuild_daily_sales()
+        self.client = APIClient()
+        self.client.force_authenticate(self.agent)
+
+    def test_my_stats_payload_unchanged(self):
+        response = self.client.get('/api/contracts/my-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), previous_my_stats(self.agent))
+
+    def test_stats_payload_unchanged(self):
+        response = self.client.get('/api/contracts/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), previous_stats())
@@ -1,13 +1,60 @@
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.http import FileResponse
-from django.shortcuts import get_object_or_404
+from django.db import router
+from django.http import FileResponse, Http404, HttpResponseRedirect, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Contract
+from djezzy_pos.db_router import ReplicaReadsMixin
+from djezzy_pos.sharding import current_shard, scatter, shards, use_shard
+from .models import Contract, DailySales
 from .serializers import ContractSerializer, ContractCreateSerializer
-from .services import ContractPDFGenerator
+from .services import (
+    ContractPDFGenerator, RenderPoolBroken, RenderQueueFull, get_or_enqueue_pdf,
+    number_shard, stream_contract_pdfs_zip
+)
+
+# Seconds before asking again for a PDF being rendered
+PDF_RETRY_AFTER = 2
+
+
+def _contract_pdf_response(contract, disposition):
+    """
+    Serve the PDF uploaded by the mobile app, or a server-generated one
+    when the upload is missing. A missing generated PDF is rendered in the
+    background: 202 until it is ready. Files in a bucket are not proxied:
+    the client is redirected to a short-lived presigned URL.
+    """
+    if contract.pdf_file:
+        name = contract.pdf_file.name
+    else:
+        try:
+            name = get_or_enqueue_pdf(contract)
+        except (RenderQueueFull, RenderPoolBroken):
+            return Response(
+                {'error': 'PDF temporairement indisponible, veuillez reessayer.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '5'}
+            )
+        if name is None:
+            # Refresh: browsers opening the QR code link reload on their own
+            return Response(
+                {'status': 'pending', 'detail': 'PDF en cours de generation, veuillez reessayer.'},
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Retry-After': str(PDF_RETRY_AFTER), 'Refresh': str(PDF_RETRY_AFTER)}
+            )
+
+    storage = contract.pdf_file.storage
+    content_disposition = f'{disposition}; filename="contrat_{contract.contract_number}.pdf"'
+    url = storage.download_url(
+        name, content_type='application/pdf', content_disposition=content_disposition
+    )
+    if url:
+        return HttpResponseRedirect(url)
+
+    response = FileResponse(storage.open(name, 'rb'), content_type='application/pdf')
+    response['Content-Disposition'] = content_disposition
+    return response
 
 
 @api_view(['GET'])
@@ -17,25 +64,26 @@ def public_contract_pdf(request, contract_number):
     Public endpoint to download contract PDF via QR code.
     No authentication required.
     """
-    contract = get_object_or_404(Contract, contract_number=contract_number)
-
-    # Check if PDF exists
-    if not contract.pdf_file:
-        return Response(
-            {'error': 'PDF non disponible'},
-            status=status.HTTP_404_NOT_FOUND
-        )
+    def matches():
+        return list(Contract.objects.select_related('offer', 'phone_number').filter(
+            contract_number=contract_number
+        )[:2])
 
-    # Return saved PDF file (generated by mobile app)
-    response = FileResponse(
-        contract.pdf_file.open('rb'),
-        content_type='application/pdf'
-    )
-    response['Content-Disposition'] = f'inline; filename="contrat_{contract.contract_number}.pdf"'
-    return response
+    # Anonymous: the shard of the registered number, else every shard
+    alias = number_shard(contract_number)
+    if alias is not None:
+        with use_shard(alias):
+            found = matches()
+    else:
+        found = [contract for shard_matches in scatter(matches) for contract in shard_matches]
+    # A number used twice (before the registry) could serve someone else's contract
+    if len(found) != 1:
+        raise Http404
+    contract = found[0]
+    return _contract_pdf_response(contract, 'inline')
 
 
-class ContractViewSet(viewsets.ModelViewSet):
+class ContractViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """ViewSet for contracts."""
 
     queryset = Contract.objects.all()
@@ -77,37 +125,80 @@ class ContractViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
-        """Download contract PDF. Returns the saved PDF from mobile app."""
+        """Download contract PDF. Falls back to a server-generated PDF if the app did not upload one."""
         contract = self.get_object()
+        return _contract_pdf_response(contract, 'attachment')
+
+    @action(detail=False, methods=['get'], url_path='export-pdfs',
+            permission_classes=[IsAdminUser])
+    def export_pdfs(self, request):
+        """
+        Stream a ZIP of contract PDFs of every shard, or of ?region= (admin only).
+        Filters: agent (user id), store, month (YYYY-MM), date_from, date_to (YYYY-MM-DD)
+        plus the regular status/offer filters.
+        """
+        from datetime import date
 
-        # Check if PDF exists
-        if not contract.pdf_file:
+        contracts = self.filter_queryset(self.get_queryset())
+        params = request.query_params
+
+        try:
+            if params.get('agent'):
+                contracts = contracts.filter(created_by_id=int(params['agent']))
+            if params.get('month'):
+                year, month = (int(part) for part in params['month'].split('-'))
+                start = date(year, month, 1)
+                end = date(year + month // 12, month % 12 + 1, 1)
+                contracts = contracts.filter(sale_date__gte=start, sale_date__lt=end)
+            if params.get('date_from'):
+                contracts = contracts.filter(sale_date__gte=date.fromisoformat(params['date_from']))
+            if params.get('date_to'):
+                contracts = contracts.filter(sale_date__lte=date.fromisoformat(params['date_to']))
+        except ValueError:
             return Response(
-                {'error': 'PDF non disponible'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'Parametres de filtre invalides.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        if params.get('store'):
+            contracts = contracts.filter(store_location=params['store'])
 
-        # Return saved PDF file (generated by mobile app)
-        response = FileResponse(
-            contract.pdf_file.open('rb'),
-            content_type='application/pdf'
+        # The archive is read after the view returns: fix the databases now
+        aliases = [current_shard()] if params.get('region') else shards()
+        databases = []
+        for alias in aliases:
+            with use_shard(alias):
+                databases.append(router.db_for_read(Contract))
+        response = StreamingHttpResponse(
+            stream_contract_pdfs_zip(*(contracts.using(database) for database in databases)),
+            content_type='application/zip'
         )
-        response['Content-Disposition'] = f'attachment; filename="contrat_{contract.contract_number}.pdf"'
+        response['Content-Disposition'] = 'attachment; filename="contrats.zip"'
         return response
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Return contract statistics."""
-        from django.db.models import Count
+        """Return contract statistics, read from the daily sales rollup of every shard."""
+        from collections import Counter
+        from django.db.models import Sum
+
+        def counts():
+            rows = DailySales.objects.order_by()
+            by_status = rows.values('status').annotate(total=Sum('count'))
+            by_offer = rows.values('offer__name').annotate(total=Sum('count'))
+            return (
+                {item['status']: item['total'] for item in by_status},
+                {item['offer__name']: item['total'] for item in by_offer},
+            )
 
-        total = Contract.objects.count()
-        by_status = Contract.objects.values('status').annotate(count=Count('id'))
-        by_offer = Contract.objects.values('offer__name').annotate(count=Count('id'))
+        by_status, by_offer = Counter(), Counter()
+        for shard_status, shard_offer in scatter(counts):
+            by_status.update(shard_status)
+            by_offer.update(shard_offer)
 
         return Response({
-            'total': total,
-            'by_status': {item['status']: item['count'] for item in by_status},
-            'by_offer': {item['offer__name']: item['count'] for item in by_offer},
+            'total': sum(by_status.values()),
+            'by_status': {name: total for name, total in by_status.items() if total},
+            'by_offer': {name: total for name, total in by_offer.items() if total},
         })
 
     @action(detail=False, methods=['get'], url_path='my-contracts')
@@ -121,53 +212,50 @@ class ContractViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='my-stats')
     def my_stats(self, request):
-        """Get statistics for the authenticated user's contracts."""
-        from django.db.models import Count, Sum
+        """
+        Get statistics for the authenticated user's contracts.
+        Read from the daily sales rollup: one query per status, one per offer.
+        """
+        from django.db.models import Q, Sum
         from django.utils import timezone
         from datetime import timedelta
 
-        user_contracts = Contract.objects.filter(created_by=request.user)
-        today = timezone.now().date()
-        this_month = today.replace(day=1)
-
-        total = user_contracts.count()
-        today_count = user_contracts.filter(created_at__date=today).count()
-        this_month_count = user_contracts.filter(created_at__date__gte=this_month).count()
-        by_status = user_contracts.values('status').annotate(count=Count('id'))
+        user_sales = DailySales.objects.filter(agent=request.user)
+        today = timezone.localdate()
+        days = [today - timedelta(days=i) for i in range(6, -1, -1)]
 
-        # Revenue from validated contracts
-        validated_contracts = user_contracts.filter(status='validated')
-        revenue = validated_contracts.aggregate(
-            total=Sum('offer__price')
-        )['total'] or 0
+        # Totals, today, this month and revenue, grouped by status
+        by_status = [item for item in user_sales.values('status').annotate(
+            total=Sum('count'),
+            today=Sum('count', filter=Q(day=today), default=0),
+            this_month=Sum('count', filter=Q(day__gte=today.replace(day=1)), default=0),
+            revenue=Sum('revenue'),
+        ).order_by() if item['total']]
+        validated = next((item for item in by_status if item['status'] == 'validated'), None)
 
-        # Sales by offer (for Top Offers chart)
-        by_offer = user_contracts.filter(status='validated').values(
+        # Top offers and the 7-day chart, grouped by offer
+        by_offer = [item for item in user_sales.filter(status='validated').values(
             'offer__name', 'offer__code'
-        ).annotate(count=Count('id')).order_by('-count')[:5]
-
-        # Daily sales for last 7 days (for Sales Performance chart)
-        daily_sales = []
-        for i in range(6, -1, -1):
-            day = today - timedelta(days=i)
-            count = user_contracts.filter(
-                status='validated',
-                created_at__date=day
-            ).count()
-            daily_sales.append({
-                'date': day.strftime('%d/%m'),
-                'count': count
-            })
+        ).annotate(
+            total=Sum('count'),
+            **{f'day_{i}': Sum('count', filter=Q(day=day), default=0) for i, day in enumerate(days)}
+        ).order_by('-total') if item['total']]
 
         return Response({
-            'total': total,
-            'today': today_count,
-            'this_month': this_month_count,
-            'by_status': {item['status']: item['count'] for item in by_status},
-            'revenue': float(revenue),
+            'total': sum(item['total'] for item in by_status),
+            'today': sum(item['today'] for item in by_status),
+            'this_month': sum(item['this_month'] for item in by_status),
+            'by_status': {item['status']: item['total'] for item in by_status},
+            'revenue': float(validated['revenue'] or 0) if validated else 0.0,
             'by_offer': [
-                {'name': item['offer__name'], 'code': item['offer__code'], 'count': item['count']}
-                for item in by_offer
+                {'name': item['offer__name'], 'code': item['offer__code'], 'count': item['total']}
+                for item in by_offer[:5]
+            ],
+            'daily_sales': [
+                {
+                    'date': day.strftime('%d/%m'),
+                    'count': sum(item[f'day_{i}'] for item in by_offer)
+                }
+                for i, day in enumerate(days)
             ],
-            'daily_sales': daily_sales,
         })
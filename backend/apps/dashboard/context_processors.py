@@ -0,0 +1,11 @@
+from django.conf import settings
+
+
+def events(request):
+    """How dashboard pages follow live changes (see api.events in api.js)."""
+    return {
+        'events_config': {
+            'url': settings.EVENTS_STREAM_URL,
+            'poll_ms': settings.EVENTS_FALLBACK_POLL * 1000,
+        },
+    }
@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
+from apps.accounts.throttling import LOGIN_THROTTLES, throttle_wait
 from apps.contracts.models import Contract
 
 
@@ -18,6 +19,12 @@ def login_view(request):
         username = request.POST.get('username', '').strip()
         password = request.POST.get('password', '')
 
+        # Checked before authenticate(), which runs the password hasher
+        wait = throttle_wait(request, LOGIN_THROTTLES)
+        if wait is not None:
+            error = f'Trop de tentatives. Reessayez dans {int(wait) + 1} secondes.'
+            return render(request, 'dashboard/login.html', {'error': error}, status=429)
+
         if username and password:
             user = authenticate(request, username=username, password=password)
             if user is not None:
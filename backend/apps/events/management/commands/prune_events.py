@@ -0,0 +1,31 @@
+"""
+Management command to delete old live events from the outbox.
+
+Clients only resume from recent ids, so rows older than the retention
+window are no longer needed. Run it from cron.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Delete live events older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.EVENTS_RETENTION_HOURS,
+            help='Keep events from the last N hours (default: EVENTS_RETENTION_HOURS)'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        deleted, _ = Event.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Done! Deleted {deleted} event(s).'))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('contract_created', 'Contrat cree'), ('number_assigned', 'Numero attribue'), ('number_status', 'Statut de numero modifie'), ('stock_low', 'Stock faible')], max_length=30, verbose_name='Type')),
+                ('payload', models.JSONField(default=dict, verbose_name='Donnees')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Date de creation')),
+            ],
+            options={
+                'verbose_name': 'Evenement',
+                'verbose_name_plural': 'Evenements',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='kind',
+            field=models.CharField(choices=[('contract_created', 'Contrat cree'), ('number_assigned', 'Numero attribue'), ('number_status', 'Statut de numero modifie'), ('stock_low', 'Stock faible'), ('inventory', 'Stock modifie en masse')], max_length=30, verbose_name='Type'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import models
+
+
+class Event(models.Model):
+    """
+    Outbox of live events pushed to dashboards over Server-Sent Events.
+    Rows are written in the same transaction as the change they describe.
+    """
+
+    KIND_CHOICES = [
+        ('contract_created', 'Contrat cree'),
+        ('number_assigned', 'Numero attribue'),
+        ('number_status', 'Statut de numero modifie'),
+        ('stock_low', 'Stock faible'),
+        ('inventory', 'Stock modifie en masse'),
+    ]
+
+    kind = models.CharField(
+        max_length=30,
+        choices=KIND_CHOICES,
+        verbose_name='Type'
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Donnees'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Date de creation'
+    )
+
+    class Meta:
+        verbose_name = 'Evenement'
+        verbose_name_plural = 'Evenements'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.id} - {self.kind}"
@@ -0,0 +1,137 @@
+"""
+Live events: an in-database outbox and a per-process broadcaster.
+
+`publish()` inserts an `Event` row inside the caller's transaction, so an
+event exists if and only if the change it describes was committed (for
+a change on a regional shard, the row is inserted once the shard commits,
+so a crash in between loses the event but never invents one). Each
+ASGI worker runs one poller task while it has subscribers; the task reads
+new rows from the outbox and wakes every open stream of that worker, so
+the database sees one query per poll interval per worker, not per client.
+"""
+import asyncio
+import weakref
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Event
+
+# Late commits can make a lower id appear after a higher one, so the poller
+# re-reads this many ids below its watermark and skips the ones it has seen.
+POLL_OVERLAP = 100
+BACKLOG_LIMIT = 500
+
+
+def publish(kind, **payload):
+    """Record an event; it is streamed once the current transaction commits."""
+    from djezzy_pos.sharding import current_shard
+
+    shard = current_shard()
+    if shard != DEFAULT_DB_ALIAS:
+        # The outbox is on the primary: record the event once the shard commits
+        transaction.on_commit(lambda: Event.objects.create(kind=kind, payload=payload), using=shard)
+        return None
+    return Event.objects.create(kind=kind, payload=payload)
+
+
+def _fetch_after(last_id, limit=BACKLOG_LIMIT):
+    events = Event.objects.filter(id__gt=last_id).order_by('id')[:limit]
+    return [(event.id, event.kind, event.payload) for event in events]
+
+
+def latest_event_id():
+    return Event.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _start_point():
+    """The latest event id, and the ids below it that the first poll re-reads."""
+    latest = latest_event_id()
+    recent = Event.objects.filter(id__gt=latest - POLL_OVERLAP, id__lte=latest)
+    return latest, set(recent.values_list('id', flat=True))
+
+
+class Broadcaster:
+    """Fans out new outbox rows to the streams of one event loop."""
+
+    def __init__(self):
+        self._events = deque(maxlen=BACKLOG_LIMIT)  # (seq, id, kind, payload)
+        self._seen = set()
+        self._seq = 0
+        self._watermark = None
+        self._subscribers = 0
+        self._changed = None
+        self._task = None
+        self._generation = self._task_generation = 0
+
+    async def subscribe(self):
+        """Register a stream and return the sequence number to read after."""
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        if self._subscribers == 0:
+            # Start from the outbox as it is now, not where the last poller
+            # stopped: events of the gap are not live (clients resume them
+            # with Last-Event-ID). A poller still winding down is retired.
+            self._generation += 1
+            generation = self._generation
+            start = await sync_to_async(_start_point)()
+            if generation == self._generation:
+                self._watermark, self._seen = start
+        self._subscribers += 1
+        if self._task is None or self._task.done() or self._task_generation != self._generation:
+            self._task = asyncio.ensure_future(self._poll(self._generation))
+            self._task_generation = self._generation
+        return self._seq
+
+    def unsubscribe(self):
+        self._subscribers -= 1
+
+    async def _poll(self, generation):
+        while self._subscribers > 0 and generation == self._generation:
+            rows = await sync_to_async(_fetch_after)(max(0, self._watermark - POLL_OVERLAP))
+            if generation != self._generation:
+                return
+            fresh = [row for row in rows if row[0] not in self._seen]
+            if fresh:
+                for event_id, kind, payload in fresh:
+                    self._seq += 1
+                    self._events.append((self._seq, event_id, kind, payload))
+                    self._seen.add(event_id)
+                    self._watermark = max(self._watermark, event_id)
+                # Forget ids that can no longer be re-read
+                self._seen = {i for i in self._seen if i > self._watermark - POLL_OVERLAP}
+                async with self._changed:
+                    self._changed.notify_all()
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+
+    async def wait(self, after_seq, timeout):
+        """Return events published after `after_seq`, waiting up to `timeout`."""
+        events = [event for event in self._events if event[0] > after_seq]
+        if events:
+            return events
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self._seq > after_seq), timeout
+                )
+            except asyncio.TimeoutError:
+                return []
+        return [event for event in self._events if event[0] > after_seq]
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def get_broadcaster():
+    """Return the broadcaster of the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = Broadcaster()
+    return _broadcasters[loop]
+
+
+async def backlog(last_id):
+    """Events committed after `last_id`, for clients resuming with Last-Event-ID."""
+    return await sync_to_async(_fetch_after)(last_id)
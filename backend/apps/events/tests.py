@@ -0,0 +1,54 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.test import AsyncClient, TransactionTestCase, override_settings
+
+from apps.accounts.models import User
+
+from .services import Broadcaster, publish
+
+
+class EventStreamTests(TransactionTestCase):
+    """The stream is only served by ASGI workers."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='secret-password', is_staff=True)
+
+    def test_wsgi_worker_declines_the_stream(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, 204)
+
+    async def test_asgi_worker_streams(self):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.user)
+        response = await client.get('/api/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(await anext(aiter(response.streaming_content)), f'retry: {settings.EVENTS_RETRY_MS}\n\n'.encode())
+
+
+@override_settings(EVENTS_POLL_INTERVAL=0.01)
+class BroadcasterTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    async def test_resubscribe_does_not_replay_old_events(self):
+        await sync_to_async(publish)('stock_changed', offer='LEGEND')
+        broadcaster = Broadcaster()
+        seq = await broadcaster.subscribe()
+        self.assertEqual(await broadcaster.wait(seq, 0.2), [])
+        broadcaster.unsubscribe()
+        await asyncio.sleep(0.05)  # The poller stops without subscribers
+
+        await sync_to_async(publish)('stock_changed', offer='HADRA')
+        seq = await broadcaster.subscribe()
+        self.assertEqual(await broadcaster.wait(seq, 0.2), [])
+
+        live = await sync_to_async(publish)('stock_changed', offer='SAHLA')
+        events = await broadcaster.wait(seq, 1)
+        broadcaster.unsubscribe()
+        self.assertEqual([event[1] for event in events], [live.id])
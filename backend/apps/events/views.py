@@ -0,0 +1,92 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from apps.accounts.authentication import CachedJWTAuthentication
+
+from .services import backlog, get_broadcaster
+
+
+def _authenticate(request):
+    """Session user for the dashboard, or a Bearer token for the mobile app."""
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    user = result[0] if result else request.user
+    return user if user.is_authenticated and user.is_active else None
+
+
+def _visible(user, kind, payload):
+    # Agents only follow their own sales; stock and number events are shared
+    if kind == 'contract_created' and not user.is_staff:
+        return payload.get('agent_id') == user.id
+    return True
+
+
+def _format(event_id, kind, payload):
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def _stream(user, last_id):
+    broadcaster = get_broadcaster()
+    seq = await broadcaster.subscribe()
+    deadline = time.monotonic() + settings.EVENTS_STREAM_LIFETIME
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+
+        sent = set()
+        if last_id is not None:
+            for event_id, kind, payload in await backlog(last_id):
+                sent.add(event_id)
+                if _visible(user, kind, payload):
+                    yield _format(event_id, kind, payload)
+
+        # Streams end after a while; EventSource reconnects with Last-Event-ID
+        while time.monotonic() < deadline:
+            events = await broadcaster.wait(seq, settings.EVENTS_HEARTBEAT)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            # Advancing seq marks these events as read for the next wait
+            for seq, event_id, kind, payload in events:
+                if event_id in sent or (last_id is not None and event_id <= last_id):
+                    continue
+                if _visible(user, kind, payload):
+                    yield _format(event_id, kind, payload)
+    finally:
+        broadcaster.unsubscribe()
+
+
+async def event_stream(request):
+    """
+    Server-Sent Events stream of contract, phone number and stock events.
+    Resumes after the Last-Event-ID header (or ?last_event_id=) when given.
+    Only served by ASGI workers (see EVENTS_STREAM_URL).
+    """
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the stream until it ends, held the whole
+        # time. 204 makes EventSource stop reconnecting; pages poll instead.
+        return HttpResponse(status=204)
+
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse(
+            {'error': 'Authentification requise.'}, status=401
+        )
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+
+    response = StreamingHttpResponse(_stream(user, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from apps.phone_numbers.services import offer_counts
 from .models import Offer
 
 
@@ -7,8 +8,10 @@ from .models import Offer
 class OfferAdmin(admin.ModelAdmin):
     list_display = [
         'name', 'code', 'formatted_price_display', 'data_display',
-        'validity_display', 'is_active', 'display_order'
+        'validity_display', 'available_display', 'assigned_display',
+        'is_active', 'display_order'
     ]
+    list_select_related = ['inventory']
     list_filter = ['is_active', 'validity_days']
     search_fields = ['name', 'code', 'description']
     list_editable = ['display_order', 'is_active']
@@ -43,6 +46,14 @@ class OfferAdmin(admin.ModelAdmin):
         gb = obj.data_allowance_mb / 1024
         return f"{int(gb)} Go" if gb >= 1 else f"{obj.data_allowance_mb} Mo"
 
+    @admin.display(description='Disponibles')
+    def available_display(self, obj):
+        return offer_counts(obj)['available']
+
+    @admin.display(description='Attribues')
+    def assigned_display(self, obj):
+        return offer_counts(obj)['assigned']
+
     @admin.display(description='Validite')
     def validity_display(self, obj):
         if obj.validity_days == 1:
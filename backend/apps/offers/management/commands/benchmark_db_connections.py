@@ -0,0 +1,89 @@
+"""
+Management command to measure the cost of opening database connections.
+
+Calls /api/offers/active/ through the WSGI handler, as gunicorn does, so
+Django closes or keeps the connection after each request according to
+CONN_MAX_AGE. Runs once with a new connection per request and once with
+persistent connections, and reports p50/p99 latency and connections opened.
+"""
+
+import io
+import statistics
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+PATH = '/api/offers/active/'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark /api/offers/active/ with and without persistent DB connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Requests per mode (default: 500)'
+        )
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=None,
+            help='CONN_MAX_AGE of the persistent mode (default: the configured one, or 60)'
+        )
+
+    def handle(self, *args, **options):
+        max_age = options['max_age']
+        if max_age is None:
+            max_age = connection.settings_dict.get('CONN_MAX_AGE') or 60
+
+        handler = WSGIHandler()
+        opened = []
+        counter = lambda **kwargs: opened.append(1)
+        connection_created.connect(counter)
+        original = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            self.stdout.write(f'{connection.vendor}, {options["requests"]} requests per mode\n')
+            self.stdout.write(f'{"mode":<24} {"connections":>11} {"p50 ms":>9} {"p99 ms":>9}')
+            for label, age in [('per request', 0), (f'persistent ({max_age}s)', max_age)]:
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = age
+                opened.clear()
+                timings = self._run(handler, options['requests'])
+                timings.sort()
+                p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+                self.stdout.write(
+                    f'{label:<24} {len(opened):>11} '
+                    f'{statistics.median(timings):>9.2f} {p99:>9.2f}'
+                )
+        finally:
+            connection_created.disconnect(counter)
+            connection.settings_dict['CONN_MAX_AGE'] = original
+            connection.close()
+        self.stdout.write(self.style.SUCCESS('\nDone!'))
+
+    def _run(self, handler, count):
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*'), 'localhost')
+        timings = []
+        for _ in range(count):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': PATH,
+                'SERVER_NAME': host.lstrip('.'),
+                'SERVER_PORT': '80',
+                'HTTP_HOST': host.lstrip('.'),
+                'wsgi.input': io.BytesIO(b''),
+                'wsgi.url_scheme': 'http',
+            }
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            # Fires request_finished, which closes or keeps the connection
+            response.close()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -1,5 +1,7 @@
 from django.db import models
 
+from djezzy_pos.sharding import ReferenceQuerySet, copy_to_shards, delete_from_shards
+
 
 class Offer(models.Model):
     """Djezzy offer model."""
@@ -70,6 +72,9 @@ class Offer(models.Model):
         verbose_name='Derniere modification'
     )
 
+    # Copied to the shards, which keep contracts and numbers of their offers
+    objects = ReferenceQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Offre'
         verbose_name_plural = 'Offres'
@@ -78,6 +83,14 @@ class Offer(models.Model):
     def __str__(self):
         return f"{self.name} - {self.price} {self.currency}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        copy_to_shards(Offer, [self.pk], using=kwargs.get('using'))
+
+    def delete(self, *args, **kwargs):
+        delete_from_shards(Offer, [self.pk], using=kwargs.get('using'))
+        return super().delete(*args, **kwargs)
+
     @property
     def data_allowance_gb(self):
         """Return data allowance in GB."""
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from apps.phone_numbers.services import offer_counts
 from .models import Offer
 
 
@@ -25,7 +26,9 @@ class OfferSerializer(serializers.ModelSerializer):
 
     def get_available_phone_numbers(self, obj):
         """Return available phone numbers for this offer."""
-        available = obj.phone_numbers.filter(status='available')
+        available = getattr(obj, 'available_numbers', None)
+        if available is None:
+            available = obj.phone_numbers.filter(status='available')
         return [
             {
                 'id': pn.id,
@@ -37,8 +40,8 @@ class OfferSerializer(serializers.ModelSerializer):
 
     def get_available_count(self, obj):
         """Return count of available phone numbers."""
-        return obj.phone_numbers.filter(status='available').count()
+        return offer_counts(obj)['available']
 
     def get_distributed_count(self, obj):
         """Return count of distributed/assigned phone numbers."""
-        return obj.phone_numbers.filter(status='assigned').count()
+        return offer_counts(obj)['assigned']
@@ -2,19 +2,37 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
+from djezzy_pos.db_router import ReplicaReadsMixin
+from djezzy_pos.sharding import shards
+from apps.phone_numbers.models import PhoneNumber
 from .models import Offer
 from .serializers import OfferSerializer
 
 
-class OfferViewSet(viewsets.ModelViewSet):
+class OfferViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """ViewSet for Djezzy offers."""
 
-    queryset = Offer.objects.all()
+    # Counts come from the inventory row; available numbers in one extra query
+    queryset = Offer.objects.select_related('inventory').prefetch_related(
+        Prefetch(
+            'phone_numbers',
+            queryset=PhoneNumber.objects.filter(status='available'),
+            to_attr='available_numbers'
+        )
+    )
     serializer_class = OfferSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['is_active']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if len(shards()) > 1:
+            # Inventories live on the shards, not next to the offers
+            queryset = queryset.select_related(None).prefetch_related('inventory')
+        return queryset
+
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'active']:
             return [AllowAny()]
@@ -23,6 +41,6 @@ class OfferViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Return only active offers."""
-        offers = Offer.objects.filter(is_active=True).order_by('display_order')
+        offers = self.get_queryset().filter(is_active=True).order_by('display_order')
         serializer = self.get_serializer(offers, many=True)
         return Response(serializer.data)
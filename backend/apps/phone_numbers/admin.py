@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import PhoneNumber
+from .models import OfferInventory, PhoneNumber
 
 
 @admin.register(PhoneNumber)
@@ -57,16 +57,48 @@ class PhoneNumberAdmin(admin.ModelAdmin):
 
     @admin.action(description='Marquer comme disponible')
     def mark_available(self, request, queryset):
-        for phone in queryset:
-            phone.make_available()
-        self.message_user(request, f'{queryset.count()} numero(s) marque(s) comme disponible(s).')
+        updated = queryset.set_status(
+            'available', assigned_to_name='', assigned_to_nin='', assigned_date=None
+        )
+        self.message_user(request, f'{updated} numero(s) marque(s) comme disponible(s).')
 
     @admin.action(description='Bloquer les numeros')
     def mark_blocked(self, request, queryset):
-        updated = queryset.update(status='blocked')
+        updated = queryset.set_status('blocked')
         self.message_user(request, f'{updated} numero(s) bloque(s).')
 
     @admin.action(description='Reserver les numeros')
     def mark_reserved(self, request, queryset):
-        updated = queryset.update(status='reserved')
+        updated = queryset.set_status('reserved')
         self.message_user(request, f'{updated} numero(s) reserve(s).')
+
+
+@admin.register(OfferInventory)
+class OfferInventoryAdmin(admin.ModelAdmin):
+    list_display = [
+        'offer', 'available', 'assigned', 'reserved', 'blocked',
+        'low_stock_threshold', 'low_stock_badge', 'updated_at'
+    ]
+    list_editable = ['low_stock_threshold']
+    list_select_related = ['offer']
+    search_fields = ['offer__name', 'offer__code']
+    readonly_fields = ['offer', 'available', 'assigned', 'reserved', 'blocked', 'updated_at']
+    fields = [
+        'offer', 'available', 'assigned', 'reserved', 'blocked',
+        'low_stock_threshold', 'updated_at'
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Stock')
+    def low_stock_badge(self, obj):
+        if obj.available > obj.threshold:
+            return format_html('<span style="color: #28a745;">{}</span>', 'OK')
+        return format_html(
+            '<span style="color: #dc3545; font-weight: bold;">Faible (seuil {})</span>',
+            obj.threshold
+        )
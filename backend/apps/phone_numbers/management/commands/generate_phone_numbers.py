@@ -3,7 +3,9 @@ Management command to generate sample phone numbers for testing.
 """
 
 import random
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
 from apps.phone_numbers.models import PhoneNumber
 from apps.offers.models import Offer
 
@@ -23,12 +25,20 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing phone numbers before generating new ones'
         )
+        parser.add_argument(
+            '--region',
+            choices=sorted(settings.SHARD_REGIONS),
+            help='Regional shard to stock (default: the primary database)'
+        )
 
     def handle(self, *args, **options):
         count = options['count']
+        numbers = PhoneNumber.objects.db_manager(
+            settings.SHARD_REGIONS.get(options['region'], DEFAULT_DB_ALIAS)
+        )
 
         if options['clear']:
-            deleted_count = PhoneNumber.objects.all().delete()[0]
+            deleted_count = numbers.all().delete()[0]
             self.stdout.write(
                 self.style.WARNING(f'Deleted {deleted_count} existing phone numbers')
             )
@@ -62,8 +72,8 @@ class Command(BaseCommand):
                     suffix = ''.join([str(random.randint(0, 9)) for _ in range(6)])
                     number = f'{prefix}{suffix}'
 
-                    if not PhoneNumber.objects.filter(number=number).exists():
-                        PhoneNumber.objects.create(
+                    if not numbers.filter(number=number).exists():
+                        numbers.create(
                             number=number,
                             offer=offer,
                             status='available'
@@ -87,7 +97,7 @@ class Command(BaseCommand):
         # Show distribution summary
         self.stdout.write('\nDistribution by offer:')
         for offer in offers:
-            count = PhoneNumber.objects.filter(offer=offer).count()
+            count = numbers.filter(offer=offer).count()
             self.stdout.write(f'  - {offer.name}: {count} numbers')
 
     def _calculate_distribution(self, offers, total_count):
@@ -0,0 +1,50 @@
+"""
+Management command to recount the per-offer phone number inventory.
+
+Counters follow every status change made through the ORM; run this after
+editing numbers directly in the database, or from cron as a safety net.
+Every regional shard is reconciled.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.offers.models import Offer
+from apps.phone_numbers.services import reconcile_inventory
+from djezzy_pos.sharding import shards, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Recount OfferInventory counters from phone numbers and fix drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--offer',
+            action='append',
+            dest='offers',
+            help='Only reconcile this offer code (repeatable)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without fixing it'
+        )
+
+    def handle(self, *args, **options):
+        offer_ids = None
+        if options['offers']:
+            offer_ids = list(Offer.objects.filter(code__in=options['offers']).values_list('id', flat=True))
+
+        names = dict(Offer.objects.values_list('id', 'name'))
+        drifted = 0
+        for alias in shards():
+            with use_shard(alias):
+                drift = reconcile_inventory(offer_ids, dry_run=options['dry_run'])
+            drifted += len(drift)
+            for offer_id, statuses in drift.items():
+                details = ', '.join(
+                    f'{status} {counter} -> {actual}' for status, (counter, actual) in statuses.items()
+                )
+                self.stdout.write(self.style.WARNING(f'  [{alias}] {names[offer_id]}: {details}'))
+
+        action = 'found' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Offers with drift {action}: {drifted}'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('phone_numbers', '0002_add_offer_to_phonenumber'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='phonenumber',
+            index=models.Index(fields=['status'], name='phone_number_status_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+STATUSES = ['available', 'assigned', 'reserved', 'blocked']
+
+
+def count_inventory(apps, schema_editor):
+    PhoneNumber = apps.get_model('phone_numbers', 'PhoneNumber')
+    OfferInventory = apps.get_model('phone_numbers', 'OfferInventory')
+    db = schema_editor.connection.alias
+
+    counts = {}
+    grouped = PhoneNumber.objects.using(db).filter(offer__isnull=False).values(
+        'offer', 'status'
+    ).annotate(total=Count('id')).order_by()
+    for item in grouped:
+        if item['status'] in STATUSES:
+            counts.setdefault(item['offer'], {})[item['status']] = item['total']
+    OfferInventory.objects.using(db).bulk_create([
+        OfferInventory(offer_id=offer_id, **statuses)
+        for offer_id, statuses in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0002_remove_is_featured'),
+        ('phone_numbers', '0003_phonenumber_status_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferInventory',
+            fields=[
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory', serialize=False, to='offers.offer', verbose_name='Offre')),
+                ('available', models.IntegerField(default=0, verbose_name='Disponibles')),
+                ('assigned', models.IntegerField(default=0, verbose_name='Attribues')),
+                ('reserved', models.IntegerField(default=0, verbose_name='Reserves')),
+                ('blocked', models.IntegerField(default=0, verbose_name='Bloques')),
+                ('low_stock_threshold', models.PositiveIntegerField(blank=True, help_text='Laisser vide pour utiliser le seuil par defaut.', null=True, verbose_name='Seuil de stock faible')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Derniere modification')),
+            ],
+            options={
+                'verbose_name': 'Stock par offre',
+                'verbose_name_plural': 'Stocks par offre',
+                'ordering': ['offer__display_order', 'offer__name'],
+            },
+        ),
+        migrations.RunPython(count_inventory, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,35 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, router, transaction
 from django.core.validators import RegexValidator
 
 
+class PhoneNumberQuerySet(models.QuerySet):
+    """Bulk operations that keep the offer inventory counters in step."""
+
+    def set_status(self, status, **fields):
+        """Update the status (and other fields) of every number in the queryset."""
+        from djezzy_pos.sharding import use_shard
+        from .services import move_numbers
+        with use_shard(self.db), transaction.atomic(using=self.db):
+            move_numbers(self, status)
+            return self.update(status=status, **fields)
+
+    def delete(self):
+        from djezzy_pos.sharding import use_shard
+        from .services import remove_numbers
+        with use_shard(self.db), transaction.atomic(using=self.db):
+            remove_numbers(self)
+            return super().delete()
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from djezzy_pos.sharding import use_shard
+        from .services import add_numbers
+        with use_shard(self.db), transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            add_numbers(objs, exact=not (kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts')))
+        return objs
+
+
 class PhoneNumber(models.Model):
     """Phone number model for Djezzy SIM cards."""
 
@@ -65,14 +93,58 @@ class PhoneNumber(models.Model):
         verbose_name='Derniere modification'
     )
 
+    objects = PhoneNumberQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Numero de telephone'
         verbose_name_plural = 'Numeros de telephone'
         ordering = ['number']
+        indexes = [
+            models.Index(fields=['status'], name='phone_number_status_idx'),
+        ]
 
     def __str__(self):
         return self.formatted_number
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_state = (instance.__dict__.get('offer_id'), instance.__dict__.get('status'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        from apps.events.services import publish
+        from djezzy_pos.sharding import use_shard
+        from .services import move_number
+        adding = self._state.adding
+        previous_offer, previous = getattr(self, '_loaded_state', (None, None))
+        using = kwargs.get('using') or router.db_for_write(PhoneNumber, instance=self)
+        with use_shard(using), transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if previous is not None and previous != self.status:
+                publish(
+                    'number_assigned' if self.status == 'assigned' else 'number_status',
+                    id=self.pk,
+                    number=self.number,
+                    status=self.status,
+                    previous=previous,
+                    offer_id=self.offer_id,
+                )
+            if adding:
+                move_number(None, (self.offer_id, self.status))
+            elif previous is not None:
+                move_number((previous_offer, previous), (self.offer_id, self.status))
+        self._loaded_state = (self.offer_id, self.status)
+
+    def delete(self, *args, **kwargs):
+        from djezzy_pos.sharding import use_shard
+        from .services import move_number
+        offer_id, status = getattr(self, '_loaded_state', (self.offer_id, self.status))
+        using = kwargs.get('using') or router.db_for_write(PhoneNumber, instance=self)
+        with use_shard(using), transaction.atomic(using=using):
+            move_number((offer_id, status), None)
+            return super().delete(*args, **kwargs)
+
     @property
     def formatted_number(self):
         """Return formatted phone number."""
@@ -96,3 +168,51 @@ class PhoneNumber(models.Model):
         self.assigned_to_nin = ''
         self.assigned_date = None
         self.save()
+
+
+class OfferInventory(models.Model):
+    """
+    Number of phone numbers of an offer in each status.
+    Kept up to date on every status change; see `reconcile_inventory`.
+    """
+
+    offer = models.OneToOneField(
+        'offers.Offer',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='inventory',
+        verbose_name='Offre'
+    )
+    available = models.IntegerField(default=0, verbose_name='Disponibles')
+    assigned = models.IntegerField(default=0, verbose_name='Attribues')
+    reserved = models.IntegerField(default=0, verbose_name='Reserves')
+    blocked = models.IntegerField(default=0, verbose_name='Bloques')
+    low_stock_threshold = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Seuil de stock faible',
+        help_text='Laisser vide pour utiliser le seuil par defaut.'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Derniere modification'
+    )
+
+    class Meta:
+        verbose_name = 'Stock par offre'
+        verbose_name_plural = 'Stocks par offre'
+        ordering = ['offer__display_order', 'offer__name']
+
+    def __str__(self):
+        return f"{self.offer} - {self.available} disponible(s)"
+
+    @property
+    def threshold(self):
+        """Low-stock threshold of the offer, or the default one."""
+        if self.low_stock_threshold is not None:
+            return self.low_stock_threshold
+        return settings.LOW_STOCK_THRESHOLD
+
+    @property
+    def total(self):
+        return self.available + self.assigned + self.reserved + self.blocked
@@ -0,0 +1,177 @@
+"""
+Per-offer phone number inventory.
+
+`OfferInventory` keeps, for every offer, how many of its numbers are in
+each status. Counters are adjusted in the same transaction as the numbers
+they describe, so offer cards, the admin and stock alerts read one row
+instead of counting the offer's numbers. `reconcile_inventory` recounts
+them should they ever drift.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F
+
+from apps.events.services import publish
+
+STATUSES = ['available', 'assigned', 'reserved', 'blocked']
+
+
+def adjust(offer_id, changes):
+    """Add {status: delta} to the counters of an offer, creating its row if needed."""
+    from .models import OfferInventory
+
+    changes = {status: delta for status, delta in changes.items() if delta and status in STATUSES}
+    if offer_id is None or not changes:
+        return
+
+    rows = OfferInventory.objects.filter(offer_id=offer_id)
+    updates = {status: F(status) + delta for status, delta in changes.items()}
+    if not rows.update(**updates):
+        try:
+            with transaction.atomic(using=router.db_for_write(OfferInventory)):
+                OfferInventory.objects.create(offer_id=offer_id, **changes)
+        except IntegrityError:
+            # Another transaction created the row first
+            rows.update(**updates)
+
+    taken = -changes.get('available', 0)
+    if taken > 0:
+        _check_low_stock(offer_id, taken)
+
+
+def _check_low_stock(offer_id, taken):
+    """Publish a stock_low event when `taken` numbers crossed the offer's threshold."""
+    from .models import OfferInventory
+
+    # The row is locked by the update above, so this reads our own result
+    inventory = OfferInventory.objects.select_related('offer').get(offer_id=offer_id)
+    available, before = inventory.available, inventory.available + taken
+    if available <= inventory.threshold < before or available == 0 < before:
+        publish(
+            'stock_low',
+            offer_id=offer_id,
+            offer_name=inventory.offer.name,
+            available=available,
+            threshold=inventory.threshold,
+        )
+
+
+def move_number(previous, current):
+    """Move one number between (offer_id, status) counters; None when absent."""
+    if previous == current:
+        return
+    changes = defaultdict(Counter)
+    if previous:
+        changes[previous[0]][previous[1]] -= 1
+    if current:
+        changes[current[0]][current[1]] += 1
+    for offer_id, deltas in changes.items():
+        adjust(offer_id, deltas)
+
+
+def _apply_bulk(changes):
+    """Apply {offer_id: Counter} and announce it with one event per offer."""
+    for offer_id, deltas in changes.items():
+        deltas = {status: delta for status, delta in deltas.items() if delta}
+        if offer_id is None or not deltas:
+            continue
+        adjust(offer_id, deltas)
+        publish('inventory', offer_id=offer_id, changes=deltas)
+
+
+def _grouped(numbers):
+    return numbers.values('offer', 'status').annotate(total=Count('id')).order_by()
+
+
+def move_numbers(numbers, status):
+    """Move the numbers of a queryset to a new status, before it is updated."""
+    changes = defaultdict(Counter)
+    for item in _grouped(numbers.exclude(status=status)):
+        changes[item['offer']][item['status']] -= item['total']
+        changes[item['offer']][status] += item['total']
+    _apply_bulk(changes)
+
+
+def remove_numbers(numbers):
+    """Uncount the numbers of a queryset before they are deleted."""
+    changes = defaultdict(Counter)
+    for item in _grouped(numbers):
+        changes[item['offer']][item['status']] -= item['total']
+    _apply_bulk(changes)
+
+
+def add_numbers(numbers, exact=True):
+    """
+    Count freshly inserted numbers. When conflicts were ignored the inserted
+    rows are unknown, so the affected offers are recounted instead.
+    """
+    if not exact:
+        reconcile_inventory({number.offer_id for number in numbers if number.offer_id})
+        return
+    changes = defaultdict(Counter)
+    for number in numbers:
+        changes[number.offer_id][number.status] += 1
+    _apply_bulk(changes)
+
+
+def offer_counts(offer):
+    """Counters of an offer, zero when it has no numbers yet."""
+    from .models import OfferInventory
+
+    try:
+        inventory = offer.inventory
+    except OfferInventory.DoesNotExist:
+        return dict.fromkeys(STATUSES, 0)
+    return {status: getattr(inventory, status) for status in STATUSES}
+
+
+def reconcile_inventory(offer_ids=None, dry_run=False):
+    """
+    Recount the numbers of every offer (or of `offer_ids`) and fix counters
+    that drifted. Returns {offer_id: {status: (counter, actual)}} for the drifts.
+    """
+    from apps.offers.models import Offer
+    from .models import OfferInventory, PhoneNumber
+
+    # Offers are copied to every shard: read them next to the numbers
+    using = router.db_for_write(OfferInventory)
+    offers = Offer.objects.using(using)
+    if offer_ids is not None:
+        offers = offers.filter(id__in=offer_ids)
+
+    with transaction.atomic(using=using):
+        # Lock the counters before counting: adjustments committed after the
+        # count wait for the fix instead of being overwritten by it. Missing
+        # rows are created first so that they are locked too.
+        offer_list = list(offers.values_list('id', flat=True))
+        OfferInventory.objects.bulk_create(
+            [OfferInventory(offer_id=offer_id) for offer_id in offer_list], ignore_conflicts=True
+        )
+        inventories = {
+            inventory.offer_id: inventory
+            for inventory in OfferInventory.objects.select_for_update().filter(offer_id__in=offer_list)
+        }
+
+        actual = defaultdict(lambda: dict.fromkeys(STATUSES, 0))
+        numbers = PhoneNumber.objects.filter(offer_id__in=offer_list)
+        for item in _grouped(numbers):
+            actual[item['offer']][item['status']] = item['total']
+
+        drift = {}
+        for offer_id in offer_list:
+            counts = actual[offer_id]
+            inventory = inventories[offer_id]
+            current = {status: getattr(inventory, status) for status in STATUSES}
+            if current == counts:
+                continue
+            drift[offer_id] = {
+                status: (current[status], counts[status])
+                for status in STATUSES if current[status] != counts[status]
+            }
+            if not dry_run:
+                OfferInventory.objects.filter(offer_id=offer_id).update(**counts)
+        if dry_run:
+            # Leave no counter row behind
+            transaction.set_rollback(True, using=using)
+    return drift
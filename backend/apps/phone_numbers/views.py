@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
+from djezzy_pos.db_router import ReplicaReadsMixin
 from .models import PhoneNumber
 from .serializers import PhoneNumberSerializer
 
@@ -18,7 +19,7 @@ class PhoneNumberPagination(PageNumberPagination):
         return super().paginate_queryset(queryset, request, view)
 
 
-class PhoneNumberViewSet(viewsets.ModelViewSet):
+class PhoneNumberViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """ViewSet for phone numbers."""
 
     queryset = PhoneNumber.objects.all()
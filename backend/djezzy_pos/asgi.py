@@ -0,0 +1,14 @@
+"""
+ASGI config for Djezzy POS project.
+
+Serves the long-lived /api/events/ stream without holding a sync worker:
+gunicorn djezzy_pos.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djezzy_pos.settings')
+
+application = get_asgi_application()
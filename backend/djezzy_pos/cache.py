@@ -0,0 +1,146 @@
+"""
+Cache backends with hit/miss metrics, and the key conventions of the apps.
+
+Keys are "<app>:<rest>" (auth, sales, analytics, dashboard...). Cached
+data is invalidated with a version stamp rather than by deleting keys:
+readers build keys with `versioned_key(namespace, ...)`, writers call
+`bump_version(namespace)` once their change is committed, and stale
+entries simply expire. A namespace may be narrow, such as "auth:user:42". The CACHE_VERSION setting
+(Django's cache VERSION) invalidates everything at once, for deployments
+that change what is cached.
+
+The backends below are Django's own, counting hits and misses of `get`
+and `get_many` per namespace. Counts are kept per process and added to
+shared counters in the cache every CACHE_METRICS_FLUSH_EVERY lookups;
+`cache_stats` prints them.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache as DjangoFileBasedCache
+from django.core.cache.backends.locmem import LocMemCache as DjangoLocMemCache
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache
+
+METRICS_PREFIX = 'cache-metrics'
+
+
+def is_process_local(alias='default'):
+    """Whether each worker process has its own copy of a cache (locmem)."""
+    return isinstance(caches[alias], DjangoLocMemCache)
+
+
+def versioned_key(namespace, *parts):
+    """Key under the current version stamp of `namespace`."""
+    return ':'.join([namespace, f'v{namespace_version(namespace)}', *map(str, parts)])
+
+
+def namespace_version(namespace):
+    """Current version stamp of a namespace."""
+    return cache.get_or_set(f'{namespace}:version', 1, None)
+
+
+def bump_version(namespace):
+    """Expire every key built with `versioned_key(namespace, ...)`."""
+    key = f'{namespace}:version'
+    cache.add(key, 1, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # Evicted between add and incr; the next read starts over
+
+
+class MetricsMixin:
+    """Counts hits and misses per key namespace."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = {}
+        self._lookups = 0
+        self._metrics_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _record(self, key, hit):
+        if getattr(self._local, 'inside_get_many', False):
+            return
+        namespace = str(key).split(':', 1)[0]
+        if namespace == METRICS_PREFIX:
+            return
+        with self._metrics_lock:
+            counts = self._pending.setdefault(namespace, [0, 0])
+            counts[0 if hit else 1] += 1
+            self._lookups += 1
+            if self._lookups < settings.CACHE_METRICS_FLUSH_EVERY:
+                return
+        self.flush_metrics()
+
+    def flush_metrics(self):
+        """Add this process's pending counts to the shared counters."""
+        with self._metrics_lock:
+            pending, self._pending, self._lookups = self._pending, {}, 0
+        if not pending:
+            return
+        namespaces = super().get(f'{METRICS_PREFIX}:namespaces') or set()
+        if not namespaces.issuperset(pending):
+            super().set(f'{METRICS_PREFIX}:namespaces', namespaces | set(pending), None)
+        for namespace, counts in pending.items():
+            for name, value in zip(('hits', 'misses'), counts):
+                if not value:
+                    continue
+                key = f'{METRICS_PREFIX}:{namespace}:{name}'
+                super().add(key, 0, None)
+                try:
+                    super().incr(key, value)
+                except ValueError:
+                    pass  # Evicted between add and incr
+
+    def metrics(self):
+        """Shared counters, as {namespace: {'hits': n, 'misses': n}}."""
+        namespaces = super().get(f'{METRICS_PREFIX}:namespaces') or set()
+        keys = {
+            (namespace, name): f'{METRICS_PREFIX}:{namespace}:{name}'
+            for namespace in namespaces for name in ('hits', 'misses')
+        }
+        values = super().get_many(keys.values())
+        result = {}
+        for (namespace, name), key in keys.items():
+            result.setdefault(namespace, {})[name] = values.get(key, 0)
+        return dict(sorted(result.items()))
+
+    def reset_metrics(self):
+        namespaces = super().get(f'{METRICS_PREFIX}:namespaces') or set()
+        super().delete_many([
+            f'{METRICS_PREFIX}:{namespace}:{name}'
+            for namespace in namespaces for name in ('hits', 'misses')
+        ])
+        super().delete(f'{METRICS_PREFIX}:namespaces')
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        value = super().get(key, missing, version)
+        self._record(key, value is not missing)
+        return default if value is missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # Backends without a native get_many call get() for each key
+        self._local.inside_get_many = True
+        try:
+            values = super().get_many(keys, version)
+        finally:
+            self._local.inside_get_many = False
+        for key in keys:
+            self._record(key, key in values)
+        return values
+
+
+class LocMemCache(MetricsMixin, DjangoLocMemCache):
+    pass
+
+
+class FileBasedCache(MetricsMixin, DjangoFileBasedCache):
+    pass
+
+
+class RedisCache(MetricsMixin, DjangoRedisCache):
+    pass
@@ -0,0 +1,131 @@
+"""
+Read replicas: routing, the views that use them, and read-your-writes.
+
+Replicas are the DATABASES entries whose TEST MIRROR is "default" (see
+`replica_databases` in settings). Every query goes to the primary unless
+it runs inside `replica_reads()`. The read-only API views enter it for
+GET requests: ViewSets through `ReplicaReadsMixin`, function views through
+`@replica_view`. Writes, and reads inside a transaction, always go to the
+primary, whichever database the instance was loaded from.
+
+A replica lags behind the primary. After a user's successful POST, PUT,
+PATCH or DELETE, `PinToPrimaryMiddleware` keeps that user's reads on the
+primary for REPLICA_PIN_SECONDS, so they see their own changes. The pin
+is a cache key and needs a cache shared between workers.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def replicas():
+    """Aliases of the replicas of the primary database."""
+    return [
+        alias for alias, database in settings.DATABASES.items()
+        if database.get('TEST', {}).get('MIRROR') == DEFAULT_DB_ALIAS
+    ]
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads made in this block to a replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _pin_key(user_id):
+    return f'db:pinned:{user_id}'
+
+
+def pin_to_primary(user):
+    """Read from the primary for this user during REPLICA_PIN_SECONDS."""
+    cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def reads_from_replica(request):
+    """Whether the reads of this request may go to a replica."""
+    if request.method not in SAFE_METHODS or not replicas():
+        return False
+    user = request.user
+    return not (user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+class ReplicaRouter:
+    """Database router for the primary and its replicas."""
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Not the instance's database: it may have been read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the primary's schema through replication
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaReadsMixin:
+    """ViewSet mixin serving GET requests from a replica."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # After authentication, so a pinned user is recognised
+        if reads_from_replica(request):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_view(view):
+    """`@api_view` function serving GET requests from a replica; put it last."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not reads_from_replica(request):
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PinToPrimaryMiddleware:
+    """Pin users to the primary after each of their successful writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replicas():
+            # DRF sets request.user here once a token authenticates
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user)
+        return response
@@ -0,0 +1,39 @@
+"""
+Management command to show cache hit/miss counts per key namespace.
+
+Counts are pushed to the cache (see djezzy_pos.cache) by each process
+every CACHE_METRICS_FLUSH_EVERY lookups; with the per-process locmem
+backend only this process's counts are visible.
+"""
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Show cache hit/miss counts per key namespace'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them'
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'metrics'):
+            raise CommandError('The default cache backend does not record metrics (see djezzy_pos.cache).')
+
+        cache.flush_metrics()
+        metrics = cache.metrics()
+        self.stdout.write(f'{"namespace":<16} {"hits":>10} {"misses":>10} {"hit rate":>9}')
+        for namespace, counts in metrics.items():
+            total = counts['hits'] + counts['misses']
+            rate = f"{100 * counts['hits'] / total:.1f}%" if total else '-'
+            self.stdout.write(
+                f"{namespace:<16} {counts['hits']:>10} {counts['misses']:>10} {rate:>9}"
+            )
+
+        if options['reset']:
+            cache.reset_metrics()
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Namespaces: {len(metrics)}'))
@@ -4,6 +4,8 @@ Django settings for Djezzy POS project.
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -33,14 +35,18 @@ INSTALLED_APPS = [
 
     # Third party apps
     'rest_framework',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'django_filters',
 
     # Local apps
+    'djezzy_pos',  # Project-wide commands (cache_stats)
     'apps.accounts',
     'apps.offers',
     'apps.phone_numbers',
     'apps.contracts',
+    'apps.analytics',
+    'apps.events',
     'apps.dashboard',
 ]
 
@@ -125,6 +131,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'djezzy_pos.db_router.PinToPrimaryMiddleware',
+    'djezzy_pos.sharding.ShardMiddleware',
 ]
 
 ROOT_URLCONF = 'djezzy_pos.urls'
@@ -140,6 +148,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.dashboard.context_processors.events',
             ],
         },
     },
@@ -148,6 +157,19 @@ TEMPLATES = [
 WSGI_APPLICATION = 'djezzy_pos.wsgi.application'
 
 # Database
+# PostgreSQL connections are kept open between requests (CONN_MAX_AGE seconds,
+# 0 closes them after each request) and checked before reuse. With pgbouncer in
+# transaction pooling mode set DB_PGBOUNCER=True: server-side cursors cannot
+# survive a transaction there.
+POSTGRES_CONNECTION = {
+    'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+    'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_PGBOUNCER', 'False').lower() == 'true',
+    'OPTIONS': {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+    },
+}
+
 # Database - Use PostgreSQL in production, SQLite for development
 if os.getenv('DB_NAME'):
     DATABASES = {
@@ -158,6 +180,7 @@ if os.getenv('DB_NAME'):
             'PASSWORD': os.getenv('DB_PASSWORD'),
             'HOST': os.getenv('DB_HOST', 'localhost'),
             'PORT': os.getenv('DB_PORT', '5432'),
+            **POSTGRES_CONNECTION,
         }
     }
 else:
@@ -165,8 +188,116 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # A file, so that PDF render workers see the test data
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+
+def replica_databases(primary):
+    """
+    Read replicas of `primary`, one per DB_REPLICAS entry (comma-separated):
+    host[:port] for PostgreSQL, a database file for SQLite. Locally, a copy
+    of db.sqlite3 (or db.sqlite3 itself) stands in for a replica.
+    """
+    databases = {}
+    locations = [location.strip() for location in os.getenv('DB_REPLICAS', '').split(',')]
+    for number, location in enumerate(filter(None, locations), 1):
+        replica = {**primary, 'TEST': {'MIRROR': 'default'}}
+        if primary['ENGINE'].endswith('sqlite3'):
+            replica['NAME'] = BASE_DIR / location
+        else:
+            host, _, port = location.partition(':')
+            replica.update(HOST=host, PORT=port or primary['PORT'])
+        databases[f'replica{number}'] = replica
+    return databases
+
+
+def shard_databases(primary):
+    """
+    Regional shards of `primary`, one per DB_SHARDS entry (comma-separated
+    region=location, locations as in DB_REPLICAS), as "shard_<region>".
+    """
+    databases = {}
+    for entry in filter(None, (entry.strip() for entry in os.getenv('DB_SHARDS', '').split(','))):
+        region, _, location = (part.strip() for part in entry.partition('='))
+        shard = {**primary}
+        if primary['ENGINE'].endswith('sqlite3'):
+            shard['NAME'] = BASE_DIR / location
+            shard['TEST'] = {'NAME': BASE_DIR / f'test_{location}'}
+        else:
+            host, _, port = location.partition(':')
+            shard.update(HOST=host, PORT=port or primary['PORT'])
+        databases[f'shard_{region}'] = shard
+    return databases
+
+
+# Optional regional sharding of contracts and phone numbers (see
+# djezzy_pos.sharding). DB_SHARD_STORES maps stores to regions
+# ("Oran=ouest,Annaba=est"); other stores belong to DB_PRIMARY_REGION,
+# kept on the primary database.
+DATABASES.update(shard_databases(DATABASES['default']))
+SHARD_REGIONS = {os.getenv('DB_PRIMARY_REGION', 'centre'): 'default'}
+SHARD_REGIONS.update({alias[len('shard_'):]: alias for alias in DATABASES if alias.startswith('shard_')})
+SHARD_STORES = dict(
+    (part.strip() for part in entry.split('=', 1))
+    for entry in os.getenv('DB_SHARD_STORES', '').split(',') if '=' in entry
+)
+SHARD_SCATTER_WORKERS = int(os.getenv('SHARD_SCATTER_WORKERS', '4'))
+
+# Read-only API views read from the replicas (see djezzy_pos.db_router);
+# a user's reads stay on the primary for REPLICA_PIN_SECONDS after a write
+DATABASES.update(replica_databases(DATABASES['default']))
+if sys.argv[1:2] == ['test']:
+    # Tests read through a mirror of the test database (djezzy_pos/tests),
+    # and map a region to an extra shard with override_settings
+    # (apps/contracts/tests/fixtures.py)
+    if not any(alias.startswith('replica') for alias in DATABASES):
+        DATABASES['replica1'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if not any(alias.startswith('shard_') for alias in DATABASES):
+        test_shard = {**DATABASES['default'], 'TEST': {'NAME': BASE_DIR / 'test_shard.sqlite3'}}
+        if not test_shard['ENGINE'].endswith('sqlite3'):
+            test_shard['TEST'] = {'NAME': f"test_{test_shard['NAME']}_shard"}
+        DATABASES['shard_test'] = test_shard
+DATABASE_ROUTERS = ['djezzy_pos.sharding.ShardRouter', 'djezzy_pos.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+
+# Cache (see djezzy_pos.cache). CACHE_BACKEND: locmem (per process), file,
+# redis (shared, needs the redis package) or fakeredis (in-memory Redis for tests)
+CACHE_BACKENDS = {
+    'locmem': ('djezzy_pos.cache.LocMemCache', 'djezzy-pos'),
+    'file': ('djezzy_pos.cache.FileBasedCache', str(BASE_DIR / 'cache')),
+    'redis': ('djezzy_pos.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'fakeredis': ('djezzy_pos.cache.RedisCache', 'redis://fakeredis:6379/1'),
+}
+
+
+def cache_settings(backend):
+    """CACHES for one of CACHE_BACKENDS."""
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}")
+    caches = {
+        'default': {
+            'BACKEND': CACHE_BACKENDS[backend][0],
+            'LOCATION': os.getenv('CACHE_LOCATION') or CACHE_BACKENDS[backend][1],
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'djezzy'),
+            # Bump to drop every cached value, e.g. when a cached model changes
+            'VERSION': int(os.getenv('CACHE_VERSION', '1')),
+            'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
         }
     }
+    if backend == 'fakeredis':
+        import fakeredis
+        caches['default']['OPTIONS'] = {'connection_class': fakeredis.FakeConnection}
+    return caches
+
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHES = cache_settings(CACHE_BACKEND)
+CACHE_METRICS_FLUSH_EVERY = int(os.getenv('CACHE_METRICS_FLUSH_EVERY', '100'))
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -202,6 +333,65 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# S3-compatible object storage (AWS, or MinIO locally) for the s3 backends
+# below; needs django-storages[s3]. Clients download PDFs from presigned
+# URLs valid MEDIA_URL_EXPIRE seconds, so S3_ENDPOINT_URL must be reachable by them.
+S3_OPTIONS = {
+    'endpoint_url': os.getenv('S3_ENDPOINT_URL') or None,
+    'access_key': os.getenv('S3_ACCESS_KEY'),
+    'secret_key': os.getenv('S3_SECRET_KEY'),
+    'region_name': os.getenv('S3_REGION') or None,
+    'addressing_style': os.getenv('S3_ADDRESSING_STYLE') or None,
+    'querystring_expire': int(os.getenv('MEDIA_URL_EXPIRE', '300')),
+}
+
+# Contract media (see djezzy_pos.storage). MEDIA_STORAGE: file (MEDIA_ROOT,
+# a single node) or s3 (MEDIA_BUCKET, shared by every node)
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'file')
+MEDIA_STORAGES = {
+    'file': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    's3': {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            **S3_OPTIONS,
+            'bucket_name': os.getenv('MEDIA_BUCKET', 'djezzy-media'),
+            # Names are made unique by TieredStorage, across both tiers
+            'file_overwrite': True,
+        },
+    },
+}
+if MEDIA_STORAGE not in MEDIA_STORAGES:
+    raise ValueError(f"MEDIA_STORAGE must be one of {', '.join(MEDIA_STORAGES)}")
+
+# Cold tier for the media of old contracts (see the archive_contract_media
+# command). ARCHIVE_STORAGE: file (a directory, ARCHIVE_ROOT) or s3 (ARCHIVE_BUCKET)
+ARCHIVE_STORAGE = os.getenv('ARCHIVE_STORAGE', 'file')
+ARCHIVE_STORAGES = {
+    'file': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': os.getenv('ARCHIVE_ROOT') or str(BASE_DIR / 'archive')},
+    },
+    's3': {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            **S3_OPTIONS,
+            'bucket_name': os.getenv('ARCHIVE_BUCKET', 'djezzy-archive'),
+            'object_parameters': {'StorageClass': os.getenv('ARCHIVE_STORAGE_CLASS', 'STANDARD')},
+        },
+    },
+}
+if ARCHIVE_STORAGE not in ARCHIVE_STORAGES:
+    raise ValueError(f"ARCHIVE_STORAGE must be one of {', '.join(ARCHIVE_STORAGES)}")
+ARCHIVE_AFTER_MONTHS = int(os.getenv('ARCHIVE_AFTER_MONTHS', '12'))
+
+STORAGES = {
+    # Hot media with a fallback to the archive
+    'default': {'BACKEND': 'djezzy_pos.storage.TieredStorage'},
+    'media': MEDIA_STORAGES[MEDIA_STORAGE],
+    'archive': ARCHIVE_STORAGES[ARCHIVE_STORAGE],
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -213,7 +403,7 @@ CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -225,7 +415,22 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Reverse proxies in front of the app. Throttles take the client IP that
+    # many entries from the end of X-Forwarded-For; 0 uses REMOTE_ADDR and
+    # ignores the header, which any client can set
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+    # Scopes of apps.accounts.throttling (login, token refresh, password change)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv('THROTTLE_LOGIN_IP', '30/min'),
+        'login_user': os.getenv('THROTTLE_LOGIN_USER', '5/min'),
+        'login_device': os.getenv('THROTTLE_LOGIN_DEVICE', '10/min'),
+        'refresh_ip': os.getenv('THROTTLE_REFRESH_IP', '120/min'),
+        'refresh_device': os.getenv('THROTTLE_REFRESH_DEVICE', '10/min'),
+        'password_change': os.getenv('THROTTLE_PASSWORD_CHANGE', '5/hour'),
+    },
 }
+# Cache alias holding the throttle counters; must be shared by all workers
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'default')
 
 # JWT settings
 from datetime import timedelta
@@ -233,3 +438,32 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
+# Users resolved from JWTs are cached; entries expire as soon as the user changes.
+# Only with a shared cache (not locmem), so that every worker sees the change.
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '60'))
+
+# Contract PDF rendering (process pool, see apps.contracts.services.pdf_renderer)
+# Renders at once per host, shared by the pools of every web worker
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', '2'))
+PDF_RENDER_SLOTS_DIR = os.getenv('PDF_RENDER_SLOTS_DIR', os.path.join(tempfile.gettempdir(), 'djezzy_pos-render'))
+# Processes in the pool of each web worker, waiting for a host slot
+PDF_RENDER_PROCESS_WORKERS = int(os.getenv('PDF_RENDER_PROCESS_WORKERS', '1'))
+PDF_RENDER_MAX_PENDING = int(os.getenv('PDF_RENDER_MAX_PENDING', '8'))
+PDF_RENDER_TIMEOUT = int(os.getenv('PDF_RENDER_TIMEOUT', '20'))
+PDF_RENDER_NICENESS = int(os.getenv('PDF_RENDER_NICENESS', '10'))
+
+# Sales analytics (see apps.analytics.services); entries also expire on every contract write
+ANALYTICS_CACHE_TIMEOUT = int(os.getenv('ANALYTICS_CACHE_TIMEOUT', '300'))
+DASHBOARD_SUMMARY_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_SUMMARY_CACHE_TIMEOUT', '30'))
+
+# Live events over Server-Sent Events (see apps.events). The stream needs an
+# ASGI worker: EVENTS_STREAM_URL is where the proxy sends it to one (see
+# deploy/nginx.conf). Empty, dashboard pages poll every EVENTS_FALLBACK_POLL seconds.
+EVENTS_STREAM_URL = os.getenv('EVENTS_STREAM_URL', '')
+EVENTS_FALLBACK_POLL = int(os.getenv('EVENTS_FALLBACK_POLL', '30'))
+EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', '1'))
+EVENTS_HEARTBEAT = int(os.getenv('EVENTS_HEARTBEAT', '15'))
+EVENTS_STREAM_LIFETIME = int(os.getenv('EVENTS_STREAM_LIFETIME', '300'))
+EVENTS_RETRY_MS = int(os.getenv('EVENTS_RETRY_MS', '3000'))
+EVENTS_RETENTION_HOURS = int(os.getenv('EVENTS_RETENTION_HOURS', '24'))
+LOW_STOCK_THRESHOLD = int(os.getenv('LOW_STOCK_THRESHOLD', '10'))
@@ -22,12 +22,36 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        **POSTGRES_CONNECTION,
     }
 }
+DATABASES.update(shard_databases(DATABASES['default']))
+DATABASES.update(replica_databases(DATABASES['default']))
+
+# Cache shared by every worker: version stamps, sessions, replica pins and
+# throttle counters must not be per process
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis')
+if CACHE_BACKEND == 'locmem':
+    raise ValueError("CACHE_BACKEND=locmem is per process; use redis in production")
+CACHES = cache_settings(CACHE_BACKEND)
+# Throttle counters get their own alias so a CACHE_VERSION bump does not
+# reset them; THROTTLE_CACHE_LOCATION can point them at another Redis
+CACHES['throttle'] = {
+    **CACHES['default'],
+    'LOCATION': os.getenv('THROTTLE_CACHE_LOCATION') or CACHES['default']['LOCATION'],
+    'KEY_PREFIX': f"{CACHES['default']['KEY_PREFIX']}-throttle",
+    'VERSION': 1,
+}
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'throttle')
+if 'locmem' in CACHES[THROTTLE_CACHE]['BACKEND'].lower():
+    raise ValueError("THROTTLE_CACHE must be shared by the workers, not locmem")
+
+# Behind nginx (deploy/nginx.conf), which appends the client IP to X-Forwarded-For
+REST_FRAMEWORK['NUM_PROXIES'] = int(os.getenv('NUM_PROXIES', '1'))
 
 # WhiteNoise for static files
 MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES['staticfiles'] = {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'}
 
 # Security headers
 SECURE_BROWSER_XSS_FILTER = True
@@ -0,0 +1,202 @@
+"""
+Optional regional sharding of contracts and phone numbers.
+
+With DB_SHARDS set, the tables of the contracts and phone_numbers apps
+(contracts, daily sales, numbers, inventory) are split by region: each
+shard holds the rows of the stores DB_SHARD_STORES maps to its region,
+the primary those of every other store. The registry of contract numbers,
+which keeps them unique across shards, stays on the primary. Users and offers are reference
+tables: written to the primary and copied to every shard once committed,
+so shard rows keep their foreign keys. Every other table lives on the
+primary only.
+
+A query on a sharded model runs on the current shard: the one entered
+with `use_shard()`, else the shard of the request's user (admins may pick
+a region with ?region=), else the primary. New contracts go to the shard
+of their agent, and loaded rows are saved back where they came from.
+`scatter()` runs a function on every shard in a thread pool, for the
+network-wide aggregates of the admin and analytics.
+
+Without DB_SHARDS there is a single shard, the primary, and nothing here
+changes where queries go.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, models, transaction
+
+from .db_router import replicas
+
+SHARDED_APPS = {'contracts', 'phone_numbers'}
+# Tables of the sharded apps that are on the primary only
+PRIMARY_MODELS = {'contracts.contractnumber'}
+
+_shard = contextvars.ContextVar('shard', default=None)
+_request = contextvars.ContextVar('shard_request', default=None)
+
+
+def shards():
+    """Database aliases holding sharded rows, the primary first."""
+    return list(dict.fromkeys([DEFAULT_DB_ALIAS, *settings.SHARD_REGIONS.values()]))
+
+
+def is_sharded(model):
+    return model._meta.app_label in SHARDED_APPS and model._meta.label_lower not in PRIMARY_MODELS
+
+
+def shard_for_store(store):
+    """Alias of the shard holding the rows of a store."""
+    region = settings.SHARD_STORES.get(store)
+    return settings.SHARD_REGIONS.get(region, DEFAULT_DB_ALIAS)
+
+
+@contextmanager
+def use_shard(alias):
+    """Run the sharded queries of this block on the shard `alias`."""
+    token = _shard.set(alias)
+    try:
+        yield
+    finally:
+        _shard.reset(token)
+
+
+def current_shard():
+    """Alias of the shard sharded queries currently go to."""
+    alias = _shard.get()
+    if alias is not None:
+        return alias
+    request = _request.get()
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return DEFAULT_DB_ALIAS
+    region = request.GET.get('region')
+    if user.is_staff and region in settings.SHARD_REGIONS:
+        return settings.SHARD_REGIONS[region]
+    return shard_for_store(user.store_location)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SHARD_SCATTER_WORKERS,
+                thread_name_prefix='shard-scatter',
+            )
+        return _executor
+
+
+def _run_on(alias, function, args):
+    try:
+        with use_shard(alias):
+            return function(*args)
+    finally:
+        # Pool threads outlive requests: recycle their connections the same way
+        close_old_connections()
+
+
+def scatter(function, *args):
+    """
+    Call `function(*args)` on every shard, concurrently when there are
+    several, and return the results in shard order.
+    """
+    aliases = shards()
+    if len(aliases) == 1:
+        return [function(*args)]
+    futures = [
+        # Each call gets a copy of the caller's context (replica reads...)
+        _get_executor().submit(contextvars.copy_context().run, _run_on, alias, function, args)
+        for alias in aliases
+    ]
+    return [future.result() for future in futures]
+
+
+def copy_to_shards(model, pks, using=None):
+    """Copy rows of a reference table to every shard once the primary commits."""
+    if len(shards()) == 1 or (using or DEFAULT_DB_ALIAS) != DEFAULT_DB_ALIAS:
+        return
+    pks = list(pks)
+
+    def copy():
+        rows = list(model._base_manager.using(DEFAULT_DB_ALIAS).filter(pk__in=pks))
+        for alias in shards()[1:]:
+            with transaction.atomic(using=alias):
+                for row in rows:
+                    row.save_base(using=alias, raw=True)
+    transaction.on_commit(copy, using=DEFAULT_DB_ALIAS)
+
+
+def delete_from_shards(model, pks, using=None):
+    """
+    Delete rows of a reference table from every shard, before the primary:
+    a row still referenced on a shard (ProtectedError) stops the deletion.
+    """
+    if len(shards()) == 1 or (using or DEFAULT_DB_ALIAS) != DEFAULT_DB_ALIAS:
+        return
+    pks = list(pks)
+    for alias in shards()[1:]:
+        model._base_manager.using(alias).filter(pk__in=pks).delete()
+
+
+class ReferenceQuerySet(models.QuerySet):
+    """Bulk writes to a reference table that are copied to the shards."""
+
+    def update(self, **kwargs):
+        pks = list(self.values_list('pk', flat=True)) if len(shards()) > 1 else []
+        updated = super().update(**kwargs)
+        copy_to_shards(self.model, pks, using=self.db)
+        return updated
+
+    def delete(self):
+        delete_from_shards(self.model, self.values_list('pk', flat=True), using=self.db)
+        return super().delete()
+
+
+class ShardRouter:
+    """Routes the models of SHARDED_APPS to their shard; defers everything else."""
+
+    def _db(self, model, instance):
+        if not is_sharded(model) or len(shards()) == 1:
+            return None
+        if instance is not None and is_sharded(type(instance)) and not instance._state.adding:
+            alias = instance._state.db
+        elif getattr(instance, 'created_by', None) is not None:
+            # New contracts go to the region of their agent
+            alias = shard_for_store(instance.created_by.store_location)
+        else:
+            alias = current_shard()
+        # The primary's rows are left to the replica router
+        return alias if alias != DEFAULT_DB_ALIAS and alias in shards() else None
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {*shards(), *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ShardMiddleware:
+    """Make the request visible to `current_shard`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
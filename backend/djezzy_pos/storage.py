@@ -0,0 +1,132 @@
+"""
+Contract media storage: a hot tier and a cold archive.
+
+New files are written to the "media" storage (MEDIA_STORAGE: MEDIA_ROOT,
+or an S3-compatible bucket shared by every node). The
+archive_contract_media command moves the media of old contracts to the
+"archive" storage (ARCHIVE_STORAGE: a directory, or a bucket), gzipped
+when that saves space. `TieredStorage`, the default storage of the file
+fields, looks a name up on the hot tier first and then in the archive, so
+archived PDFs and photos are read like any other file.
+
+Files in a bucket can be downloaded from it directly: `download_url` gives
+a presigned URL, valid for MEDIA_URL_EXPIRE seconds, that the API
+redirects to instead of streaming the bytes through Django.
+"""
+import gzip
+import shutil
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import Storage, storages
+from django.utils.functional import cached_property
+
+GZIP_SUFFIX = '.gz'
+
+# Decompressed archive files are kept in memory up to this size
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def presigns(storage):
+    """Whether `storage` hands out presigned URLs (django-storages' S3Storage)."""
+    return bool(getattr(storage, 'querystring_auth', False))
+
+
+class TieredStorage(Storage):
+    """Writes to the hot storage; reads fall back to the archive."""
+
+    def __init__(self, hot='media', archive='archive'):
+        self.hot_alias = hot
+        self.archive_alias = archive
+
+    @cached_property
+    def hot(self):
+        return storages[self.hot_alias]
+
+    @cached_property
+    def archive(self):
+        return storages[self.archive_alias]
+
+    @property
+    def file_permissions_mode(self):
+        return self.hot.file_permissions_mode
+
+    def archived_name(self, name):
+        """Name of the archived copy of `name` (gzipped or not), or None."""
+        for candidate in (name + GZIP_SUFFIX, name):
+            if self.archive.exists(candidate):
+                return candidate
+        return None
+
+    def download_url(self, name, content_type=None, content_disposition=None):
+        """
+        Presigned URL serving `name` straight from its bucket, or None when
+        the file has to go through Django: local storage, or an archived
+        copy that is gzipped.
+        """
+        parameters = {}
+        if content_type:
+            parameters['ResponseContentType'] = content_type
+        if content_disposition:
+            parameters['ResponseContentDisposition'] = content_disposition
+        if presigns(self.hot) and self.hot.exists(name):
+            return self.hot.url(name, parameters=parameters)
+        if presigns(self.archive) and self.archived_name(name) == name:
+            return self.archive.url(name, parameters=parameters)
+        return None
+
+    def _open(self, name, mode='rb'):
+        try:
+            return self.hot.open(name, mode)
+        except FileNotFoundError:
+            pass  # Not on the hot tier, or archived since exists() was called
+        stored = self.archived_name(name)
+        if stored is None:
+            raise FileNotFoundError(f'{name} is neither in media nor in the archive')
+        source = self.archive.open(stored, 'rb')
+        if not stored.endswith(GZIP_SUFFIX):
+            return source
+        # A plain seekable copy, so responses still get a Content-Length
+        copy = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        with source, gzip.GzipFile(fileobj=source) as unpacked:
+            shutil.copyfileobj(unpacked, copy)
+        copy.seek(0)
+        return File(copy, name=name)
+
+    def _save(self, name, content):
+        # `name` is already free on both tiers (see exists)
+        return self.hot.save(name, content)
+
+    def exists(self, name):
+        return self.hot.exists(name) or self.archived_name(name) is not None
+
+    def delete(self, name):
+        self.hot.delete(name)
+        for candidate in (name, name + GZIP_SUFFIX):
+            self.archive.delete(candidate)
+
+    def size(self, name):
+        if self.hot.exists(name):
+            return self.hot.size(name)
+        with self.open(name) as file:
+            return file.size
+
+    def listdir(self, path):
+        return self.hot.listdir(path)
+
+    def path(self, name):
+        return self.hot.path(name)
+
+    def url(self, name):
+        if not presigns(self.hot) and self.hot.exists(name):
+            return self.hot.url(name)
+        return self.download_url(name) or self.hot.url(name)
+
+    def get_accessed_time(self, name):
+        return self.hot.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.hot.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.hot.get_modified_time(name)
@@ -0,0 +1,75 @@
+"""
+Read replica routing, against the replica1 mirror that settings declare
+for the tests: it is the test database itself, so which connection ran a
+query tells where it was routed.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import User
+from apps.contracts.tests.fixtures import make_offer
+from apps.offers.models import Offer
+from djezzy_pos.db_router import ReplicaRouter, replica_reads, replicas
+
+REPLICA = 'replica1'
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.offer = make_offer()
+        self.user = User.objects.create_user(
+            username='admin', password='secret-password', is_staff=True, role='admin'
+        )
+
+    def offer_queries(self, context):
+        return [query['sql'] for query in context.captured_queries if 'offers_offer' in query['sql']]
+
+    def get_offers(self):
+        """Run GET /api/offers/; returns the offer queries per connection."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get('/api/offers/')
+        self.assertEqual(response.status_code, 200)
+        return self.offer_queries(primary), self.offer_queries(replica)
+
+    def test_replica_is_declared_for_the_tests(self):
+        self.assertEqual(replicas(), [REPLICA])
+
+    def test_get_reads_from_the_replica(self):
+        primary, replica = self.get_offers()
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+    def test_writes_go_to_the_primary(self):
+        router = ReplicaRouter()
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Offer), REPLICA)
+            self.assertEqual(router.db_for_write(Offer), DEFAULT_DB_ALIAS)
+            offer = Offer.objects.using(REPLICA).get(pk=self.offer.pk)
+            offer.name = 'Offre renommee'
+            offer.save()
+            # Inside a transaction, reads follow the writes
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Offer), DEFAULT_DB_ALIAS)
+        self.assertEqual(offer._state.db, DEFAULT_DB_ALIAS)
+
+    def test_reads_are_pinned_to_the_primary_after_a_post(self):
+        self.client.force_login(self.user)
+        primary, replica = self.get_offers()
+        self.assertTrue(replica)
+
+        response = self.client.post('/api/offers/', {
+            'name': 'Offre HADRA', 'code': 'HADRA', 'price': '1000.00',
+            'data_allowance_mb': 10240, 'voice_minutes': 300, 'sms_count': 50,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        primary, replica = self.get_offers()
+        self.assertEqual(replica, [])
+        self.assertTrue(primary)
@@ -5,10 +5,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from apps.accounts.tokens import RotatingTokenRefreshView, ThrottledTokenObtainPairView
+from apps.analytics.views import summary as dashboard_summary
 
 # Customize admin site
 admin.site.site_header = "Djezzy POS Administration"
@@ -22,12 +20,15 @@ urlpatterns = [
     path('dashboard/', include('apps.dashboard.urls')),
 
     # API endpoints
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', RotatingTokenRefreshView.as_view(), name='token_refresh'),
     path('api/user/', include('apps.accounts.urls')),
     path('api/offers/', include('apps.offers.urls')),
     path('api/phone-numbers/', include('apps.phone_numbers.urls')),
     path('api/contracts/', include('apps.contracts.urls')),
+    path('api/analytics/', include('apps.analytics.urls')),
+    path('api/dashboard/summary/', dashboard_summary, name='dashboard-summary'),
+    path('api/events/', include('apps.events.urls')),
 ]
 
 if settings.DEBUG:
@@ -1,6 +1,7 @@
 # Gunicorn configuration file for Djezzy POS
 
 import multiprocessing
+import os
 
 # Server socket
 bind = "127.0.0.1:8000"
@@ -8,7 +9,9 @@ backlog = 2048
 
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Sync workers cannot hold the /api/events/ streams open: a second, small
+# ASGI pool serves them (gunicorn_asgi.conf.py, routed by deploy/nginx.conf)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -0,0 +1,30 @@
+# Gunicorn configuration of the ASGI pool serving /api/events/ (SSE streams)
+#
+#   gunicorn djezzy_pos.asgi:application -c gunicorn_asgi.conf.py
+#
+# next to the sync pool (gunicorn.conf.py), with EVENTS_STREAM_URL=/api/events/
+# and deploy/nginx.conf routing the streams here.
+
+import os
+
+# Server socket
+bind = os.getenv("GUNICORN_ASGI_BIND", "127.0.0.1:8001")
+
+# Worker processes: each holds many idle streams on its event loop
+workers = int(os.getenv("GUNICORN_ASGI_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Streams last EVENTS_STREAM_LIFETIME seconds and send keepalives
+timeout = 60
+graceful_timeout = 10
+keepalive = 5
+
+# Their connections are per thread and would pile up (see DB_CONN_MAX_AGE)
+raw_env = ["DB_CONN_MAX_AGE=0"]
+
+# Logging
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
+
+# Process naming
+proc_name = "djezzy_pos_events"
@@ -148,6 +148,33 @@ const api = {
         return response;
     },
 
+    // Subscribe to the live event stream when an ASGI worker serves it
+    // (EVENTS_STREAM_URL); else call refresh() every few seconds. The browser
+    // reconnects by itself and resumes after the last received event (Last-Event-ID).
+    events(handlers, refresh) {
+        const config = JSON.parse(document.getElementById('events-config')?.textContent || '{}');
+        let polling = false;
+        const poll = () => {
+            if (polling || !refresh) return;
+            polling = true;
+            setInterval(refresh, config.poll_ms || 30000);
+        };
+        if (!config.url || !window.EventSource) {
+            poll();
+            return null;
+        }
+
+        const source = new EventSource(config.url, { withCredentials: true });
+        Object.entries(handlers).forEach(([type, handler]) => {
+            source.addEventListener(type, e => handler(JSON.parse(e.data)));
+        });
+        // Closed for good, e.g. 204 from a worker that cannot stream
+        source.addEventListener('error', () => {
+            if (source.readyState === EventSource.CLOSED) poll();
+        });
+        return source;
+    },
+
     // Login and get tokens
     async login(username, password) {
         try {
@@ -177,6 +204,24 @@ const api = {
 };
 
 // Utility functions
+// Apply a live phone number status change to { available, distributed } counters
+function applyNumberChange(counts, e) {
+    if (e.previous === 'available') counts.available--;
+    if (e.previous === 'assigned') counts.distributed--;
+    if (e.status === 'available') counts.available++;
+    if (e.status === 'assigned') counts.distributed++;
+}
+
+// Apply a bulk change of an offer's stock ({ changes: { status: delta } })
+function applyInventoryChange(counts, e) {
+    counts.available += e.changes.available || 0;
+    counts.distributed += e.changes.assigned || 0;
+}
+
+function notifyLowStock(e) {
+    showToast(`Stock faible : ${e.offer_name} (${e.available} numero(s) disponible(s))`, 'warning');
+}
+
 function formatDate(dateString) {
     if (!dateString) return '-';
     const date = new Date(dateString);